@@ -0,0 +1,1017 @@
+"""Benchmarks do localizador de notas
+
+Uso:
+    python benchmark.py texto PASTA [--notas 123456,654321] [--repeticoes 3]
+    python benchmark.py partida [--repeticoes 5]
+    python benchmark.py corpus PASTA [--dias 3] [--pdfs-por-dia 4] [--paginas-lote 200] [--fracao-code128 0.7]
+                                     [--fracao-vazias 0.2]
+    python benchmark.py busca PASTA [--tipos canhoto devolucao entrada] [--ocr simulado]
+    python benchmark.py preprocessamento PASTA [--paginas 30] [--escalas 2.0 3.0] [--ocr real]
+"""
+import argparse
+import builtins
+import contextlib
+import io
+import json
+import os
+import random
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import search
+from search import MOTORES_TEXTO, DocumentoPDF, IndiceNumerico
+
+
+def listar_pdfs(pasta):
+    """Lista os PDFs da pasta (recursivamente) em ordem estável"""
+    caminhos = []
+    for raiz, _, arquivos in os.walk(pasta):
+        for arquivo in sorted(arquivos):
+            if arquivo.lower().endswith('.pdf'):
+                caminhos.append(os.path.join(raiz, arquivo))
+    return sorted(caminhos)
+
+
+def medir_motor_texto(nome, caminhos, notas, repeticoes=1):
+    """Extrai o texto de todo o corpus com um motor e mede o tempo só da extração"""
+    motor = MOTORES_TEXTO[nome]()
+    tempos = []
+    tokens = {}
+    acertos = {nota: set() for nota in notas}
+    paginas = 0
+    erros = 0
+
+    for repeticao in range(repeticoes):
+        tempo = 0.0
+        for caminho in caminhos:
+            try:
+                # A leitura do arquivo fica fora da medição: só a extração conta
+                with DocumentoPDF(caminho) as documento:
+                    inicio = time.perf_counter()
+                    for num_pagina, texto in motor.paginas(documento):
+                        if repeticao == 0:
+                            paginas += 1
+                            tokens[(caminho, num_pagina)] = IndiceNumerico.tokens_texto(texto)
+                            texto_limpo = re.sub(r'\s+', '', texto or '')
+                            for nota in notas:
+                                if nota in texto_limpo:
+                                    acertos[nota].add((caminho, num_pagina))
+                    tempo += time.perf_counter() - inicio
+            except Exception as e:
+                if repeticao == 0:
+                    erros += 1
+                    print(f"[{nome}] erro em {caminho}: {e}")
+        tempos.append(tempo)
+
+    melhor = min(tempos) if tempos else 0.0
+    return {
+        'motor': nome,
+        'paginas': paginas,
+        'tempo': melhor,
+        'paginas_por_segundo': paginas / melhor if melhor else 0.0,
+        'erros': erros,
+        'tokens': tokens,
+        'acertos': acertos,
+    }
+
+
+def comparar_paridade(referencia, outro):
+    """Compara tokens numéricos por página e resultados por nota entre dois motores"""
+    paginas = set(referencia['tokens']) | set(outro['tokens'])
+    iguais = sum(1 for pagina in paginas
+                 if referencia['tokens'].get(pagina) == outro['tokens'].get(pagina))
+    diferentes = sorted(pagina for pagina in paginas
+                        if referencia['tokens'].get(pagina) != outro['tokens'].get(pagina))
+    notas_iguais = sum(1 for nota in referencia['acertos']
+                       if referencia['acertos'][nota] == outro['acertos'][nota])
+    return {
+        'paginas': len(paginas),
+        'paginas_iguais': iguais,
+        'paginas_diferentes': diferentes,
+        'notas': len(referencia['acertos']),
+        'notas_iguais': notas_iguais,
+    }
+
+
+def benchmark_texto(argumentos):
+    caminhos = listar_pdfs(argumentos.pasta)
+    if not caminhos:
+        print(f"Nenhum PDF encontrado em {argumentos.pasta}")
+        return 1
+
+    notas = [nota.strip() for nota in argumentos.notas.split(',') if nota.strip()] if argumentos.notas else []
+    print(f"Corpus: {len(caminhos)} PDF(s), {len(notas)} nota(s), {argumentos.repeticoes} repetição(ões)\n")
+
+    resultados = [medir_motor_texto(nome, caminhos, notas, argumentos.repeticoes)
+                  for nome in argumentos.motores]
+
+    print(f"{'motor':<10} {'páginas':>8} {'tempo (s)':>10} {'páginas/s':>10} {'erros':>6}")
+    for resultado in resultados:
+        print(f"{resultado['motor']:<10} {resultado['paginas']:>8} {resultado['tempo']:>10.3f} "
+              f"{resultado['paginas_por_segundo']:>10.1f} {resultado['erros']:>6}")
+
+    referencia = resultados[0]
+    for outro in resultados[1:]:
+        paridade = comparar_paridade(referencia, outro)
+        percentual = 100.0 * paridade['paginas_iguais'] / paridade['paginas'] if paridade['paginas'] else 100.0
+        print(f"\nParidade {referencia['motor']} x {outro['motor']}:")
+        print(f"  páginas com os mesmos números: {paridade['paginas_iguais']}/{paridade['paginas']} ({percentual:.1f}%)")
+        if paridade['notas']:
+            print(f"  notas com o mesmo resultado: {paridade['notas_iguais']}/{paridade['notas']}")
+        for caminho, num_pagina in paridade['paginas_diferentes'][:argumentos.detalhes]:
+            print(f"  difere: {caminho} página {num_pagina + 1}")
+
+    return 0
+
+
+MODULOS_PESADOS = ['tkinter', 'fitz', 'numpy', 'PIL.Image', 'PyPDF2', 'pytesseract']
+
+
+def medir_partida(codigo, repeticoes):
+    """Menor tempo de um interpretador novo executando o código (partida a frio)"""
+    pasta = os.path.dirname(os.path.abspath(__file__))
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        subprocess.run([sys.executable, '-c', codigo], cwd=pasta, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+def benchmark_partida(argumentos):
+    importacao_pesada = '; '.join(f'import {modulo}' for modulo in MODULOS_PESADOS)
+    cenarios = [
+        ('python vazio', 'pass'),
+        ('import search', 'import search'),
+        ('import search + módulos pesados', f'import search; {importacao_pesada}'),
+        ('search.py find --help', 'import sys, search; sys.argv = ["search.py", "find", "--help"]; '
+                                  'search.main_cli(sys.argv[1:])'),
+    ]
+
+    print(f"{'cenário':<34} {'tempo (s)':>10}")
+    for nome, codigo in cenarios:
+        try:
+            tempo = medir_partida(codigo, argumentos.repeticoes)
+            print(f"{nome:<34} {tempo:>10.3f}")
+        except subprocess.CalledProcessError:
+            print(f"{nome:<34} {'erro':>10}")
+
+    codigo = ('import sys, search; '
+              f'print(",".join(m for m in {MODULOS_PESADOS!r} if m in sys.modules))')
+    pasta = os.path.dirname(os.path.abspath(__file__))
+    carregados = subprocess.run([sys.executable, '-c', codigo], cwd=pasta, capture_output=True,
+                                text=True).stdout.strip()
+    print(f"\nMódulos pesados carregados por 'import search': {carregados or 'nenhum'}")
+    return 0
+
+
+# ---------------------------------------------------------------------------
+# Corpus sintético
+# ---------------------------------------------------------------------------
+
+ARQUIVO_GABARITO = 'gabarito.json'
+LARGURA_SCAN, ALTURA_SCAN = 827, 1169  # A4 a ~100 dpi
+
+# Código de barras simplificado das páginas digitalizadas: cada dígito d é
+# uma barra de (d + 1) módulos, separadas por um módulo em branco, entre as
+# guardas de início (12 módulos) e fim (16). As guardas diferentes fazem a
+# leitura só funcionar com a página na orientação certa, como no OCR real.
+MODULOS_INICIO, MODULOS_FIM = 12, 16
+
+
+def chave_acesso(nota, rng):
+    """Chave de acesso de 44 dígitos com o nNF (9 dígitos) nas posições 26-34 e o dígito módulo 11"""
+    prefixo = ''.join(rng.choice('0123456789') for _ in range(25))
+    sufixo = ''.join(rng.choice('0123456789') for _ in range(10))
+    chave = prefixo + f"{int(nota):09d}" + sufixo[:-1]
+    return chave + str(search.DecodificadorCode128.digito_verificador(chave))
+
+
+def modulos_code128(chave):
+    """Larguras (barra, espaço, ...) em módulos da chave em Code-128 C, do Start ao Stop"""
+    padroes = search.DecodificadorCode128.PADROES
+    valores = [int(chave[i:i + 2]) for i in range(0, len(chave), 2)]
+    verificador = (search.DecodificadorCode128.START_C + sum(peso * valor for peso, valor in enumerate(valores, 1))) % 103
+    simbolos = [search.DecodificadorCode128.START_C] + valores + [verificador, search.DecodificadorCode128.STOP]
+    return [int(modulos) for simbolo in simbolos for modulos in padroes[simbolo]]
+
+
+def pagina_texto(documento, nota, rng):
+    """DANFE com camada de texto"""
+    pagina = documento.new_page()
+    nota9 = f"{int(nota):09d}"
+    linhas = [
+        "DANFE - DOCUMENTO AUXILIAR DA NOTA FISCAL ELETRONICA",
+        f"N. {nota9[:3]}.{nota9[3:6]}.{nota9[6:]}   SERIE 1",
+        "CHAVE DE ACESSO",
+        ' '.join(chave_acesso(nota, rng)[i:i + 4] for i in range(0, 44, 4)),
+        f"CNPJ {rng.randrange(10**13, 10**14)}   IE {rng.randrange(10**8, 10**9)}",
+        f"VALOR TOTAL R$ {rng.randrange(100, 99999)},{rng.randrange(10, 99)}",
+    ]
+    for i, linha in enumerate(linhas):
+        pagina.insert_text((50, 60 + 18 * i), linha, fontsize=10)
+
+
+def imagem_scan(nota, rng, code128=False):
+    """Página digitalizada (só imagem) com o canhoto e a nota no topo
+
+    Com `code128`, o DANFE logo abaixo do canhoto traz a chave de acesso em
+    Code-128 (módulo de 2 pixels, ~0,5 mm).
+    """
+    from PIL import Image, ImageDraw, ImageFont
+
+    imagem = Image.new('L', (LARGURA_SCAN, ALTURA_SCAN), 255)
+    desenho = ImageDraw.Draw(imagem)
+
+    # Canhoto: faixa superior separada por uma régua
+    topo_regua = int(ALTURA_SCAN * 0.13)
+    desenho.rectangle([20, topo_regua, LARGURA_SCAN - 20, topo_regua + 2], fill=0)
+    nota9 = f"{int(nota):09d}"
+    try:
+        fonte = ImageFont.load_default(size=22)
+    except TypeError:
+        fonte = ImageFont.load_default()
+    desenho.text((40, int(ALTURA_SCAN * 0.10)), f"NF-e N. {nota9[:3]}.{nota9[3:6]}.{nota9[6:]}", fill=0, font=fonte)
+
+    modulo = 6
+    x = 60
+    y0, y1 = int(ALTURA_SCAN * 0.04), int(ALTURA_SCAN * 0.085)
+    larguras = [MODULOS_INICIO] + [int(d) + 1 for d in nota9] + [MODULOS_FIM]
+    for largura in larguras:
+        desenho.rectangle([x, y0, x + largura * modulo - 1, y1], fill=0)
+        x += (largura + 1) * modulo
+
+    if code128:
+        x = 120
+        y0, y1 = int(ALTURA_SCAN * 0.17), int(ALTURA_SCAN * 0.21)
+        for indice, largura in enumerate(modulos_code128(chave_acesso(nota, rng))):
+            if indice % 2 == 0:
+                desenho.rectangle([x, y0, x + 2 * largura - 1, y1], fill=0)
+            x += 2 * largura
+
+    # Corpo do documento: blocos cinza imitando texto
+    for _ in range(60):
+        bx = rng.randrange(40, LARGURA_SCAN - 200)
+        by = rng.randrange(topo_regua + 20, ALTURA_SCAN - 40)
+        desenho.rectangle([bx, by, bx + rng.randrange(40, 180), by + 8], fill=rng.randrange(60, 140))
+    return imagem
+
+
+def pagina_scan(documento, nota, rng, angulo=0, code128=False):
+    """Insere a página digitalizada, girada pelo ângulo (como sai do scanner)"""
+    imagem = imagem_scan(nota, rng, code128)
+    if angulo:
+        imagem = imagem.rotate(angulo, expand=True, fillcolor=255)
+    largura, altura = (595, 842) if imagem.width < imagem.height else (842, 595)
+    pagina = documento.new_page(width=largura, height=altura)
+    buffer = io.BytesIO()
+    imagem.save(buffer, format='PNG')
+    pagina.insert_image(pagina.rect, stream=buffer.getvalue())
+
+
+def pagina_sem_documento(documento, rng):
+    """Página digitalizada sem nota: verso em branco, folha separadora ou foto"""
+    from PIL import Image, ImageDraw, ImageFilter
+
+    tipo = rng.choice(['branco', 'separador', 'foto'])
+    imagem = Image.new('L', (LARGURA_SCAN, ALTURA_SCAN), rng.randrange(235, 256))
+    desenho = ImageDraw.Draw(imagem)
+    if tipo == 'branco':
+        # Verso com o texto da frente transparecendo de leve e alguma sujeira
+        for _ in range(40):
+            bx, by = rng.randrange(40, LARGURA_SCAN - 200), rng.randrange(40, ALTURA_SCAN - 40)
+            desenho.rectangle([bx, by, bx + rng.randrange(40, 180), by + 8], fill=rng.randrange(215, 235))
+        for _ in range(rng.randrange(0, 4)):
+            x, y = rng.randrange(LARGURA_SCAN), rng.randrange(ALTURA_SCAN)
+            desenho.ellipse([x, y, x + 2, y + 2], fill=rng.randrange(60, 120))
+    elif tipo == 'separador':
+        # Faixa escura larga para o operador achar a folha no lote
+        y = rng.randrange(ALTURA_SCAN // 4, ALTURA_SCAN // 2)
+        desenho.rectangle([60, y, LARGURA_SCAN - 60, y + rng.randrange(80, 200)], fill=rng.randrange(0, 60))
+    else:
+        # Foto: manchas grandes de tons suaves
+        for _ in range(25):
+            x, y = rng.randrange(LARGURA_SCAN), rng.randrange(ALTURA_SCAN)
+            raio = rng.randrange(80, 300)
+            desenho.ellipse([x - raio, y - raio, x + raio, y + raio], fill=rng.randrange(20, 200))
+        imagem = imagem.filter(ImageFilter.GaussianBlur(12))
+    pagina = documento.new_page(width=595, height=842)
+    buffer = io.BytesIO()
+    imagem.save(buffer, format='PNG')
+    pagina.insert_image(pagina.rect, stream=buffer.getvalue())
+    return tipo
+
+
+def gerar_corpus(pasta, dias=3, pdfs_por_dia=4, paginas_lote=200, semente=1, mes='MARÇO', fracao_code128=0.0,
+                 fracao_vazias=0.0):
+    """Gera a árvore MÊS/DIA para os três tipos e grava o gabarito (nota -> arquivo/página)
+
+    `fracao_code128` é a fração das páginas digitalizadas com a chave de acesso em código de barras;
+    `fracao_vazias`, a chance de cada página vir precedida de uma sem nota (fora do gabarito).
+    """
+    import fitz
+
+    rng = random.Random(semente)
+    gabarito = []
+    notas_usadas = set()
+
+    def nova_nota():
+        while True:
+            nota = str(rng.randrange(100000, 999999))
+            if nota not in notas_usadas:
+                notas_usadas.add(nota)
+                return nota
+
+    for tipo in search.TIPOS_CLI:
+        for dia in range(1, dias + 1):
+            pasta_dia = os.path.join(pasta, tipo, mes, f"{dia:02d}-{search.MESES_PASTA.index(mes) + 1:02d}")
+            os.makedirs(pasta_dia, exist_ok=True)
+            for indice_pdf in range(pdfs_por_dia):
+                # O primeiro PDF de cada dia é um lote grande; os demais, documentos curtos
+                if indice_pdf == 0:
+                    paginas = paginas_lote
+                else:
+                    paginas = rng.randint(1, 4)
+                nome_arquivo = f"{tipo.upper()}_{dia:02d}_{indice_pdf:02d}.pdf"
+                documento = fitz.open()
+                for _ in range(paginas):
+                    if fracao_vazias > 0 and rng.random() < fracao_vazias:
+                        pagina_sem_documento(documento, rng)
+                    nota = nova_nota()
+                    sorteio = rng.random()
+                    if sorteio < 0.55:
+                        pagina_texto(documento, nota, rng)
+                        tipo_pagina, angulo = 'texto', 0
+                    else:
+                        angulo = rng.choice([0, 0, 90, 180, 270])
+                        code128 = fracao_code128 > 0 and rng.random() < fracao_code128
+                        pagina_scan(documento, nota, rng, angulo, code128)
+                        tipo_pagina = 'scan'
+                    gabarito.append({
+                        'tipo': tipo, 'mes': mes, 'dia': dia, 'nota': nota,
+                        'arquivo': os.path.join(pasta_dia, nome_arquivo),
+                        'pagina': documento.page_count, 'pagina_tipo': tipo_pagina, 'angulo': angulo,
+                    })
+                documento.save(os.path.join(pasta_dia, nome_arquivo), deflate=True)
+                documento.close()
+
+    with open(os.path.join(pasta, ARQUIVO_GABARITO), 'w', encoding='utf-8') as arquivo:
+        json.dump(gabarito, arquivo, ensure_ascii=False, indent=1)
+    return gabarito
+
+
+def comando_corpus(argumentos):
+    if os.path.exists(argumentos.pasta) and os.listdir(argumentos.pasta) and not argumentos.sobrescrever:
+        print(f"{argumentos.pasta} não está vazia (use --sobrescrever)")
+        return 1
+    if argumentos.sobrescrever and os.path.exists(argumentos.pasta):
+        shutil.rmtree(argumentos.pasta)
+    inicio = time.perf_counter()
+    gabarito = gerar_corpus(argumentos.pasta, argumentos.dias, argumentos.pdfs_por_dia,
+                            argumentos.paginas_lote, argumentos.semente, fracao_code128=argumentos.fracao_code128,
+                            fracao_vazias=argumentos.fracao_vazias)
+    scans = sum(1 for item in gabarito if item['pagina_tipo'] == 'scan')
+    print(f"{len(gabarito)} página(s) com nota ({scans} digitalizadas) em {time.perf_counter() - inicio:.1f}s: "
+          f"{argumentos.pasta}")
+    return 0
+
+
+# ---------------------------------------------------------------------------
+# Busca ponta a ponta
+# ---------------------------------------------------------------------------
+
+class MotorOCRBarras(search.MotorOCR):
+    """OCR simulado para o corpus sintético: lê o código de barras das páginas digitalizadas
+    
+    Só decodifica com a página na orientação certa (as guardas são
+    assimétricas), então o custo de tentar vários ângulos é real. `atraso`
+    simula o tempo de uma chamada ao Tesseract; `erros` é a fração das
+    leituras em que um dígito sai trocado por um parecido (a troca depende
+    da imagem, então outra resolução pode ler certo).
+    """
+
+    def __init__(self, atraso=0.0, erros=0.0):
+        self.atraso = atraso
+        self.erros = erros
+
+    @staticmethod
+    def decodificar(imagem):
+        import numpy as np
+
+        pixels = np.asarray(imagem.convert('L'))
+        altura = pixels.shape[0]
+        for linha in range(0, altura, max(1, altura // 300)):
+            escuro = pixels[linha] < 128
+            bordas = np.flatnonzero(np.diff(escuro.astype(np.int8))) + 1
+            if len(bordas) < 4:
+                continue
+            limites = np.concatenate(([0], bordas, [len(escuro)]))
+            corridas = np.diff(limites)
+            escuras = escuro[limites[:-1]]
+            resultado = MotorOCRBarras._ler_corridas(corridas, escuras)
+            if resultado:
+                return resultado
+        return ''
+
+    @staticmethod
+    def _ler_corridas(corridas, escuras):
+        for inicio in range(len(corridas) - 2):
+            if not escuras[inicio] or escuras[inicio + 1]:
+                continue
+            modulo = corridas[inicio] / MODULOS_INICIO
+            if modulo < 2 or abs(corridas[inicio + 1] - modulo) > modulo * 0.5:
+                continue
+            digitos = []
+            posicao = inicio + 2
+            while posicao < len(corridas) and escuras[posicao]:
+                modulos = corridas[posicao] / modulo
+                if abs(modulos - MODULOS_FIM) < 1:
+                    return ''.join(digitos) if digitos else None
+                if round(modulos) < 1 or round(modulos) > 10 or abs(modulos - round(modulos)) > 0.4:
+                    break
+                digitos.append(str(round(modulos) - 1))
+                espaco = corridas[posicao + 1] if posicao + 1 < len(corridas) else 0
+                if abs(espaco - modulo) > modulo * 0.5:
+                    break
+                posicao += 2
+        return None
+
+    @staticmethod
+    def possui_barras(imagem, altura_minima=0.03):
+        """Indica se há barras verticais ou horizontais altas (o código, legível ou não)"""
+        import numpy as np
+
+        escuro = np.asarray(imagem.convert('L')) < 128
+        for eixo in (0, 1):
+            janela = max(2, int(escuro.shape[eixo] * altura_minima))
+            acumulado = np.cumsum(escuro, axis=eixo, dtype=np.int32)
+            trecho = np.take(acumulado, range(janela, escuro.shape[eixo]), axis=eixo) - \
+                np.take(acumulado, range(0, escuro.shape[eixo] - janela), axis=eixo)
+            if np.count_nonzero((trecho == janela).any(axis=eixo)) >= 5:
+                return True
+        return False
+
+    def trocar_digito(self, texto, imagem):
+        rng = random.Random(f"{texto}/{imagem.size}")
+        if not texto or rng.random() >= self.erros:
+            return texto
+        posicao = rng.randrange(len(texto))
+        trocas = [par[1 - par.index(texto[posicao])] for par in search.ConsultaNota.CONFUSOES_OCR
+                  if texto[posicao] in par]
+        if not trocas:
+            return texto
+        return texto[:posicao] + rng.choice(trocas) + texto[posicao + 1:]
+
+    def _ler_texto(self, imagem, config):
+        if self.atraso:
+            time.sleep(self.atraso)
+        return self.trocar_digito(self.decodificar(imagem), imagem)
+
+    def _ler_osd(self, imagem, config):
+        if self.atraso:
+            time.sleep(self.atraso)
+        # Como o OSD do Tesseract: o ângulo em que o código decodifica, com confiança
+        for angulo in search.OCRMultiOrientacao.ORIENTACOES:
+            if self.decodificar(search.OCRMultiOrientacao.rotacionar_imagem(imagem, angulo)):
+                return f'Rotate: {(360 - angulo) % 360}\nOrientation confidence: 10.00\n'
+        # Sem código: páginas de texto do corpus (nítidas, o Tesseract teria confiança)
+        # ou digitalizações ilegíveis nessa resolução, que a barra inteira denunciaria
+        if self.possui_barras(imagem):
+            return 'Rotate: 0\nOrientation confidence: 0.00\n'
+        return 'Rotate: 0\nOrientation confidence: 10.00\n'
+
+
+class Cronometro:
+    """Acumula o tempo gasto em cada etapa envolvendo métodos dos localizadores"""
+
+    def __init__(self):
+        self.tempos = {}
+        self.chamadas = {}
+        self._lock = threading.Lock()
+        self._originais = []
+
+    def registrar(self, etapa, tempo):
+        with self._lock:
+            self.tempos[etapa] = self.tempos.get(etapa, 0.0) + tempo
+            self.chamadas[etapa] = self.chamadas.get(etapa, 0) + 1
+
+    def envolver(self, alvo, nome_metodo, etapa):
+        original = getattr(alvo, nome_metodo)
+        cronometro = self
+
+        def medido(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                cronometro.registrar(etapa, time.perf_counter() - inicio)
+
+        if isinstance(alvo, type):
+            estatico = isinstance(alvo.__dict__.get(nome_metodo), (staticmethod, classmethod))
+            self._originais.append((alvo, nome_metodo, alvo.__dict__.get(nome_metodo)))
+            setattr(alvo, nome_metodo, staticmethod(medido) if estatico else
+                    (lambda self_, *a, **k: medido(self_, *a, **k)))
+        else:
+            setattr(alvo, nome_metodo, medido)
+
+    def restaurar(self):
+        for alvo, nome_metodo, original in reversed(self._originais):
+            setattr(alvo, nome_metodo, original)
+        self._originais = []
+
+
+def percentil(valores, fracao):
+    ordenados = sorted(valores)
+    if not ordenados:
+        return 0.0
+    posicao = min(len(ordenados) - 1, int(round(fracao * (len(ordenados) - 1))))
+    return ordenados[posicao]
+
+
+def consultas_corpus(gabarito, tipo, quantidade, rng):
+    """Notas a procurar (com as páginas esperadas) e algumas ausentes"""
+    paginas = [item for item in gabarito if item['tipo'] == tipo]
+    amostra = rng.sample(paginas, min(quantidade, len(paginas)))
+    consultas = [(item['mes'], item['dia'], item['nota'], {(item['arquivo'], item['pagina'])}, item['pagina_tipo'])
+                 for item in amostra]
+    existentes = {item['nota'] for item in gabarito}
+    for _ in range(max(1, quantidade // 10)):
+        while True:
+            nota = str(rng.randrange(100000, 999999))
+            if nota not in existentes:
+                break
+        item = rng.choice(paginas)
+        consultas.append((item['mes'], item['dia'], nota, set(), 'ausente'))
+    return consultas
+
+
+def medir_localizador(tipo, consultas, motor, passadas=2, cache_pdf=True, rede=None, limite_memoria=None,
+                      codigo_barras=True, triagem=True, preprocessamento=None):
+    """Roda as consultas em um localizador com índice, caches, manifesto e orçamento de memória novos
+
+    `rede` (PastaLenta) simula o compartilhamento durante as consultas e
+    `limite_memoria` (bytes) é o orçamento das páginas em processamento.
+    `triagem` é False (sem triagem) ou um dicionário de limiares da TriagemPagina.
+    `preprocessamento` ('pil' ou 'numpy') troca o padrão do OCRMultiOrientacao.
+    """
+    pasta_temporaria = tempfile.mkdtemp(prefix='bench_busca_')
+    cronometro = Cronometro()
+    search._cache_ocr_padrao = search.CacheOCR(os.path.join(pasta_temporaria, 'cache_ocr'))
+    search._cache_pdf_padrao = search.CachePDF(os.path.join(pasta_temporaria, 'cache_pdf')) if cache_pdf else False
+    search._manifesto_padrao = search.ManifestoPastas()
+    search._orcamento_memoria_padrao = search.OrcamentoMemoria(limite_memoria)
+    search._motor_ocr_padrao = motor
+    search._estatisticas_resolucao_padrao = search.EstatisticasResolucao(
+        os.path.join(pasta_temporaria, 'estatisticas_resolucao.json'))
+    indice = IndiceNumerico(os.path.join(pasta_temporaria, 'indice.sqlite3'))
+    try:
+        nome_tipo = search.TIPOS_CLI[tipo]
+        localizador = search.CLASSES_LOCALIZADOR[nome_tipo](os.path.join(CORPUS_ATUAL, tipo), indice=indice)
+        localizador.log.eco = False  # O log continua no buffer, só não vai para o console
+        localizador.usar_codigo_barras = codigo_barras
+        if preprocessamento:
+            localizador.ocr_multi.preprocessamento = preprocessamento
+        localizador.triagem = search.TriagemPagina(**triagem) if triagem is not False else None
+
+        if hasattr(localizador, 'buscar_nome_arquivo'):
+            cronometro.envolver(localizador, 'buscar_nome_arquivo', 'nome')
+        cronometro.envolver(localizador, 'consultar_indice', 'indice')
+        if hasattr(localizador, 'melhorar_imagem_ocr'):
+            cronometro.envolver(localizador, 'melhorar_imagem_ocr', 'preprocessamento')
+        cronometro.envolver(localizador.ocr_multi, 'preparar_imagem', 'preprocessamento')
+        cronometro.envolver(localizador.motor_texto, 'texto', 'texto')
+        cronometro.envolver(indice, 'registrar_pagina', 'indexacao')
+        cronometro.envolver(DocumentoPDF, 'pixmap', 'render')
+        cronometro.envolver(search.DetectorCanhoto, 'regioes', 'canhoto')
+        cronometro.envolver(search.DecodificadorCode128, 'ler_chaves', 'codigo_barras')
+        if localizador.triagem:
+            cronometro.envolver(localizador.triagem, 'medir', 'triagem')
+        cronometro.envolver(motor, 'ler_texto', 'ocr')
+        cronometro.envolver(motor, 'ler_osd', 'osd')
+
+        passadas_resultado = []
+        for passada in range(passadas):
+            latencias = []
+            por_pagina = {'texto': [0, 0], 'scan': [0, 0]}
+            extras = 0
+            picos = []
+            esperas = 0
+            descartadas = 0
+            economizado = 0.0
+            obtidos_consultas = []
+            cronometro.tempos, cronometro.chamadas = {}, {}
+            for mes, dia, nota, esperado, pagina_tipo in consultas:
+                inicio = time.perf_counter()
+                with rede or contextlib.nullcontext(), search.MonitorMemoria(localizador.orcamento_memoria) as memoria:
+                    resultados = localizador.buscar(mes, str(dia), nota)
+                latencias.append(time.perf_counter() - inicio)
+                picos.append(memoria.pico or 0)
+                esperas += localizador.orcamento_memoria.estatisticas()['esperas']
+                if localizador.triagem:
+                    estatisticas = localizador.triagem.estatisticas()
+                    descartadas += estatisticas['descartadas']
+                    economizado += estatisticas['tempo_economizado']
+                obtidos = set()
+                if not isinstance(resultados, str):
+                    obtidos = {(resultado['arquivo'], resultado['pagina']) for resultado in resultados}
+                obtidos_consultas.append(obtidos)
+                if esperado:
+                    por_pagina[pagina_tipo][0] += 1
+                    por_pagina[pagina_tipo][1] += bool(esperado & obtidos)
+                extras += len(obtidos - esperado)
+            passadas_resultado.append({
+                'latencias': latencias,
+                'por_pagina': por_pagina,
+                'extras': extras,
+                'pico_rss': max(picos, default=0),
+                'esperas_memoria': esperas,
+                'descartadas': descartadas,
+                'tempo_economizado': economizado,
+                'obtidos': obtidos_consultas,
+                'etapas': dict(cronometro.tempos),
+                'chamadas': dict(cronometro.chamadas),
+            })
+        return passadas_resultado
+    finally:
+        cronometro.restaurar()
+        indice._conexao.close()
+        shutil.rmtree(pasta_temporaria, ignore_errors=True)
+
+
+CORPUS_ATUAL = None
+
+
+def limiar_triagem(texto):
+    """'nome=valor' da linha de comando -> (nome, valor) de um limiar da TriagemPagina"""
+    nome, _, valor = texto.partition('=')
+    if nome not in search.TriagemPagina.LIMIARES:
+        raise argparse.ArgumentTypeError(f"limiar desconhecido: {nome} (use {', '.join(search.TriagemPagina.LIMIARES)})")
+    return nome, float(valor)
+
+
+def benchmark_busca(argumentos):
+    global CORPUS_ATUAL
+    caminho_gabarito = os.path.join(argumentos.pasta, ARQUIVO_GABARITO)
+    if not os.path.exists(caminho_gabarito):
+        print(f"Gabarito não encontrado: gere o corpus com 'python benchmark.py corpus {argumentos.pasta}'")
+        return 1
+    with open(caminho_gabarito, encoding='utf-8') as arquivo:
+        gabarito = json.load(arquivo)
+    CORPUS_ATUAL = argumentos.pasta
+
+    paginas_por_dia = {}
+    for item in gabarito:
+        chave = (item['tipo'], item['mes'], item['dia'])
+        paginas_por_dia[chave] = paginas_por_dia.get(chave, 0) + 1
+
+    if argumentos.sem_aproximacao:
+        search.ConsultaNota.CUSTO_MAXIMO = 0
+
+    if argumentos.sem_cascata:
+        for classe in search.CLASSES_LOCALIZADOR.values():
+            classe.ESCALAS_OCR = (classe.MATRIZ_RENDER,)
+
+    rng = random.Random(argumentos.semente)
+    for tipo in argumentos.tipos:
+        motor = (MotorOCRBarras(argumentos.atraso_ocr, argumentos.erros_ocr) if argumentos.ocr == 'simulado'
+                 else search.obter_motor_ocr_padrao())
+        consultas = consultas_corpus(gabarito, tipo, argumentos.consultas, rng)
+        rede = None
+        if argumentos.latencia_rede or argumentos.banda_rede:
+            rede = PastaLenta(argumentos.pasta, argumentos.latencia_rede,
+                              argumentos.banda_rede * 2 ** 20 if argumentos.banda_rede else None)
+        passadas = medir_localizador(tipo, consultas, motor, argumentos.passadas,
+                                     not argumentos.sem_cache_pdf, rede, argumentos.memoria_mb * 2 ** 20,
+                                     not argumentos.sem_codigo_barras,
+                                     False if argumentos.sem_triagem else dict(argumentos.triagem),
+                                     argumentos.preprocessamento)
+        paginas_varridas = sum(paginas_por_dia.get((tipo, mes, dia), 0) for mes, dia, *_ in consultas)
+
+        print(f"\n== {search.TIPOS_CLI[tipo]} ({len(consultas)} consulta(s), OCR {argumentos.ocr}) ==")
+        print(f"{'passada':<8} {'total (s)':>10} {'p50 (s)':>9} {'p95 (s)':>9} {'páginas/s':>10} "
+              f"{'recall texto':>13} {'recall scan':>12} {'extras':>7} {'RSS (MB)':>9} {'esperas':>8} "
+              f"{'sem OCR':>8} {'econ. (s)':>9}")
+        for numero, passada in enumerate(passadas, 1):
+            total = sum(passada['latencias'])
+            recall = {tipo_pagina: (100.0 * achadas / esperadas if esperadas else 100.0)
+                      for tipo_pagina, (esperadas, achadas) in passada['por_pagina'].items()}
+            nome = 'fria' if numero == 1 else 'quente'
+            print(f"{nome:<8} {total:>10.2f} {percentil(passada['latencias'], 0.5):>9.3f} "
+                  f"{percentil(passada['latencias'], 0.95):>9.3f} {paginas_varridas / total if total else 0:>10.1f} "
+                  f"{recall['texto']:>12.1f}% {recall['scan']:>11.1f}% {passada['extras']:>7} "
+                  f"{passada['pico_rss'] / 2 ** 20:>9.0f} {passada['esperas_memoria']:>8} "
+                  f"{passada['descartadas']:>8} {passada['tempo_economizado']:>9.1f}")
+        for numero, passada in enumerate(passadas, 1):
+            etapas = ', '.join(f"{etapa} {tempo:.2f}s/{passada['chamadas'][etapa]}"
+                               for etapa, tempo in sorted(passada['etapas'].items(), key=lambda e: -e[1]))
+            print(f"  etapas ({'fria' if numero == 1 else 'quente'}): {etapas or 'nenhuma'}")
+        for numero, passada in enumerate(passadas[1:], 2):
+            # Índice e caches não podem mudar a resposta: a passada quente devolve o mesmo que a fria
+            divergentes = sum(fria != quente for fria, quente in zip(passadas[0]['obtidos'], passada['obtidos']))
+            print(f"  passada {numero} x fria: {divergentes} consulta(s) com resultado diferente")
+        if rede:
+            print(f"  rede: {rede.bytes_lidos / 2 ** 20:.1f} MB lidos, {rede.chamadas} chamada(s)")
+    return 0
+
+
+# ---------------------------------------------------------------------------
+# Pré-processamento: cadeia PIL x NumPy
+# ---------------------------------------------------------------------------
+
+def variantes_preprocessamento():
+    """Nome -> função(imagem) de cada pré-processamento comparado"""
+    canhoto = search.BuscadorCanhotosAvancado(tempfile.gettempdir())
+    canhoto.log.eco = False
+    canhoto.ocr_multi.preprocessamento = 'pil'
+    return {
+        'pil (devolução/entrada)': lambda imagem: search.OCRMultiOrientacao.melhorar_imagem_para_ocr(
+            search.OCRMultiOrientacao.imagem_pil(imagem)),
+        'pil (canhoto)': canhoto.melhorar_imagem_ocr,
+        'numpy sauvola': lambda imagem: search.PreprocessadorOCR.processar(imagem, 'sauvola'),
+        'numpy otsu': lambda imagem: search.PreprocessadorOCR.processar(imagem, 'otsu'),
+        'numpy sem binarizar': lambda imagem: search.PreprocessadorOCR.processar(imagem, None),
+    }
+
+
+def benchmark_preprocessamento(argumentos):
+    caminho_gabarito = os.path.join(argumentos.pasta, ARQUIVO_GABARITO)
+    if not os.path.exists(caminho_gabarito):
+        print(f"Gabarito não encontrado: gere o corpus com 'python benchmark.py corpus {argumentos.pasta}'")
+        return 1
+    with open(caminho_gabarito, encoding='utf-8') as arquivo:
+        gabarito = json.load(arquivo)
+
+    paginas = [item for item in gabarito if item['pagina_tipo'] == 'scan']
+    paginas = random.Random(argumentos.semente).sample(paginas, min(argumentos.paginas, len(paginas)))
+    motor = MotorOCRBarras() if argumentos.ocr == 'simulado' else search.obter_motor_ocr_padrao()
+    config = search.OCRMultiOrientacao.CONFIG_DIGITOS
+    variantes = variantes_preprocessamento()
+
+    print(f"{len(paginas)} página(s) digitalizada(s), OCR {argumentos.ocr}\n")
+    print(f"{'escala':<7} {'renderização':<24} {'ms/página':>10} {'MB/página':>10}")
+    for escala in argumentos.escalas:
+        for nome, renderizar in (('rgb + convert(L)', lambda d, n: d.renderizar(n, escala).convert('L')),
+                                 ('cinza (vista numpy)', lambda d, n: d.renderizar_array(n, escala))):
+            tempo = 0.0
+            tamanho = 0
+            for item in paginas:
+                with DocumentoPDF(item['arquivo']) as documento:
+                    renderizar(documento, item['pagina'] - 1)  # Aquecimento (abertura e decodificação)
+                    inicio = time.perf_counter()
+                    imagem = renderizar(documento, item['pagina'] - 1)
+                    tempo += time.perf_counter() - inicio
+                    # Bytes do pixmap RGB mais a cópia em cinza, ou só do pixmap em cinza
+                    tamanho += imagem.width * imagem.height * 4 if nome.startswith('rgb') else imagem.nbytes
+            print(f"{escala:<7} {nome:<24} {1000 * tempo / len(paginas):>10.1f} "
+                  f"{tamanho / len(paginas) / 2 ** 20:>10.1f}")
+    print()
+
+    print(f"{'escala':<7} {'pré-processamento':<24} {'ms/página':>10} {'recall':>8}")
+    for escala in argumentos.escalas:
+        imagens = []
+        for item in paginas:
+            with DocumentoPDF(item['arquivo']) as documento:
+                imagens.append((item, documento.renderizar_array(item['pagina'] - 1, escala)))
+
+        for nome, funcao in variantes.items():
+            tempo = 0.0
+            acertos = 0
+            for item, imagem in imagens:
+                inicio = time.perf_counter()
+                processada = funcao(imagem)
+                tempo += time.perf_counter() - inicio
+                # A leitura usa o ângulo que desfaz a rotação gravada no gabarito
+                angulo = (360 - item['angulo']) % 360
+                texto = re.sub(r'\s+', '', motor.ler_texto(processada, config, angulo))
+                acertos += f"{int(item['nota']):09d}" in texto or item['nota'] in texto
+            print(f"{escala:<7} {nome:<24} {1000 * tempo / len(imagens):>10.1f} "
+                  f"{100.0 * acertos / len(imagens):>7.1f}%")
+    return 0
+
+
+# ---------------------------------------------------------------------------
+# Listagem das pastas: os.listdir + isdir x manifesto
+# ---------------------------------------------------------------------------
+
+class ArquivoLento:
+    """Arquivo aberto para leitura que entrega no máximo `banda` bytes por segundo"""
+
+    def __init__(self, arquivo, banda, pasta_lenta):
+        self._arquivo = arquivo
+        self._banda = banda
+        self._pasta_lenta = pasta_lenta
+
+    def read(self, tamanho=-1):
+        dados = self._arquivo.read(tamanho)
+        # As leituras simultâneas dividem o mesmo link
+        with self._pasta_lenta.link:
+            self._pasta_lenta.bytes_lidos += len(dados)
+            time.sleep(len(dados) / self._banda)
+        return dados
+
+    def __getattr__(self, atributo):
+        return getattr(self._arquivo, atributo)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self._arquivo.close()
+
+
+class PastaLenta:
+    """Atrasa as chamadas ao sistema de arquivos sob uma pasta, como no compartilhamento SMB
+
+    Cada listagem, stat ou abertura custa `latencia` segundos (no Windows o
+    tamanho e o mtime das entradas do scandir vêm na listagem, então não são
+    cobrados) e, com `banda` (bytes/s), a leitura dos arquivos é limitada.
+    """
+
+    FUNCOES = (('os', 'listdir'), ('os', 'scandir'), ('os', 'stat'), ('os.path', 'isdir'),
+               ('os.path', 'exists'), ('os.path', 'getmtime'))
+
+    def __init__(self, pasta, latencia, banda=None):
+        self.pasta = os.path.abspath(pasta)
+        self.latencia = latencia
+        self.banda = banda
+        self.chamadas = 0
+        self.bytes_lidos = 0
+        self.link = threading.Lock()
+        self._originais = {}
+
+    def _na_pasta(self, caminho):
+        return isinstance(caminho, str) and os.path.abspath(caminho).startswith(self.pasta)
+
+    def __enter__(self):
+        modulos = {'os': os, 'os.path': os.path, 'builtins': builtins}
+        abrir = builtins.open
+
+        def aberto_lento(caminho, modo='r', *args, **kwargs):
+            arquivo = abrir(caminho, modo, *args, **kwargs)
+            if not self._na_pasta(caminho):
+                return arquivo
+            self.chamadas += 1
+            time.sleep(self.latencia)
+            return ArquivoLento(arquivo, self.banda, self) if self.banda and 'r' in modo else arquivo
+        self._originais[('builtins', 'open')] = abrir
+        builtins.open = aberto_lento
+
+        for nome_modulo, nome in self.FUNCOES:
+            original = getattr(modulos[nome_modulo], nome)
+            self._originais[(nome_modulo, nome)] = original
+
+            def lenta(caminho, *args, _original=original, **kwargs):
+                if self._na_pasta(caminho):
+                    self.chamadas += 1
+                    time.sleep(self.latencia)
+                return _original(caminho, *args, **kwargs)
+            setattr(modulos[nome_modulo], nome, lenta)
+        return self
+
+    def __exit__(self, *_):
+        modulos = {'os': os, 'os.path': os.path, 'builtins': builtins}
+        for (nome_modulo, nome), original in self._originais.items():
+            setattr(modulos[nome_modulo], nome, original)
+
+
+def listar_dia_direto(caminho_base, mes, dia):
+    """Listagem como era feita antes do manifesto: listdir + isdir a cada busca"""
+    caminho_mes = os.path.join(caminho_base, mes)
+    if not os.path.exists(caminho_mes):
+        return []
+    pdfs = []
+    dia_procurado = f"{int(dia):02d}"
+    for pasta in os.listdir(caminho_mes):
+        caminho_pasta = os.path.join(caminho_mes, pasta)
+        if os.path.isdir(caminho_pasta) and (pasta.startswith(f"{dia_procurado}-") or pasta == dia_procurado):
+            pdfs += [arquivo for arquivo in os.listdir(caminho_pasta) if arquivo.lower().endswith('.pdf')]
+    return pdfs
+
+
+def listar_dia_manifesto(localizador, mes, dia):
+    caminho_mes = os.path.join(localizador.caminho_base, mes)
+    if not localizador.pasta_existe(caminho_mes):
+        return []
+    pdfs = []
+    for pasta_info in localizador.encontrar_pastas_dia(caminho_mes, dia):
+        pdfs += localizador.listar_pdfs(pasta_info['caminho'])
+    return pdfs
+
+
+def benchmark_listagem(argumentos):
+    caminho_gabarito = os.path.join(argumentos.pasta, ARQUIVO_GABARITO)
+    if not os.path.exists(caminho_gabarito):
+        print(f"Gabarito não encontrado: gere o corpus com 'python benchmark.py corpus {argumentos.pasta}'")
+        return 1
+    with open(caminho_gabarito, encoding='utf-8') as arquivo:
+        gabarito = json.load(arquivo)
+
+    dias = sorted({(item['tipo'], item['mes'], item['dia']) for item in gabarito})
+    rng = random.Random(argumentos.semente)
+    consultas = [rng.choice(dias) for _ in range(argumentos.consultas)]
+    search._manifesto_padrao = search.ManifestoPastas()
+    localizadores = {tipo: search.CLASSES_LOCALIZADOR[search.TIPOS_CLI[tipo]](
+        os.path.join(argumentos.pasta, tipo), indice=False) for tipo in search.TIPOS_CLI}
+
+    print(f"{len(consultas)} consulta(s), {1000 * argumentos.latencia:.0f} ms por chamada ao sistema de arquivos\n")
+    print(f"{'listagem':<12} {'total (s)':>10} {'ms/consulta':>12} {'chamadas':>9}")
+    for nome, listar in (('direta', lambda tipo, mes, dia: listar_dia_direto(
+                              os.path.join(argumentos.pasta, tipo), mes, dia)),
+                         ('manifesto', lambda tipo, mes, dia: listar_dia_manifesto(localizadores[tipo], mes, dia))):
+        with PastaLenta(argumentos.pasta, argumentos.latencia) as pasta_lenta:
+            inicio = time.perf_counter()
+            encontrados = sum(len(listar(tipo, mes, dia)) for tipo, mes, dia in consultas)
+            total = time.perf_counter() - inicio
+        print(f"{nome:<12} {total:>10.2f} {1000 * total / len(consultas):>12.1f} {pasta_lenta.chamadas:>9}"
+              f"   ({encontrados} PDF(s) listados)")
+    manifesto = search.obter_manifesto_padrao()
+    print(f"\nmanifesto: {manifesto.leituras} pasta(s) lida(s), {manifesto.revalidacoes} revalidação(ões) por mtime")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks do localizador de notas")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    texto = subparsers.add_parser('texto', help="Compara os motores de extração de texto")
+    texto.add_argument('pasta', help="Pasta com o corpus de PDFs")
+    texto.add_argument('--notas', help="Números de nota separados por vírgula para conferir a paridade")
+    texto.add_argument('--motores', nargs='+', default=list(MOTORES_TEXTO), choices=list(MOTORES_TEXTO))
+    texto.add_argument('--repeticoes', type=int, default=3)
+    texto.add_argument('--detalhes', type=int, default=10, help="Máximo de páginas divergentes listadas")
+    texto.set_defaults(funcao=benchmark_texto)
+
+    partida = subparsers.add_parser('partida', help="Mede o tempo de partida a frio do módulo")
+    partida.add_argument('--repeticoes', type=int, default=5)
+    partida.set_defaults(funcao=benchmark_partida)
+
+    corpus = subparsers.add_parser('corpus', help="Gera um corpus sintético MÊS/DIA com gabarito")
+    corpus.add_argument('pasta')
+    corpus.add_argument('--dias', type=int, default=3)
+    corpus.add_argument('--pdfs-por-dia', type=int, default=4)
+    corpus.add_argument('--paginas-lote', type=int, default=200, help="Páginas do PDF em lote de cada dia")
+    corpus.add_argument('--semente', type=int, default=1)
+    corpus.add_argument('--fracao-code128', type=float, default=0.0,
+                        help="Fração das páginas digitalizadas com a chave de acesso em Code-128")
+    corpus.add_argument('--fracao-vazias', type=float, default=0.0,
+                        help="Chance de cada página vir precedida de um verso em branco, separador ou foto")
+    corpus.add_argument('--sobrescrever', action='store_true')
+    corpus.set_defaults(funcao=comando_corpus)
+
+    busca = subparsers.add_parser('busca', help="Mede as buscas ponta a ponta no corpus sintético")
+    busca.add_argument('pasta')
+    busca.add_argument('--tipos', nargs='+', default=list(search.TIPOS_CLI), choices=list(search.TIPOS_CLI))
+    busca.add_argument('--consultas', type=int, default=20, help="Notas existentes por tipo (mais ~10%% ausentes)")
+    busca.add_argument('--passadas', type=int, default=2, help="A primeira é fria; as seguintes reaproveitam índice e cache")
+    busca.add_argument('--ocr', choices=['simulado', 'real'], default='simulado')
+    busca.add_argument('--atraso-ocr', type=float, default=0.0, help="Segundos por chamada do OCR simulado")
+    busca.add_argument('--semente', type=int, default=1)
+    busca.add_argument('--sem-cascata', action='store_true', help="OCR direto na escala máxima de cada localizador")
+    busca.add_argument('--erros-ocr', type=float, default=0.0,
+                       help="Fração das leituras do OCR simulado com um dígito trocado")
+    busca.add_argument('--sem-aproximacao', action='store_true',
+                       help="Só correspondências exatas no texto do OCR")
+    busca.add_argument('--latencia-rede', type=float, default=0.0,
+                       help="Segundos por chamada ao sistema de arquivos no corpus (SMB simulado)")
+    busca.add_argument('--banda-rede', type=float, default=0.0, help="MB/s na leitura dos PDFs do corpus")
+    busca.add_argument('--sem-cache-pdf', action='store_true', help="Lê os PDFs direto do corpus, sem cópia local")
+    busca.add_argument('--sem-codigo-barras', action='store_true',
+                       help="Não lê a chave de acesso do código de barras antes do OCR")
+    busca.add_argument('--preprocessamento', choices=['pil', 'numpy'],
+                       help="Pré-processamento do OCR (padrão: o do search.py)")
+    busca.add_argument('--sem-triagem', action='store_true',
+                       help="Não descarta páginas sem dígitos impressos antes do OCR")
+    busca.add_argument('--triagem', type=limiar_triagem, action='append', default=[], metavar='LIMIAR=VALOR',
+                       help="Troca um limiar da triagem (ex.: componentes_minimos=20); pode repetir")
+    busca.add_argument('--memoria-mb', type=float, default=0.0,
+                       help="Orçamento de memória das páginas em processamento (0: padrão pela RAM da máquina)")
+    busca.set_defaults(funcao=benchmark_busca)
+
+    preprocessamento = subparsers.add_parser('preprocessamento', help="Compara a cadeia PIL com o pré-processamento NumPy")
+    preprocessamento.add_argument('pasta')
+    preprocessamento.add_argument('--paginas', type=int, default=30)
+    preprocessamento.add_argument('--escalas', type=float, nargs='+', default=[2.0, 3.0])
+    preprocessamento.add_argument('--ocr', choices=['simulado', 'real'], default='simulado')
+    preprocessamento.add_argument('--semente', type=int, default=1)
+    preprocessamento.set_defaults(funcao=benchmark_preprocessamento)
+
+    listagem = subparsers.add_parser('listagem', help="Compara listdir + isdir com o manifesto de pastas")
+    listagem.add_argument('pasta')
+    listagem.add_argument('--consultas', type=int, default=50)
+    listagem.add_argument('--latencia', type=float, default=0.005, help="Segundos por chamada (SMB simulado)")
+    listagem.add_argument('--semente', type=int, default=1)
+    listagem.set_defaults(funcao=benchmark_listagem)
+
+    argumentos = parser.parse_args()
+    return argumentos.funcao(argumentos)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,189 +1,3569 @@
 import os
-import PyPDF2
-import pytesseract
-from PIL import Image, ImageEnhance
-import fitz  # PyMuPDF
+import sys
+import csv
+import argparse
+import importlib
 import re
-import tkinter as tk
-from tkinter import ttk, messagebox
 import threading
+import calendar
+import datetime
 import subprocess
 import platform
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import io
-import numpy as np
+import sqlite3
+import hashlib
+import json
+import shutil
+import queue
+import atexit
+import functools
+import itertools
+import multiprocessing
+from collections import OrderedDict, deque
+from contextlib import contextmanager, nullcontext
 
-# Configurar o caminho do Tesseract
-pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+class ModuloPreguicoso:
+    """Adia a importação de um módulo pesado até o primeiro uso de um atributo
+    
+    Assim scripts e a linha de comando não pagam por tkinter, PyMuPDF, NumPy
+    etc. quando a etapa que precisa deles não chega a rodar.
+    """
+    
+    def __init__(self, nome, ao_importar=None):
+        self._nome = nome
+        self._ao_importar = ao_importar
+        self._modulo = None
+        self._lock = threading.Lock()
+    
+    def _carregar(self):
+        if self._modulo is None:
+            with self._lock:
+                if self._modulo is None:
+                    modulo = importlib.import_module(self._nome)
+                    if self._ao_importar:
+                        self._ao_importar(modulo)
+                    self._modulo = modulo
+        return self._modulo
+    
+    def __getattr__(self, atributo):
+        return getattr(self._carregar(), atributo)
+
+def _configurar_tesseract(modulo):
+    # Configurar o caminho do Tesseract
+    modulo.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+
+PyPDF2 = ModuloPreguicoso('PyPDF2')
+pytesseract = ModuloPreguicoso('pytesseract', _configurar_tesseract)
+Image = ModuloPreguicoso('PIL.Image')
+ImageEnhance = ModuloPreguicoso('PIL.ImageEnhance')
+fitz = ModuloPreguicoso('fitz')  # PyMuPDF
+tk = ModuloPreguicoso('tkinter')
+ttk = ModuloPreguicoso('tkinter.ttk')
+messagebox = ModuloPreguicoso('tkinter.messagebox')
+np = ModuloPreguicoso('numpy')
+
+# Nomes das pastas de mês, em ordem
+MESES_PASTA = [
+    'JANEIRO', 'FEVEREIRO', 'MARÇO', 'ABRIL', 'MAIO', 'JUNHO',
+    'JULHO', 'AGOSTO', 'SETEMBRO', 'OUTUBRO', 'NOVEMBRO', 'DEZEMBRO'
+]
+
+def diretorio_dados_local():
+    """Retorna (e cria) a pasta local usada para índices e caches"""
+    base = os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), '.local', 'share')
+    pasta = os.path.join(base, 'ProcuraCanhotos')
+    os.makedirs(pasta, exist_ok=True)
+    return pasta
+
+class IndiceNumerico:
+    """Índice em disco (SQLite) do texto já lido de cada página e dos seus tokens numéricos
+    
+    Guarda o texto como a etapa da busca o viu (a camada de texto crua, o
+    OCR sem espaços de cada ângulo/faixa em separado), para que a busca
+    seguinte aplique a ele as mesmas regras da leitura ao vivo. A tabela
+    invertida de tokens (sequências de dígitos do texto sem espaços) aponta
+    as páginas e os arquivos candidatos a uma nota antes de abrir qualquer
+    texto: só esses passam pelas regras.
+    """
+    
+    TAMANHO_MINIMO_TOKEN = 3  # Os menores pedaços da nota usados na correspondência aproximada
+    VERSAO = 3  # Sobe quando o formato guardado muda
+    
+    def __init__(self, caminho_db=None):
+        self.caminho_db = caminho_db or os.path.join(diretorio_dados_local(), 'indice_numerico.sqlite3')
+        self._lock = threading.Lock()
+        self._assinaturas_validadas = {}
+        self._conexao = sqlite3.connect(self.caminho_db, timeout=30, check_same_thread=False)
+        self._criar_tabelas()
+    
+    def _criar_tabelas(self):
+        """Cria as tabelas do índice se ainda não existirem"""
+        with self._lock, self._conexao:
+            self._conexao.execute("PRAGMA journal_mode=WAL")
+            self._conexao.execute("""
+                CREATE TABLE IF NOT EXISTS arquivos (
+                    caminho TEXT PRIMARY KEY,
+                    mtime REAL NOT NULL,
+                    tamanho INTEGER NOT NULL,
+                    total_paginas INTEGER,
+                    completo INTEGER NOT NULL DEFAULT 0
+                )""")
+            colunas = {linha[1] for linha in self._conexao.execute("PRAGMA table_info(arquivos)")}
+            if 'completo' not in colunas:
+                self._conexao.execute("ALTER TABLE arquivos ADD COLUMN completo INTEGER NOT NULL DEFAULT 0")
+            self._conexao.execute("""
+                CREATE TABLE IF NOT EXISTS paginas (
+                    caminho TEXT NOT NULL,
+                    pagina INTEGER NOT NULL,
+                    metodo TEXT NOT NULL,
+                    completo INTEGER NOT NULL,
+                    PRIMARY KEY (caminho, pagina, metodo)
+                )""")
+            # Uma linha por leitura da página ('' para a camada de texto, o ângulo
+            # ou a faixa no OCR): textos de ângulos diferentes nunca se juntam
+            self._conexao.execute("""
+                CREATE TABLE IF NOT EXISTS textos (
+                    caminho TEXT NOT NULL,
+                    pagina INTEGER NOT NULL,
+                    metodo TEXT NOT NULL,
+                    parte TEXT NOT NULL,
+                    texto TEXT NOT NULL,
+                    PRIMARY KEY (caminho, metodo, pagina, parte)
+                ) WITHOUT ROWID""")
+            versao = self._conexao.execute("PRAGMA user_version").fetchone()[0]
+            if versao < 2:
+                # A versão 1 guardava sufixos de tokens: sem os textos, nada do que foi lido vale
+                self._conexao.execute("DROP TABLE IF EXISTS tokens")
+                self._conexao.execute("DELETE FROM paginas")
+                self._conexao.execute("UPDATE arquivos SET completo = 0")
+            # Índice invertido: token -> (arquivo, página) de cada método
+            self._conexao.execute("""
+                CREATE TABLE IF NOT EXISTS tokens (
+                    token TEXT NOT NULL,
+                    caminho TEXT NOT NULL,
+                    metodo TEXT NOT NULL,
+                    pagina INTEGER NOT NULL,
+                    PRIMARY KEY (token, caminho, metodo, pagina)
+                ) WITHOUT ROWID""")
+            self._conexao.execute(
+                "CREATE INDEX IF NOT EXISTS tokens_pagina ON tokens (caminho, metodo, pagina)")
+            if versao < 3:
+                # A versão 2 só tinha os textos: os tokens saem deles
+                self._conexao.execute("DELETE FROM tokens")
+                for caminho, metodo, pagina, texto in self._conexao.execute(
+                        "SELECT caminho, metodo, pagina, texto FROM textos").fetchall():
+                    self._conexao.executemany(
+                        "INSERT OR IGNORE INTO tokens (token, caminho, metodo, pagina) VALUES (?, ?, ?, ?)",
+                        [(token, caminho, metodo, pagina) for token in self.tokens_texto(texto)])
+            if versao < self.VERSAO:
+                self._conexao.execute(f"PRAGMA user_version = {self.VERSAO:d}")
+    
+    @classmethod
+    def tokens_texto(cls, texto):
+        """Sequências de dígitos do texto sem espaços (cobrem as do texto cru e as das regras sem espaços)"""
+        return {token for token in re.findall(r'\d+', re.sub(r'\s+', '', texto or ''))
+                if len(token) >= cls.TAMANHO_MINIMO_TOKEN}
+    
+    @classmethod
+    def fragmentos_validos(cls, fragmentos):
+        """Os fragmentos, se todos puderem ser procurados nos tokens; senão None"""
+        fragmentos = list(dict.fromkeys(fragmentos))
+        if not fragmentos or any(not fragmento.isdigit() or len(fragmento) < cls.TAMANHO_MINIMO_TOKEN
+                                 for fragmento in fragmentos):
+            return None
+        return fragmentos
+    
+    @staticmethod
+    def assinatura(caminho):
+        """Retorna (mtime, tamanho) do arquivo"""
+        info = os.stat(caminho)
+        return info.st_mtime, info.st_size
+    
+    def _remover_arquivo(self, caminho):
+        """Remove todas as entradas de um arquivo (chamar com o lock adquirido)"""
+        self._conexao.execute("DELETE FROM tokens WHERE caminho = ?", (caminho,))
+        self._conexao.execute("DELETE FROM textos WHERE caminho = ?", (caminho,))
+        self._conexao.execute("DELETE FROM paginas WHERE caminho = ?", (caminho,))
+        self._conexao.execute("DELETE FROM arquivos WHERE caminho = ?", (caminho,))
+    
+    def preparar_arquivo(self, caminho):
+        """Valida o arquivo no índice pelo mtime/tamanho, descartando dados antigos"""
+        mtime, tamanho = self.assinatura(caminho)
+        if self._assinaturas_validadas.get(caminho) == (mtime, tamanho):
+            return True
+        
+        with self._lock, self._conexao:
+            linha = self._conexao.execute(
+                "SELECT mtime, tamanho FROM arquivos WHERE caminho = ?", (caminho,)).fetchone()
+            valido = linha is not None and linha[0] == mtime and linha[1] == tamanho
+            if not valido:
+                self._remover_arquivo(caminho)
+                self._conexao.execute(
+                    "INSERT INTO arquivos (caminho, mtime, tamanho) VALUES (?, ?, ?)",
+                    (caminho, mtime, tamanho))
+        
+        self._assinaturas_validadas[caminho] = (mtime, tamanho)
+        return valido
+    
+    def registrar_pagina(self, caminho, pagina, metodo, textos, completo=True):
+        """Guarda os textos de uma página lidos por um método
+        
+        `textos` é o texto da página ou {parte: texto}, uma entrada por
+        leitura (ângulo ou faixa do OCR); partes já guardadas são substituídas.
+        """
+        self.preparar_arquivo(caminho)
+        if not isinstance(textos, dict):
+            textos = {'': textos}
+        linhas = [(caminho, pagina, metodo, str(parte), texto) for parte, texto in textos.items() if texto]
+        
+        with self._lock, self._conexao:
+            self._conexao.executemany(
+                "INSERT OR REPLACE INTO textos (caminho, pagina, metodo, parte, texto) VALUES (?, ?, ?, ?, ?)",
+                linhas)
+            if linhas:
+                # Os tokens da página saem de todas as suas leituras, inclusive as já guardadas
+                textos_pagina = self._conexao.execute(
+                    "SELECT texto FROM textos WHERE caminho = ? AND metodo = ? AND pagina = ?",
+                    (caminho, metodo, pagina)).fetchall()
+                self._conexao.execute(
+                    "DELETE FROM tokens WHERE caminho = ? AND metodo = ? AND pagina = ?", (caminho, metodo, pagina))
+                self._conexao.executemany(
+                    "INSERT INTO tokens (token, caminho, metodo, pagina) VALUES (?, ?, ?, ?)",
+                    [(token, caminho, metodo, pagina)
+                     for token in set().union(*(self.tokens_texto(texto) for texto, in textos_pagina))])
+            self._conexao.execute(
+                "INSERT INTO paginas (caminho, pagina, metodo, completo) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (caminho, pagina, metodo) DO UPDATE SET completo = MAX(completo, excluded.completo)",
+                (caminho, pagina, metodo, int(completo)))
+    
+    def definir_total_paginas(self, caminho, total_paginas):
+        """Registra o número de páginas do arquivo"""
+        self.preparar_arquivo(caminho)
+        with self._lock, self._conexao:
+            self._conexao.execute(
+                "UPDATE arquivos SET total_paginas = ? WHERE caminho = ?", (total_paginas, caminho))
+    
+    def total_paginas(self, caminho):
+        """Retorna o número de páginas registrado (ou None)"""
+        self.preparar_arquivo(caminho)
+        with self._lock:
+            linha = self._conexao.execute(
+                "SELECT total_paginas FROM arquivos WHERE caminho = ?", (caminho,)).fetchone()
+        return linha[0] if linha else None
+    
+    def marcar_arquivo_completo(self, caminho):
+        """Registra que o arquivo foi pré-processado por inteiro (indexação em segundo plano)"""
+        self.preparar_arquivo(caminho)
+        with self._lock, self._conexao:
+            self._conexao.execute("UPDATE arquivos SET completo = 1 WHERE caminho = ?", (caminho,))
+    
+    def arquivo_completo(self, caminho):
+        """Indica se o arquivo, no mtime/tamanho atual, já foi pré-processado por inteiro"""
+        self.preparar_arquivo(caminho)
+        with self._lock:
+            linha = self._conexao.execute(
+                "SELECT completo FROM arquivos WHERE caminho = ?", (caminho,)).fetchone()
+        return bool(linha and linha[0])
+    
+    def paginas_completas(self, caminho, metodo):
+        """Retorna as páginas já processadas por completo com o método"""
+        self.preparar_arquivo(caminho)
+        with self._lock:
+            linhas = self._conexao.execute(
+                "SELECT pagina FROM paginas WHERE caminho = ? AND metodo = ? AND completo = 1",
+                (caminho, metodo)).fetchall()
+        return {linha[0] for linha in linhas}
+    
+    @staticmethod
+    def _filtro_tokens(fragmentos):
+        """Condição SQL (e parâmetros) de um token de `k` que contém algum dos fragmentos"""
+        return "(" + " OR ".join(["instr(k.token, ?) > 0"] * len(fragmentos)) + ")", list(fragmentos)
+    
+    def consultar(self, caminho, metodo, completas=False, fragmentos=None):
+        """Retorna {pagina: {parte: texto}} das páginas registradas com o método
+        
+        Com `completas`, só as páginas processadas por completo (inclusive as
+        que não tinham texto algum, que voltam com um dicionário vazio). Com
+        `fragmentos`, só as páginas com um token que contenha um deles trazem
+        os textos; as demais voltam vazias, já que nenhuma regra casaria nelas.
+        """
+        self.preparar_arquivo(caminho)
+        filtro = " AND p.completo = 1" if completas else ""
+        juncao, parametros = "", []
+        fragmentos = self.fragmentos_validos(fragmentos) if fragmentos is not None else None
+        if fragmentos:
+            condicao, parametros = self._filtro_tokens(fragmentos)
+            juncao = (" AND EXISTS (SELECT 1 FROM tokens k WHERE k.caminho = p.caminho AND k.metodo = p.metodo "
+                      f"AND k.pagina = p.pagina AND {condicao})")
+        with self._lock:
+            linhas = self._conexao.execute(
+                "SELECT p.pagina, t.parte, t.texto FROM paginas p LEFT JOIN textos t "
+                f"ON t.caminho = p.caminho AND t.metodo = p.metodo AND t.pagina = p.pagina{juncao} "
+                f"WHERE p.caminho = ? AND p.metodo = ?{filtro} ORDER BY p.pagina",
+                parametros + [caminho, metodo]).fetchall()
+        paginas = {}
+        for pagina, parte, texto in linhas:
+            textos = paginas.setdefault(pagina, {})
+            if parte is not None:
+                textos[parte] = texto
+        return paginas
+    
+    def candidatos(self, fragmentos, metodo, caminhos=None):
+        """Arquivos e páginas com um token que contém algum dos fragmentos: {caminho: {paginas}}
+        
+        Consulta o índice invertido sem abrir texto nem PDF algum; `caminhos`
+        restringe a busca a esses arquivos. Arquivos alterados desde a
+        indexação ficam de fora. None se os fragmentos não servem ao índice.
+        """
+        fragmentos = self.fragmentos_validos(fragmentos)
+        if fragmentos is None:
+            return None
+        condicao, parametros = self._filtro_tokens(fragmentos)
+        consultas = [("", [])]
+        if caminhos is not None:
+            caminhos = list(caminhos)
+            consultas = [(f" AND k.caminho IN ({', '.join('?' * len(lote))})", lote)
+                         for lote in (caminhos[i:i + 500] for i in range(0, len(caminhos), 500))]
+        
+        encontrados = {}
+        with self._lock:
+            for restricao, caminhos_lote in consultas:
+                linhas = self._conexao.execute(
+                    "SELECT DISTINCT k.caminho, k.pagina FROM tokens k "
+                    f"WHERE k.metodo = ? AND {condicao}{restricao}",
+                    [metodo] + parametros + caminhos_lote).fetchall()
+                for caminho, pagina in linhas:
+                    encontrados.setdefault(caminho, set()).add(pagina)
+        
+        # Só valem as páginas de arquivos que não mudaram desde a indexação
+        for caminho in list(encontrados):
+            try:
+                if not self.preparar_arquivo(caminho):
+                    del encontrados[caminho]
+            except OSError:
+                del encontrados[caminho]
+        return encontrados
+
+_indice_padrao = None
+_indice_padrao_lock = threading.Lock()
+
+def obter_indice_padrao():
+    """Retorna o índice numérico compartilhado (ou None se não puder ser aberto)"""
+    global _indice_padrao
+    with _indice_padrao_lock:
+        if _indice_padrao is None:
+            try:
+                _indice_padrao = IndiceNumerico()
+            except Exception as e:
+                print(f"Índice numérico desativado: {e}")
+                _indice_padrao = False
+        return _indice_padrao or None
+
+class CacheOCR:
+    """Cache em disco do texto do OCR, endereçado pelo conteúdo do PDF, com descarte LRU por tamanho"""
+    
+    LIMITE_BYTES_PADRAO = 256 * 1024 * 1024
+    
+    def __init__(self, pasta=None, limite_bytes=None):
+        self.pasta = pasta or os.path.join(diretorio_dados_local(), 'cache_ocr')
+        self.limite_bytes = limite_bytes or self.LIMITE_BYTES_PADRAO
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()  # chave -> tamanho, do menos para o mais recente
+        self._total_bytes = 0
+        self._hashes = {}  # caminho -> (mtime, tamanho, hash)
+        self.acertos = 0
+        self.falhas = 0
+        self._tempo_ocr_falhas = 0.0
+        os.makedirs(self.pasta, exist_ok=True)
+        self._carregar_entradas()
+    
+    def _carregar_entradas(self):
+        """Reconstrói a ordem LRU a partir das datas de modificação dos arquivos"""
+        entradas = []
+        for raiz, _, arquivos in os.walk(self.pasta):
+            for arquivo in arquivos:
+                if not arquivo.endswith('.txt'):
+                    continue
+                info = os.stat(os.path.join(raiz, arquivo))
+                entradas.append((info.st_mtime, arquivo[:-4], info.st_size))
+        
+        for _, chave, tamanho in sorted(entradas):
+            self._entradas[chave] = tamanho
+            self._total_bytes += tamanho
+    
+    def _caminho(self, chave):
+        return os.path.join(self.pasta, chave[:2], chave + '.txt')
+    
+    def hash_conteudo(self, caminho_pdf, dados=None):
+        """Hash do conteúdo do PDF (memorizado por mtime/tamanho)
+        
+        `dados` evita reler o arquivo quando o conteúdo já está em memória.
+        """
+        info = os.stat(caminho_pdf)
+        memorizado = self._hashes.get(caminho_pdf)
+        if memorizado and memorizado[:2] == (info.st_mtime, info.st_size):
+            return memorizado[2]
+        
+        resumo = hashlib.blake2b(digest_size=20)
+        if dados is not None:
+            resumo.update(dados)
+        else:
+            with open(caminho_pdf, 'rb') as arquivo:
+                for bloco in iter(lambda: arquivo.read(1024 * 1024), b''):
+                    resumo.update(bloco)
+        
+        self._hashes[caminho_pdf] = (info.st_mtime, info.st_size, resumo.hexdigest())
+        return resumo.hexdigest()
+    
+    @staticmethod
+    def chave(hash_arquivo, pagina, angulo, matriz, config):
+        """Chave do cache para uma página/ângulo/resolução/configuração"""
+        bruto = f"{hash_arquivo}|{pagina}|{angulo}|{matriz}|{config}"
+        return hashlib.blake2b(bruto.encode('utf-8'), digest_size=20).hexdigest()
+    
+    def obter(self, chave, contar=True):
+        """Retorna o texto guardado ou None"""
+        with self._lock:
+            presente = chave in self._entradas
+            if presente:
+                self._entradas.move_to_end(chave)
+            if contar:
+                if presente:
+                    self.acertos += 1
+                else:
+                    self.falhas += 1
+        if not presente:
+            return None
+        
+        caminho = self._caminho(chave)
+        try:
+            with open(caminho, 'r', encoding='utf-8') as arquivo:
+                texto = arquivo.read()
+            os.utime(caminho)  # Mantém a ordem LRU entre execuções
+            return texto
+        except OSError:
+            with self._lock:
+                self._total_bytes -= self._entradas.pop(chave, 0)
+            return None
+    
+    def registrar_acertos(self, quantidade):
+        """Contabiliza acertos obtidos com obter(..., contar=False)"""
+        with self._lock:
+            self.acertos += quantidade
+    
+    def guardar(self, chave, texto, tempo_ocr=0.0):
+        """Guarda o texto do OCR e descarta as entradas mais antigas se passar do limite"""
+        caminho = self._caminho(chave)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        temporario = f"{caminho}.{threading.get_ident()}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(texto)
+        os.replace(temporario, caminho)
+        tamanho = os.path.getsize(caminho)
+        
+        removidas = []
+        with self._lock:
+            self._tempo_ocr_falhas += tempo_ocr
+            self._total_bytes += tamanho - self._entradas.pop(chave, 0)
+            self._entradas[chave] = tamanho
+            while self._total_bytes > self.limite_bytes and len(self._entradas) > 1:
+                chave_antiga, tamanho_antigo = self._entradas.popitem(last=False)
+                self._total_bytes -= tamanho_antigo
+                removidas.append(chave_antiga)
+        
+        for chave_antiga in removidas:
+            try:
+                os.remove(self._caminho(chave_antiga))
+            except OSError:
+                pass
+    
+    def estatisticas(self):
+        """Acertos, falhas, ocupação e tempo de OCR estimado como economizado"""
+        with self._lock:
+            tempo_medio = self._tempo_ocr_falhas / self.falhas if self.falhas else 0.0
+            return {
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'entradas': len(self._entradas),
+                'bytes': self._total_bytes,
+                'tempo_economizado': self.acertos * tempo_medio,
+            }
+
+_cache_ocr_padrao = None
+_cache_ocr_padrao_lock = threading.Lock()
+
+def obter_cache_ocr_padrao():
+    """Retorna o cache de OCR compartilhado (ou None se não puder ser criado)"""
+    global _cache_ocr_padrao
+    with _cache_ocr_padrao_lock:
+        if _cache_ocr_padrao is None:
+            try:
+                _cache_ocr_padrao = CacheOCR()
+            except Exception as e:
+                print(f"Cache de OCR desativado: {e}")
+                _cache_ocr_padrao = False
+        return _cache_ocr_padrao or None
+
+class CachePDF:
+    """Cópia local dos PDFs lidos do compartilhamento, validada por tamanho/mtime, com descarte LRU por tamanho
+
+    O arquivo atravessa a rede uma vez (na busca ou na leitura antecipada da
+    pasta do dia); as leituras seguintes saem do disco local enquanto o
+    tamanho e o mtime do original não mudarem, o que custa só um stat.
+    """
+
+    LIMITE_BYTES_PADRAO = 1024 * 1024 * 1024
+    BLOCO = 1024 * 1024
+
+    def __init__(self, pasta=None, limite_bytes=None):
+        self.pasta = pasta or os.path.join(diretorio_dados_local(), 'cache_pdf')
+        self.limite_bytes = limite_bytes or self.LIMITE_BYTES_PADRAO
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()  # chave -> tamanho, do menos para o mais recente
+        self._total_bytes = 0
+        self._versoes = {}  # caminho -> chave da cópia atual
+        self._copias = {}  # chave -> [lock da cópia, threads que o usam]
+        self._geracao = 0  # Cada leitura antecipada nova encerra a anterior
+        self.acertos = 0
+        self.falhas = 0
+        self.bytes_rede = 0
+        os.makedirs(self.pasta, exist_ok=True)
+        self._carregar_entradas()
+
+    def _carregar_entradas(self):
+        """Reconstrói a ordem LRU a partir das datas de modificação das cópias"""
+        entradas = []
+        for raiz, _, arquivos in os.walk(self.pasta):
+            for arquivo in arquivos:
+                if arquivo.endswith('.tmp'):
+                    # Cópia interrompida (leitura antecipada no fim do processo)
+                    self._remover_arquivo(os.path.join(raiz, arquivo))
+                if not arquivo.endswith('.pdf'):
+                    continue
+                info = os.stat(os.path.join(raiz, arquivo))
+                entradas.append((info.st_mtime, arquivo[:-4], info.st_size))
+
+        for _, chave, tamanho in sorted(entradas):
+            self._entradas[chave] = tamanho
+            self._total_bytes += tamanho
+
+    def _caminho(self, chave):
+        return os.path.join(self.pasta, chave[:2], chave + '.pdf')
+
+    @staticmethod
+    def chave(caminho, tamanho, mtime):
+        """Chave da cópia de uma versão (tamanho/mtime) do arquivo"""
+        bruto = f"{os.path.normcase(os.path.abspath(caminho))}|{tamanho}|{mtime}"
+        return hashlib.blake2b(bruto.encode('utf-8'), digest_size=20).hexdigest()
+
+    @staticmethod
+    def _remover_arquivo(caminho):
+        try:
+            os.remove(caminho)
+        except OSError:
+            pass  # Aberto por outra thread (Windows): fica para o próximo carregamento
+
+    def caminho_local(self, caminho):
+        """Caminho da cópia local do PDF, trazendo-o da rede se preciso
+
+        Arquivos maiores que o limite não são copiados: volta o caminho original.
+        """
+        info = os.stat(caminho)
+        if info.st_size > self.limite_bytes:
+            return caminho
+        chave = self.chave(caminho, info.st_size, info.st_mtime)
+        local = self._caminho(chave)
+
+        with self._lock:
+            uso = self._copias.setdefault(chave, [threading.Lock(), 0])
+            uso[1] += 1
+        # Uma cópia por arquivo: quem chega durante a cópia espera e usa a local.
+        # O lock só sai do dicionário com o último usuário; se saísse com o
+        # primeiro, quem chegasse depois criaria outro e copiaria junto
+        try:
+            with uso[0]:
+                return self._copiar(caminho, info, chave, local)
+        finally:
+            with self._lock:
+                uso[1] -= 1
+                if not uso[1]:
+                    del self._copias[chave]
+
+    def _copiar(self, caminho, info, chave, local):
+        """Usa a cópia local se estiver no cache; senão copia o original (com o lock do arquivo)"""
+        with self._lock:
+            presente = chave in self._entradas
+            if presente:
+                self._entradas.move_to_end(chave)
+        if presente and os.path.exists(local):
+            try:
+                os.utime(local)  # Mantém a ordem LRU entre execuções
+            except OSError:
+                pass
+            with self._lock:
+                self.acertos += 1
+            return local
+
+        os.makedirs(os.path.dirname(local), exist_ok=True)
+        temporario = f"{local}.{threading.get_ident()}.tmp"
+        try:
+            with open(caminho, 'rb') as origem, open(temporario, 'wb') as destino:
+                shutil.copyfileobj(origem, destino, self.BLOCO)
+            os.replace(temporario, local)
+        except OSError:
+            self._remover_arquivo(temporario)
+            raise
+
+        removidas = []
+        with self._lock:
+            self.falhas += 1
+            self.bytes_rede += info.st_size
+            self._total_bytes += info.st_size - self._entradas.pop(chave, 0)
+            self._entradas[chave] = info.st_size
+            anterior = self._versoes.get(caminho)
+            self._versoes[caminho] = chave
+            if anterior and anterior != chave and anterior in self._entradas:
+                # Versão antiga do mesmo arquivo não serve mais
+                self._total_bytes -= self._entradas.pop(anterior)
+                removidas.append(anterior)
+            while self._total_bytes > self.limite_bytes and len(self._entradas) > 1:
+                chave_antiga, tamanho_antigo = self._entradas.popitem(last=False)
+                self._total_bytes -= tamanho_antigo
+                removidas.append(chave_antiga)
+
+        for chave_antiga in removidas:
+            self._remover_arquivo(self._caminho(chave_antiga))
+        return local
+
+    def ler(self, caminho):
+        """Conteúdo do PDF, da cópia local (o original se a cópia sumiu no meio do caminho)"""
+        local = self.caminho_local(caminho)
+        try:
+            with open(local, 'rb') as arquivo:
+                return arquivo.read()
+        except OSError:
+            if local == caminho:
+                raise
+        with open(caminho, 'rb') as arquivo:
+            return arquivo.read()
+
+    def pre_carregar(self, caminhos):
+        """Copia os PDFs em segundo plano, na ordem dada, até metade do limite
+
+        Uma nova chamada encerra a leitura antecipada anterior.
+        """
+        with self._lock:
+            self._geracao += 1
+            geracao = self._geracao
+
+        def copiar():
+            total = 0
+            for caminho in caminhos:
+                if self._geracao != geracao:
+                    return
+                try:
+                    total += os.stat(caminho).st_size
+                    if total > self.limite_bytes // 2:
+                        return
+                    self.caminho_local(caminho)
+                except OSError:
+                    continue
+
+        thread = threading.Thread(target=copiar, name='cache_pdf', daemon=True)
+        thread.start()
+        return thread
+
+    def estatisticas(self):
+        """Acertos, falhas, bytes trazidos da rede e ocupação"""
+        with self._lock:
+            return {
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'bytes_rede': self.bytes_rede,
+                'entradas': len(self._entradas),
+                'bytes': self._total_bytes,
+            }
+
+_cache_pdf_padrao = None
+_cache_pdf_padrao_lock = threading.Lock()
+
+def obter_cache_pdf_padrao():
+    """Retorna o cache local de PDFs compartilhado (ou None se não puder ser criado)"""
+    global _cache_pdf_padrao
+    with _cache_pdf_padrao_lock:
+        if _cache_pdf_padrao is None:
+            try:
+                _cache_pdf_padrao = CachePDF()
+            except Exception as e:
+                print(f"Cache local de PDFs desativado: {e}")
+                _cache_pdf_padrao = False
+        return _cache_pdf_padrao or None
+
+class ManifestoPastas:
+    """Listagens das pastas (mês → dia → PDFs) em memória, com tamanho e mtime dos arquivos
+
+    Cada pasta é lida uma vez com os.scandir (no Windows o tamanho e o mtime
+    vêm na própria listagem); depois um stat da pasta basta para revalidar,
+    porque criar, apagar ou renomear uma entrada muda o mtime dela. Um
+    arquivo regravado no lugar não muda a pasta: o tamanho/mtime guardado é
+    o da listagem, e quem precisa do atual (o índice) consulta o arquivo.
+    """
+
+    MARGEM_MTIME = 2.0  # Pasta alterada há menos que isso pode mudar de novo sem mudar o mtime
+
+    def __init__(self):
+        self._pastas = {}  # caminho: (mtime, instavel, subpastas, {arquivo: (tamanho, mtime)})
+        self._lock = threading.Lock()
+        self.leituras = 0
+        self.revalidacoes = 0
+
+    def _ler(self, caminho):
+        subpastas, arquivos = [], {}
+        with os.scandir(caminho) as entradas:
+            for entrada in entradas:
+                try:
+                    if entrada.is_dir():
+                        subpastas.append(entrada.name)
+                    elif entrada.is_file():
+                        info = entrada.stat()
+                        arquivos[entrada.name] = (info.st_size, info.st_mtime)
+                except OSError:
+                    continue
+        return subpastas, arquivos
+
+    def pasta(self, caminho):
+        """(subpastas, {arquivo: (tamanho, mtime)}) da pasta; OSError se ela não existe"""
+        mtime = os.stat(caminho).st_mtime
+        with self._lock:
+            entrada = self._pastas.get(caminho)
+            if entrada is not None and entrada[0] == mtime and not entrada[1]:
+                self.revalidacoes += 1
+                return entrada[2], entrada[3]
+
+        lida_em = time.time()
+        subpastas, arquivos = self._ler(caminho)
+        with self._lock:
+            self.leituras += 1
+            self._pastas[caminho] = (mtime, lida_em - mtime < self.MARGEM_MTIME, subpastas, arquivos)
+        return subpastas, arquivos
+
+    def existe_pasta(self, caminho):
+        try:
+            self.pasta(caminho)
+            return True
+        except OSError:
+            return False
+
+    def subpastas(self, caminho):
+        return list(self.pasta(caminho)[0])
+
+    def arquivos(self, caminho):
+        """{arquivo: (tamanho, mtime)} da pasta"""
+        return dict(self.pasta(caminho)[1])
+
+    def entradas(self, caminho):
+        """Nomes das subpastas e arquivos (como os.listdir)"""
+        subpastas, arquivos = self.pasta(caminho)
+        return subpastas + list(arquivos)
+
+    def percorrer(self, caminho):
+        """Gera (caminho_arquivo, tamanho, mtime) de toda a árvore, como os.walk sem stat por arquivo"""
+        try:
+            subpastas, arquivos = self.pasta(caminho)
+        except OSError:
+            return
+        for nome, (tamanho, mtime) in arquivos.items():
+            yield os.path.join(caminho, nome), tamanho, mtime
+        for subpasta in subpastas:
+            yield from self.percorrer(os.path.join(caminho, subpasta))
+
+    def invalidar(self, caminho=None):
+        """Descarta a listagem de uma pasta (ou de todas)"""
+        with self._lock:
+            if caminho is None:
+                self._pastas.clear()
+            else:
+                self._pastas.pop(caminho, None)
+
+_manifesto_padrao = None
+_manifesto_padrao_lock = threading.Lock()
+
+def obter_manifesto_padrao():
+    """Retorna o manifesto de pastas compartilhado"""
+    global _manifesto_padrao
+    with _manifesto_padrao_lock:
+        if _manifesto_padrao is None:
+            _manifesto_padrao = ManifestoPastas()
+        return _manifesto_padrao
+
+def memoria_fisica():
+    """Memória física da máquina em bytes (None se o sistema não informar)"""
+    try:
+        if platform.system() == "Windows":
+            import ctypes
+            class EstadoMemoria(ctypes.Structure):
+                _fields_ = [('dwLength', ctypes.c_ulong), ('dwMemoryLoad', ctypes.c_ulong),
+                            ('ullTotalPhys', ctypes.c_ulonglong), ('ullAvailPhys', ctypes.c_ulonglong),
+                            ('ullTotalPageFile', ctypes.c_ulonglong), ('ullAvailPageFile', ctypes.c_ulonglong),
+                            ('ullTotalVirtual', ctypes.c_ulonglong), ('ullAvailVirtual', ctypes.c_ulonglong),
+                            ('ullAvailExtendedVirtual', ctypes.c_ulonglong)]
+            estado = EstadoMemoria()
+            estado.dwLength = ctypes.sizeof(estado)
+            if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(estado)):
+                return estado.ullTotalPhys
+            return None
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+@functools.lru_cache(maxsize=None)
+def _contadores_memoria_windows():
+    """GetProcessMemoryInfo já configurado e a estrutura PROCESS_MEMORY_COUNTERS"""
+    import ctypes
+    from ctypes import wintypes
+    class Contadores(ctypes.Structure):
+        _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD)] + [
+            (nome, ctypes.c_size_t) for nome in (
+                'PeakWorkingSetSize', 'WorkingSetSize', 'QuotaPeakPagedPoolUsage', 'QuotaPagedPoolUsage',
+                'QuotaPeakNonPagedPoolUsage', 'QuotaNonPagedPoolUsage', 'PagefileUsage', 'PeakPagefileUsage')]
+    kernel32 = ctypes.windll.kernel32
+    kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+    funcao = ctypes.windll.psapi.GetProcessMemoryInfo
+    funcao.argtypes = [wintypes.HANDLE, ctypes.POINTER(Contadores), wintypes.DWORD]
+    return funcao, Contadores, kernel32.GetCurrentProcess()
+
+def memoria_processo():
+    """(residente, pico) do processo em bytes; None no que o sistema não informar
+    
+    O pico é o do sistema (PeakWorkingSetSize, VmHWM ou ru_maxrss) e vale
+    para a vida toda do processo.
+    """
+    try:
+        if platform.system() == "Windows":
+            import ctypes
+            funcao, Contadores, processo = _contadores_memoria_windows()
+            contadores = Contadores()
+            contadores.cb = ctypes.sizeof(contadores)
+            if funcao(processo, ctypes.byref(contadores), contadores.cb):
+                return contadores.WorkingSetSize, contadores.PeakWorkingSetSize
+            return None, None
+        
+        with open('/proc/self/status', encoding='ascii') as status:
+            valores = {}
+            for linha in status:
+                if linha.startswith(('VmRSS:', 'VmHWM:')):
+                    nome, quantidade = linha.split()[:2]
+                    valores[nome] = int(quantidade) * 1024
+        return valores.get('VmRSS:'), valores.get('VmHWM:')
+    except Exception:
+        pass
+    
+    try:
+        import resource
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return None, pico if platform.system() == "Darwin" else pico * 1024
+    except Exception:
+        return None, None
+
+class MonitorMemoria:
+    """Pico de memória residente (RSS) do processo durante uma busca (context manager)
+    
+    Se o pico do sistema subiu durante a busca, ele é o pico da busca; senão
+    o pico vem de amostras do RSS atual, feitas por uma thread a cada
+    INTERVALO segundos. Com `orcamento` (OrcamentoMemoria), o pico reservado
+    nele também é reiniciado no início.
+    """
+    
+    INTERVALO = 0.05
+    
+    def __init__(self, orcamento=None):
+        self.orcamento = orcamento
+        self.pico = None
+        self._pico_inicial = None
+        self._amostrado = None
+        self._parar = threading.Event()
+        self._thread = None
+    
+    def __enter__(self):
+        if self.orcamento:
+            self.orcamento.reiniciar_pico()
+        self._amostrado, self._pico_inicial = memoria_processo()
+        self._parar.clear()
+        if self._amostrado is not None:
+            self._thread = threading.Thread(target=self._amostrar, name="MonitorMemoria", daemon=True)
+            self._thread.start()
+        return self
+    
+    def _amostrar(self):
+        while not self._parar.wait(self.INTERVALO):
+            residente, _ = memoria_processo()
+            if residente is not None:
+                self._amostrado = max(self._amostrado, residente)
+    
+    def __exit__(self, *_):
+        self._parar.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        residente, pico = memoria_processo()
+        if residente is not None and self._amostrado is not None:
+            self._amostrado = max(self._amostrado, residente)
+        
+        if pico is not None and (self._pico_inicial is None or pico > self._pico_inicial or self._amostrado is None):
+            self.pico = pico
+        else:
+            self.pico = self._amostrado
+    
+    def texto(self):
+        """Linha para o log com o pico da busca e o uso do orçamento de memória"""
+        partes = [f"pico RSS {self.pico / (1024 * 1024):.0f} MB" if self.pico else "pico RSS indisponível"]
+        if self.orcamento:
+            estatisticas = self.orcamento.estatisticas()
+            partes.append(f"orçamento {estatisticas['pico'] / (1024 * 1024):.0f}/"
+                          f"{estatisticas['limite'] / (1024 * 1024):.0f} MB, "
+                          f"{estatisticas['esperas']} espera(s)")
+        return ', '.join(partes)
+
+class OrcamentoMemoria:
+    """Semáforo de bytes para as páginas entre a renderização e o fim do OCR
+    
+    Cada página reserva a memória estimada (pixels × BYTES_POR_PIXEL) antes
+    de renderizar e devolve ao terminar; com o orçamento cheio as threads
+    esperam, em vez de cada uma ter a sua página grande em memória ao mesmo
+    tempo. Uma página maior que o orçamento inteiro roda sozinha.
+    """
+    
+    # Render em cinza (1) + pico do PreprocessadorOCR (~14, buffers float32)
+    # + imagem binarizada (1) + cópia para o motor (rotação ou envio ao processo)
+    BYTES_POR_PIXEL = 17
+    LIMITE_MAXIMO = 1024 * 1024 * 1024
+    LIMITE_SEM_INFORMACAO = 512 * 1024 * 1024
+    FRACAO_MEMORIA_FISICA = 0.25
+    
+    def __init__(self, limite_bytes=None):
+        if not limite_bytes:
+            fisica = memoria_fisica()
+            limite_bytes = (min(self.LIMITE_MAXIMO, int(fisica * self.FRACAO_MEMORIA_FISICA)) if fisica
+                            else self.LIMITE_SEM_INFORMACAO)
+        self.limite_bytes = limite_bytes
+        self._condicao = threading.Condition()
+        self._em_uso = 0
+        self.pico = 0
+        self.esperas = 0
+        self.tempo_espera = 0.0
+    
+    def adquirir(self, quantidade, bloquear=True):
+        """Reserva `quantidade` bytes e retorna o valor reservado (a devolver em liberar)
+        
+        Com bloquear=False, retorna None em vez de esperar se não couber.
+        """
+        quantidade = min(quantidade, self.limite_bytes)
+        with self._condicao:
+            if self._em_uso + quantidade > self.limite_bytes:
+                if not bloquear:
+                    return None
+                self.esperas += 1
+                inicio = time.perf_counter()
+                while self._em_uso + quantidade > self.limite_bytes:
+                    self._condicao.wait()
+                self.tempo_espera += time.perf_counter() - inicio
+            self._em_uso += quantidade
+            self.pico = max(self.pico, self._em_uso)
+            return quantidade
+    
+    def liberar(self, quantidade):
+        with self._condicao:
+            self._em_uso -= quantidade
+            self._condicao.notify_all()
+    
+    def reiniciar_pico(self):
+        with self._condicao:
+            self.pico = self._em_uso
+            self.esperas = 0
+            self.tempo_espera = 0.0
+    
+    def estatisticas(self):
+        with self._condicao:
+            return {
+                'limite': self.limite_bytes,
+                'em_uso': self._em_uso,
+                'pico': self.pico,
+                'esperas': self.esperas,
+                'tempo_espera': self.tempo_espera,
+            }
+
+_orcamento_memoria_padrao = None
+_orcamento_memoria_padrao_lock = threading.Lock()
+
+def obter_orcamento_memoria_padrao():
+    """Retorna o orçamento de memória compartilhado pelas buscas (todos os localizadores)"""
+    global _orcamento_memoria_padrao
+    with _orcamento_memoria_padrao_lock:
+        if _orcamento_memoria_padrao is None:
+            _orcamento_memoria_padrao = OrcamentoMemoria()
+        return _orcamento_memoria_padrao
+
+class RegistroLog:
+    """Buffer circular do log de uma busca, com níveis, seguro entre threads
+    
+    As threads da busca só acrescentam mensagens (sob um lock curto, sem E/S);
+    quem mostra o log (a interface, o eco no console) lê em lotes a partir
+    de um cursor. A memória é limitada: no máximo CAPACIDADE mensagens de até
+    MAX_CARACTERES cada, descartando as mais antigas.
+    """
+    
+    NIVEIS = {'debug': 10, 'info': 20, 'aviso': 30, 'erro': 40}
+    CAPACIDADE = 5000
+    MAX_CARACTERES = 1000
+    
+    def __init__(self, capacidade=None, eco=True):
+        self._entradas = deque(maxlen=capacidade or self.CAPACIDADE)
+        self._lock = threading.Lock()
+        self._proximo = 0  # Sequência da próxima mensagem (os cursores apontam para ela)
+        self._limpo_ate = 0  # Mensagens antes desta foram limpas, não perdidas
+        self.eco = eco  # Repete as mensagens no console (ver EcoConsole)
+    
+    def registrar(self, mensagem, nivel='debug'):
+        """Acrescenta uma mensagem; nunca espera por E/S"""
+        mensagem = str(mensagem)
+        if len(mensagem) > self.MAX_CARACTERES:
+            mensagem = mensagem[:self.MAX_CARACTERES] + '…'
+        with self._lock:
+            self._entradas.append((self._proximo, time.time(), nivel, mensagem))
+            self._proximo += 1
+        if self.eco:
+            obter_eco_console().registro.registrar(mensagem, nivel)
+    
+    def ler(self, cursor=0, limite=None, nivel_minimo='debug'):
+        """Mensagens a partir do cursor: (entradas, novo_cursor, perdidas)
+        
+        `entradas` são (instante, nivel, mensagem) com nível a partir de
+        `nivel_minimo`; `perdidas` conta as que o buffer descartou antes de
+        serem lidas.
+        """
+        with self._lock:
+            inicio = max(cursor, self._limpo_ate)
+            primeiro = self._proximo - len(self._entradas)
+            pular = max(0, inicio - primeiro)
+            lidas = list(itertools.islice(self._entradas, pular, None if limite is None else pular + limite))
+            novo_cursor = lidas[-1][0] + 1 if lidas else max(inicio, primeiro)
+        
+        minimo = self.NIVEIS.get(nivel_minimo, 0)
+        entradas = [(instante, nivel, mensagem) for _, instante, nivel, mensagem in lidas
+                    if self.NIVEIS.get(nivel, 0) >= minimo]
+        return entradas, novo_cursor, max(0, primeiro - inicio)
+    
+    def mensagens(self, nivel_minimo='debug'):
+        """Textos das mensagens ainda no buffer"""
+        return [mensagem for _, _, mensagem in self.ler(0, nivel_minimo=nivel_minimo)[0]]
+    
+    def limpar(self):
+        """Descarta as mensagens atuais (início de uma nova busca)"""
+        with self._lock:
+            self._entradas.clear()
+            self._limpo_ate = self._proximo
+
+class EcoConsole:
+    """Imprime no console, em lotes e numa thread própria, as mensagens dos logs com eco"""
+    
+    INTERVALO = 0.1
+    
+    def __init__(self):
+        self.registro = RegistroLog(eco=False)
+        self._cursor = 0
+        self._lock = threading.Lock()
+        threading.Thread(target=self._executar, name="EcoConsole", daemon=True).start()
+        atexit.register(self.descarregar)
+    
+    def _executar(self):
+        while True:
+            time.sleep(self.INTERVALO)
+            self.descarregar()
+    
+    def descarregar(self):
+        """Imprime as mensagens pendentes"""
+        with self._lock:
+            entradas, self._cursor, perdidas = self.registro.ler(self._cursor)
+            linhas = [f"AVISO: {perdidas} mensagem(ns) do log descartada(s)\n"] if perdidas else []
+            linhas += [f"{nivel.upper()}: {mensagem}\n" for _, nivel, mensagem in entradas]
+            if not linhas:
+                return
+            try:
+                sys.stdout.write(''.join(linhas))
+                sys.stdout.flush()
+            except Exception:
+                pass  # Sem console (pythonw)
+
+_eco_console = None
+_eco_console_lock = threading.Lock()
+
+def obter_eco_console():
+    """Retorna o eco no console compartilhado pelos logs"""
+    global _eco_console
+    with _eco_console_lock:
+        if _eco_console is None:
+            _eco_console = EcoConsole()
+        return _eco_console
+
+class Rastreador:
+    """Spans de tempo de uma busca (etapa, arquivo, página), com resumo e exportação
+    
+    Cada span herda os atributos dos spans abertos acima dele na mesma thread,
+    então o OCR de um ângulo fica marcado com o arquivo que está sendo
+    processado. O resumo traz o tempo total e o exclusivo (sem os spans
+    filhos) de cada etapa.
+    """
+    
+    LIMITE_SPANS = 200000  # O indexador em segundo plano não reinicia o rastreador
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._ids = itertools.count()
+        self.reiniciar()
+    
+    def reiniciar(self):
+        with self._lock:
+            self.spans = []
+            self.descartados = 0
+            self.inicio = time.perf_counter()
+    
+    def _pilha(self):
+        pilha = getattr(self._local, 'pilha', None)
+        if pilha is None:
+            pilha = self._local.pilha = []
+        return pilha
+    
+    @contextmanager
+    def span(self, nome, **atributos):
+        pilha = self._pilha()
+        pai = pilha[-1] if pilha else None
+        if pai is not None:
+            atributos = dict(pai['atributos'], **atributos)
+        registro = {'nome': nome, 'atributos': atributos, 'pai': pai['id'] if pai else None,
+                    'id': next(self._ids), 'thread': threading.get_ident()}
+        pilha.append(registro)
+        inicio = time.perf_counter()
+        try:
+            yield registro
+        finally:
+            fim = time.perf_counter()
+            pilha.pop()
+            registro['inicio'] = inicio - self.inicio
+            registro['duracao'] = fim - inicio
+            with self._lock:
+                if len(self.spans) < self.LIMITE_SPANS:
+                    self.spans.append(registro)
+                else:
+                    self.descartados += 1
+    
+    def resumo(self):
+        """{etapa: {'total', 'exclusivo', 'chamadas', 'maximo'}} em segundos"""
+        with self._lock:
+            spans = list(self.spans)
+        filhos = {}
+        for registro in spans:
+            if registro['pai'] is not None:
+                filhos[registro['pai']] = filhos.get(registro['pai'], 0.0) + registro['duracao']
+        
+        resumo = {}
+        for registro in spans:
+            etapa = resumo.setdefault(registro['nome'], {'total': 0.0, 'exclusivo': 0.0, 'chamadas': 0, 'maximo': 0.0})
+            etapa['total'] += registro['duracao']
+            etapa['exclusivo'] += max(0.0, registro['duracao'] - filhos.get(registro['id'], 0.0))
+            etapa['chamadas'] += 1
+            etapa['maximo'] = max(etapa['maximo'], registro['duracao'])
+        return resumo
+    
+    def texto_resumo(self, limite=8):
+        """Resumo em uma linha para o log (tempo exclusivo, etapas mais caras primeiro)"""
+        etapas = sorted(self.resumo().items(), key=lambda item: -item[1]['exclusivo'])[:limite]
+        return ', '.join(f"{nome} {dados['exclusivo']:.2f}s/{dados['chamadas']}x" for nome, dados in etapas)
+    
+    def exportar(self, caminho, formato='chrome'):
+        """Grava os spans em JSON simples ou no formato do chrome://tracing (Perfetto)"""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda registro: registro['inicio'])
+        
+        if formato == 'chrome':
+            dados = {'traceEvents': [{
+                'name': registro['nome'],
+                'cat': 'busca',
+                'ph': 'X',
+                'ts': round(registro['inicio'] * 1e6, 1),
+                'dur': round(registro['duracao'] * 1e6, 1),
+                'pid': os.getpid(),
+                'tid': registro['thread'],
+                'args': registro['atributos'],
+            } for registro in spans], 'displayTimeUnit': 'ms'}
+        else:
+            dados = {
+                'spans': [{chave: registro[chave] for chave in ('nome', 'inicio', 'duracao', 'thread', 'atributos')}
+                          for registro in spans],
+                'resumo': self.resumo(),
+                'descartados': self.descartados,
+            }
+        
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            json.dump(dados, arquivo, ensure_ascii=False, default=str)
+
+class RastreadorNulo:
+    """Rastreador que não registra nada (componentes usados fora de um localizador)"""
+    
+    def span(self, nome, **atributos):
+        return nullcontext()
+
+def rastrear_arquivo(metodo):
+    """Registra o processamento de um PDF inteiro como um span 'arquivo' do localizador"""
+    @functools.wraps(metodo)
+    def rastreado(self, pdf, *args, **kwargs):
+        caminho = pdf[0] if isinstance(pdf, tuple) else pdf
+        with self.rastreador.span('arquivo', arquivo=os.path.basename(caminho)):
+            return metodo(self, pdf, *args, **kwargs)
+    return rastreado
+
+class _VistaPixmap:
+    """Expõe o buffer de um pixmap do PyMuPDF ao NumPy; o array criado mantém o pixmap vivo"""
+    
+    def __init__(self, pix):
+        self.pix = pix
+        self.__array_interface__ = {
+            'shape': (pix.height, pix.width) if pix.n == 1 else (pix.height, pix.width, pix.n),
+            'strides': None if pix.stride == pix.width * pix.n else
+                       ((pix.stride, 1) if pix.n == 1 else (pix.stride, pix.n, 1)),
+            'typestr': '|u1',
+            'data': (pix.samples_ptr, False),
+            'version': 3,
+        }
+
+class DocumentoPDF:
+    """Sessão de um PDF: lê o arquivo uma única vez e serve páginas, texto e renderizações"""
+    
+    def __init__(self, caminho, rastreador=None, cache=None):
+        self.caminho = caminho
+        self.rastreador = rastreador if rastreador is not None else RastreadorNulo()
+        # Uma única leitura do compartilhamento de rede (ou da cópia local em
+        # `cache`, um CachePDF); tudo mais sai deste buffer
+        with self.rastreador.span('leitura_pdf'):
+            if cache:
+                self.dados = cache.ler(caminho)
+            else:
+                with open(caminho, 'rb') as arquivo:
+                    self.dados = arquivo.read()
+        self._lock = threading.Lock()
+        self._doc_fitz = None
+        self._leitor_pypdf2 = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *_):
+        self.fechar()
+    
+    @property
+    def doc_fitz(self):
+        if self._doc_fitz is None:
+            with self.rastreador.span('abertura_pdf'):
+                self._doc_fitz = fitz.open(stream=self.dados, filetype='pdf')
+        return self._doc_fitz
+    
+    @property
+    def leitor_pypdf2(self):
+        if self._leitor_pypdf2 is None:
+            with self.rastreador.span('abertura_pdf'):
+                self._leitor_pypdf2 = PyPDF2.PdfReader(io.BytesIO(self.dados))
+        return self._leitor_pypdf2
+    
+    @property
+    def total_paginas(self):
+        with self._lock:
+            return len(self.doc_fitz)
+    
+    def texto_pypdf2(self, num_pagina):
+        """Texto da página extraído pelo PyPDF2"""
+        with self._lock, self.rastreador.span('texto', pagina=num_pagina + 1):
+            return self.leitor_pypdf2.pages[num_pagina].extract_text()
+    
+    def texto_fitz(self, num_pagina):
+        """Texto da página extraído pelo PyMuPDF"""
+        with self._lock, self.rastreador.span('texto', pagina=num_pagina + 1):
+            return self.doc_fitz.load_page(num_pagina).get_text()
+    
+    def pixmap(self, num_pagina, escala, cinza=True, angulo=0, recorte=None):
+        """Pixmap da página sem canal alfa, já girado e recortado pelo próprio PyMuPDF
+        
+        `angulo` segue a convenção de Image.rotate (anti-horário) e `recorte`
+        é (x0, y0, x1, y1) em pontos da página, antes da escala.
+        """
+        with self._lock, self.rastreador.span('render', pagina=num_pagina + 1, escala=escala):
+            pagina = self.doc_fitz.load_page(num_pagina)
+            matriz = fitz.Matrix(escala, escala)
+            if angulo:
+                matriz.prerotate(-angulo)
+            return pagina.get_pixmap(matrix=matriz, colorspace=fitz.csGRAY if cinza else fitz.csRGB,
+                                     alpha=False, clip=fitz.Rect(recorte) if recorte else None)
+    
+    def tamanho_pagina(self, num_pagina):
+        """(largura, altura) da página em pontos"""
+        with self._lock:
+            retangulo = self.doc_fitz.load_page(num_pagina).rect
+        return retangulo.width, retangulo.height
+    
+    def pixels_pagina(self, num_pagina, escala):
+        """Número de pixels da página renderizada na escala, sem renderizar"""
+        largura, altura = self.tamanho_pagina(num_pagina)
+        return int(largura * escala) * int(altura * escala)
+    
+    def renderizar_array(self, num_pagina, escala, angulo=0, recorte=None):
+        """Página em tons de cinza como array NumPy (altura, largura) sobre o buffer do pixmap, sem cópia"""
+        return np.asarray(_VistaPixmap(self.pixmap(num_pagina, escala, True, angulo, recorte)))
+    
+    def renderizar(self, num_pagina, escala, cinza=False, angulo=0, recorte=None):
+        """Renderiza a página como imagem PIL (RGB, ou 'L' com cinza=True) na escala informada"""
+        if cinza:
+            return Image.fromarray(self.renderizar_array(num_pagina, escala, angulo, recorte), 'L')
+        pix = self.pixmap(num_pagina, escala, False, angulo, recorte)
+        return Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+    
+    def fechar(self):
+        with self._lock:
+            if self._doc_fitz is not None:
+                self._doc_fitz.close()
+                self._doc_fitz = None
+            self._leitor_pypdf2 = None
+
+class MotorTextoPyMuPDF:
+    """Extração da camada de texto pelo PyMuPDF (código nativo, libera o GIL)"""
+    
+    nome = 'pymupdf'
+    
+    def texto(self, documento, num_pagina):
+        return documento.texto_fitz(num_pagina)
+    
+    def paginas(self, documento, inicio=0):
+        """Gera (num_pagina, texto) sob demanda, uma página por vez"""
+        for num_pagina in range(inicio, documento.total_paginas):
+            yield num_pagina, self.texto(documento, num_pagina)
+
+class MotorTextoPyPDF2(MotorTextoPyMuPDF):
+    """Extração da camada de texto pelo PyPDF2 (Python puro, mais lenta)"""
+    
+    nome = 'pypdf2'
+    
+    def texto(self, documento, num_pagina):
+        return documento.texto_pypdf2(num_pagina)
+
+MOTORES_TEXTO = {
+    MotorTextoPyMuPDF.nome: MotorTextoPyMuPDF,
+    MotorTextoPyPDF2.nome: MotorTextoPyPDF2,
+}
+MOTOR_TEXTO_PADRAO = MotorTextoPyMuPDF.nome
+
+class EstatisticasOrientacao:
+    """Contagem (persistida em disco) de em qual ângulo as páginas foram lidas com sucesso
+    
+    Os acertos se acumulam em memória e vão para o disco a cada
+    SALVAR_A_CADA registros e em salvar() (no fim do programa), fora do
+    caminho do OCR.
+    """
+    
+    SALVAR_A_CADA = 50
+    
+    def __init__(self, caminho_arquivo=None):
+        self.caminho_arquivo = caminho_arquivo or os.path.join(diretorio_dados_local(), 'estatisticas_orientacao.json')
+        self._lock = threading.Lock()
+        self._lock_arquivo = threading.Lock()
+        self._pendentes = 0  # Acertos ainda não gravados
+        self.acertos = {angulo: 0 for angulo in OCRMultiOrientacao.ORIENTACOES}
+        try:
+            with open(self.caminho_arquivo, 'r', encoding='utf-8') as arquivo:
+                for angulo, quantidade in json.load(arquivo).items():
+                    if int(angulo) in self.acertos:
+                        self.acertos[int(angulo)] = int(quantidade)
+        except (OSError, ValueError):
+            pass
+    
+    def registrar(self, angulo):
+        """Conta um acerto no ângulo (gravado a cada SALVAR_A_CADA acertos)"""
+        with self._lock:
+            self.acertos[angulo] = self.acertos.get(angulo, 0) + 1
+            self._pendentes += 1
+            salvar = self._pendentes >= self.SALVAR_A_CADA
+        if salvar:
+            self.salvar()
+    
+    def salvar(self):
+        """Grava os acertos acumulados, se houver algum novo"""
+        with self._lock_arquivo:
+            with self._lock:
+                if not self._pendentes:
+                    return
+                acertos = dict(self.acertos)
+                self._pendentes = 0
+            try:
+                temporario = self.caminho_arquivo + '.tmp'
+                with open(temporario, 'w', encoding='utf-8') as arquivo:
+                    json.dump(acertos, arquivo)
+                os.replace(temporario, self.caminho_arquivo)
+            except OSError:
+                pass
+    
+    def ordenar(self, angulos):
+        """Ordena os ângulos do mais para o menos frequente (empate: ordem original)"""
+        with self._lock:
+            return sorted(angulos, key=lambda angulo: -self.acertos.get(angulo, 0))
+
+_estatisticas_orientacao_padrao = None
+_estatisticas_orientacao_lock = threading.Lock()
+
+def obter_estatisticas_orientacao_padrao():
+    """Retorna as estatísticas de orientação compartilhadas"""
+    global _estatisticas_orientacao_padrao
+    with _estatisticas_orientacao_lock:
+        if _estatisticas_orientacao_padrao is None:
+            try:
+                _estatisticas_orientacao_padrao = EstatisticasOrientacao()
+            except Exception as e:
+                print(f"Estatísticas de orientação apenas em memória: {e}")
+                _estatisticas_orientacao_padrao = EstatisticasOrientacao(os.devnull)
+            atexit.register(_estatisticas_orientacao_padrao.salvar)
+        return _estatisticas_orientacao_padrao
+
+class EstatisticasResolucao:
+    """Contagem (persistida em disco), por tipo de documento, da escala de render em que o OCR achou a nota
+    
+    Para cada escala guarda [tentativas, acertos]: uma tentativa é uma página
+    (em que a nota acabou encontrada) lida naquela escala. Escalas baratas que
+    quase nunca bastam deixam de ser o ponto de partida da cascata.
+    """
+    
+    AMOSTRA_MINIMA = 20  # Tentativas antes de julgar uma escala
+    TAXA_MINIMA = 0.2  # Abaixo disso a escala é pulada
+    
+    def __init__(self, caminho_arquivo=None):
+        self.caminho_arquivo = caminho_arquivo or os.path.join(diretorio_dados_local(), 'estatisticas_resolucao.json')
+        self._lock = threading.Lock()
+        self.contagens = {}  # tipo -> {escala (str): [tentativas, acertos]}
+        try:
+            with open(self.caminho_arquivo, 'r', encoding='utf-8') as arquivo:
+                for tipo, escalas in json.load(arquivo).items():
+                    self.contagens[tipo] = {escala: [int(t), int(a)] for escala, (t, a) in escalas.items()}
+        except (OSError, ValueError, TypeError):
+            pass
+    
+    def registrar(self, tipo, tentadas, escala_acerto):
+        """Conta as escalas tentadas numa página e aquela em que a nota foi achada, e salva o arquivo"""
+        with self._lock:
+            contagens = self.contagens.setdefault(tipo, {})
+            for escala in tentadas:
+                contagem = contagens.setdefault(str(escala), [0, 0])
+                contagem[0] += 1
+                if escala == escala_acerto:
+                    contagem[1] += 1
+            try:
+                temporario = self.caminho_arquivo + '.tmp'
+                with open(temporario, 'w', encoding='utf-8') as arquivo:
+                    json.dump(self.contagens, arquivo)
+                os.replace(temporario, self.caminho_arquivo)
+            except OSError:
+                pass
+    
+    def escalas(self, tipo, escalas):
+        """Cascata a usar: as escalas a partir da primeira que ainda vale a pena tentar"""
+        with self._lock:
+            contagens = self.contagens.get(tipo, {})
+            for inicio, escala in enumerate(escalas[:-1]):
+                tentativas, acertos = contagens.get(str(escala), (0, 0))
+                if tentativas < self.AMOSTRA_MINIMA or acertos >= self.TAXA_MINIMA * tentativas:
+                    return list(escalas[inicio:])
+            return list(escalas[-1:])
+
+_estatisticas_resolucao_padrao = None
+_estatisticas_resolucao_lock = threading.Lock()
+
+def obter_estatisticas_resolucao_padrao():
+    """Retorna as estatísticas de resolução compartilhadas"""
+    global _estatisticas_resolucao_padrao
+    with _estatisticas_resolucao_lock:
+        if _estatisticas_resolucao_padrao is None:
+            try:
+                _estatisticas_resolucao_padrao = EstatisticasResolucao()
+            except Exception as e:
+                print(f"Estatísticas de resolução apenas em memória: {e}")
+                _estatisticas_resolucao_padrao = EstatisticasResolucao(os.devnull)
+        return _estatisticas_resolucao_padrao
+
+class AutomatoAhoCorasick:
+    """Autômato de Aho-Corasick: acha todos os padrões de uma vez em uma passada pelo texto"""
+    
+    def __init__(self, padroes):
+        """padroes: {padrao: conjunto de valores devolvidos quando o padrão aparece}"""
+        self.padroes = [padrao for padrao in padroes if padrao]
+        self._transicoes = [{}]
+        self._falhas = [0]
+        self._saidas = [set()]
+        
+        for padrao, valores in padroes.items():
+            if not padrao:
+                continue
+            estado = 0
+            for caractere in padrao:
+                proximo = self._transicoes[estado].get(caractere)
+                if proximo is None:
+                    proximo = len(self._transicoes)
+                    self._transicoes[estado][caractere] = proximo
+                    self._transicoes.append({})
+                    self._falhas.append(0)
+                    self._saidas.append(set())
+                estado = proximo
+            self._saidas[estado] |= set(valores)
+        
+        # Links de falha em largura; cada estado herda as saídas do seu sufixo
+        fila = deque(self._transicoes[0].values())
+        while fila:
+            estado = fila.popleft()
+            for caractere, proximo in self._transicoes[estado].items():
+                fila.append(proximo)
+                falha = self._falhas[estado]
+                while falha and caractere not in self._transicoes[falha]:
+                    falha = self._falhas[falha]
+                destino = self._transicoes[falha].get(caractere, 0)
+                self._falhas[proximo] = destino if destino != proximo else 0
+                self._saidas[proximo] |= self._saidas[self._falhas[proximo]]
+    
+    def buscar(self, texto):
+        """Conjunto dos valores de todos os padrões contidos no texto"""
+        encontrados = set()
+        estado = 0
+        for caractere in texto or '':
+            while estado and caractere not in self._transicoes[estado]:
+                estado = self._falhas[estado]
+            estado = self._transicoes[estado].get(caractere, 0)
+            if self._saidas[estado]:
+                encontrados |= self._saidas[estado]
+        return encontrados
+
+class ConsultaNota:
+    """Regras de correspondência de uma nota, compiladas uma vez por busca
+
+    Na camada de texto uma única expressão cobre as regras de busca (nota
+    inteira, seis primeiros dígitos no início de um número, seis últimos no
+    fim). No texto do OCR vale a nota ou um de seus finais, ou a nota
+    inteira a `custo_maximo` de distância de edição, com as trocas de
+    dígitos comuns do Tesseract custando menos que um erro qualquer.
+    """
+
+    # Pares de dígitos que o Tesseract costuma confundir
+    CONFUSOES_OCR = ('08', '38', '17', '56', '68', '06', '09', '89', '58', '49', '27', '14')
+    CUSTO_CONFUSAO = 0.5
+    CUSTO_EDICAO = 1.0
+    CUSTO_MAXIMO = 1.0  # 0 desativa a correspondência aproximada
+    TAMANHO_MINIMO_APROXIMADO = 6  # Números curtos demais dariam falsos positivos
+    TAMANHO_CUSTO_MAXIMO = 9  # Abaixo dos 9 dígitos do nNF só uma troca comum é aceita
+
+    def __init__(self, numero_nota, custo_maximo=None):
+        self.numero_nota = numero_nota
+        if custo_maximo is None:
+            custo_maximo = self.CUSTO_MAXIMO
+            if len(numero_nota) < self.TAMANHO_CUSTO_MAXIMO:
+                custo_maximo = min(custo_maximo, self.CUSTO_CONFUSAO)
+        self.custo_maximo = custo_maximo
+
+        # Com números de nota as variantes "N° 123", "NF-e 123" e "Nota Fiscal 123"
+        # já contêm a nota inteira; \b e .* nas pontas se reduzem a estas três regras
+        nota = re.escape(numero_nota)
+        self._regex_texto = re.compile(
+            rf"(?P<nota>{nota})|\b(?P<inicio>{re.escape(numero_nota[:6])})|(?P<final>{re.escape(numero_nota[-6:])})\b")
+
+        self.partes_ocr = []
+        if len(numero_nota) >= 6:
+            self.partes_ocr = list(dict.fromkeys(
+                [numero_nota[-10:], numero_nota[-8:], numero_nota[-6:], numero_nota[-4:]]))
+
+        # Custo de trocar cada dígito da nota por cada caractere lido
+        confusoes = {}
+        for par in self.CONFUSOES_OCR:
+            confusoes.setdefault(par[0], set()).add(par[1])
+            confusoes.setdefault(par[1], set()).add(par[0])
+        self._custos = [dict({c: self.CUSTO_CONFUSAO for c in confusoes.get(digito, ())}, **{digito: 0.0})
+                        for digito in numero_nota]
+
+        # Com no máximo k erros, um dos k + 1 pedaços da nota aparece intacto no texto
+        self._erros_maximos = int(self.custo_maximo // min(self.CUSTO_CONFUSAO, self.CUSTO_EDICAO))
+        pedacos = self._erros_maximos + 1
+        tamanho = len(numero_nota) // pedacos
+        self._pedacos = [numero_nota[i * tamanho:(i + 1) * tamanho] for i in range(pedacos)] if tamanho else []
+
+    @classmethod
+    @functools.lru_cache(maxsize=256)
+    def compilar(cls, numero_nota):
+        """Consulta compartilhada da nota (as regras não mudam durante a busca)"""
+        return cls(numero_nota)
+
+    @property
+    def aproximada(self):
+        """Indica se a nota aceita correspondência aproximada"""
+        return self.custo_maximo > 0 and len(self.numero_nota) >= self.TAMANHO_MINIMO_APROXIMADO
+
+    def buscar_texto(self, texto):
+        """Regra que achou a nota na camada de texto ('nota', 'inicio' ou 'final'), ou None"""
+        correspondencia = self._regex_texto.search(texto or '')
+        return correspondencia.lastgroup if correspondencia else None
+
+    def _distancia_trecho(self, texto):
+        """Menor custo de edição da nota contra qualquer trecho do texto (Sellers)"""
+        coluna = [i * self.CUSTO_EDICAO for i in range(len(self.numero_nota) + 1)]
+        melhor = coluna[-1]
+        for caractere in texto:
+            anterior, coluna[0] = coluna[0], 0.0
+            for i, custos in enumerate(self._custos, 1):
+                atual = coluna[i]
+                coluna[i] = min(anterior + custos.get(caractere, self.CUSTO_EDICAO),
+                                atual + self.CUSTO_EDICAO, coluna[i - 1] + self.CUSTO_EDICAO)
+                anterior = atual
+            if coluna[-1] < melhor:
+                melhor = coluna[-1]
+        return melhor
+
+    def distancia(self, texto):
+        """Menor custo de edição da nota no texto, olhando só em volta dos pedaços intactos"""
+        if not self._pedacos:
+            return self._distancia_trecho(texto)
+
+        folga = len(self.numero_nota) + self._erros_maximos
+        janelas = []
+        for pedaco in self._pedacos:
+            posicao = texto.find(pedaco)
+            while posicao >= 0:
+                janelas.append((max(0, posicao - folga), posicao + len(pedaco) + folga))
+                posicao = texto.find(pedaco, posicao + 1)
+
+        melhor = float('inf')
+        inicio_atual = fim_atual = None
+        for inicio, fim in sorted(janelas) + [(None, None)]:
+            if inicio is not None and fim_atual is not None and inicio <= fim_atual:
+                fim_atual = max(fim_atual, fim)
+                continue
+            if inicio_atual is not None:
+                melhor = min(melhor, self._distancia_trecho(texto[inicio_atual:fim_atual]))
+            inicio_atual, fim_atual = inicio, fim
+        return melhor
+
+    def pontuacao(self, texto_limpo):
+        """Pontuação (0 a 1) da nota no texto do OCR; 0.0 se não estiver
+
+        A nota exata vale 1.0, um final vale a fração da nota que cobre e a
+        nota aproximada vale 1 - custo/tamanho.
+        """
+        if not texto_limpo:
+            return 0.0
+        if self.numero_nota in texto_limpo:
+            return 1.0
+
+        melhor = max((len(parte) / len(self.numero_nota) for parte in self.partes_ocr if parte in texto_limpo),
+                     default=0.0)
+        if melhor < 1 - min(self.CUSTO_CONFUSAO, self.CUSTO_EDICAO) / len(self.numero_nota):
+            melhor = max(melhor, self.pontuacao_aproximada(texto_limpo))
+        return melhor
+
+    def fragmentos(self, metodo):
+        """Trechos da nota dos quais toda correspondência da etapa ('texto' ou 'ocr') contém ao menos um
+
+        Na camada de texto, a nota, os seis primeiros dígitos e os finais; no
+        OCR, a nota, os finais, o nNF sem zeros (chave de acesso) e, com a
+        correspondência aproximada, os pedaços que ficam intactos.
+        """
+        nota = self.numero_nota
+        if metodo == 'texto':
+            return list(dict.fromkeys([nota, nota[:6], nota[-6:], nota[-8:], nota[-10:]]))
+        fragmentos = [nota, nota.lstrip('0') or '0'] + self.partes_ocr
+        if self.aproximada:
+            fragmentos += self._pedacos
+        return list(dict.fromkeys(fragmentos))
+
+    def pontuacao_aproximada(self, texto_limpo):
+        """Pontuação só da nota inteira a `custo_maximo` de distância (0.0 se mais longe)"""
+        if not self.aproximada or not texto_limpo:
+            return 0.0
+        custo = self.distancia(texto_limpo)
+        return 1 - custo / len(self.numero_nota) if custo <= self.custo_maximo else 0.0
 
 class LocalizadorBase:
-    def __init__(self, caminho_base):
+    ESCALAS_OCR = ()  # Cascata de escalas de render para o OCR, da mais barata à mais cara
+    MAX_PAGINAS_OCR = None  # Páginas de cada PDF que passam pelo OCR (None: todas)
+    CODIGO_BARRAS_CONCLUSIVO = True  # Chave de acesso de outra nota dispensa o OCR da página
+    
+    def __init__(self, caminho_base, indice=None, motor_texto=None):
         self.caminho_base = caminho_base
+        self.motor_texto = MOTORES_TEXTO[motor_texto or MOTOR_TEXTO_PADRAO]()
+        self.resultados = []
+        self.log = RegistroLog()  # Mensagens da busca, lidas em lotes pela interface e pelo console
+        self._stop_event = threading.Event()
+        self.callback_resultado = None  # Callback para resultados parciais
+        self.usar_ocr = True
+        self.usar_codigo_barras = True  # Chave de acesso do código de barras antes do OCR
+        self.triagem = TriagemPagina()  # Descarta páginas sem dígitos impressos antes do OCR (None desliga)
+        self.indice = indice if indice is not None else obter_indice_padrao()
+        self.rastreador = Rastreador()  # Tempos por etapa da busca atual
+        self.estatisticas_resolucao = obter_estatisticas_resolucao_padrao()
+        self.manifesto = obter_manifesto_padrao()  # Listagens das pastas em memória
+        self.cache_pdf = obter_cache_pdf_padrao()  # Cópias locais dos PDFs da rede
+        self.orcamento_memoria = obter_orcamento_memoria_padrao()  # Páginas em memória ao mesmo tempo
+        self._documentos = {}  # Sessões abertas dos PDFs em processamento
+        self._documentos_lock = threading.Lock()
+        self.arquivos_com_erro = {}  # PDFs que a busca atual não conseguiu ler: caminho -> erro
+        
+    def set_callback_resultado(self, callback):
+        """Define callback para receber resultados parciais"""
+        self.callback_resultado = callback
+    
+    def adicionar_debug(self, mensagem, nivel='debug'):
+        """Registra uma mensagem no log da busca (nível 'debug', 'info', 'aviso' ou 'erro')"""
+        self.log.registrar(mensagem, nivel)
+    
+    @property
+    def debug_info(self):
+        """Mensagens da busca ainda no log"""
+        return self.log.mensagens()
+    
+    def stop_search(self):
+        """Para a busca em andamento"""
+        self._stop_event.set()
+    
+    def reset_search(self):
+        """Reinicia o estado da busca"""
+        self._stop_event.clear()
+        self.rastreador.reiniciar()
+        self.arquivos_com_erro = {}
+        if self.triagem:
+            self.triagem.reiniciar_estatisticas()
+    
+    def normalizar_mes(self, mes):
+        """Normaliza o nome do mês para o formato das pastas"""
+        meses = {
+            'janeiro': 'JANEIRO', 'fevereiro': 'FEVEREIRO', 'março': 'MARÇO', 'marco': 'MARÇO',
+            'abril': 'ABRIL', 'maio': 'MAIO', 'junho': 'JUNHO',
+            'julho': 'JULHO', 'agosto': 'AGOSTO', 'setembro': 'SETEMBRO',
+            'outubro': 'OUTUBRO', 'novembro': 'NOVEMBRO', 'dezembro': 'DEZEMBRO'
+        }
+        return meses.get(mes.lower(), mes.upper())
+    
+    def listar_pasta(self, caminho):
+        """Conteúdo de uma pasta (no compartilhamento de rede, é uma etapa com custo; vem do manifesto)"""
+        with self.rastreador.span('listagem', pasta=os.path.basename(caminho)):
+            return self.manifesto.entradas(caminho)
+    
+    def listar_pdfs(self, caminho):
+        """PDFs de uma pasta do dia, na ordem da listagem"""
+        with self.rastreador.span('listagem', pasta=os.path.basename(caminho)):
+            return [arquivo for arquivo in self.manifesto.arquivos(caminho) if arquivo.lower().endswith('.pdf')]
+    
+    def pasta_existe(self, caminho):
+        return self.manifesto.existe_pasta(caminho)
+    
+    def encontrar_pastas_dia(self, caminho_mes, dia):
+        """Encontra pastas do dia em diferentes formatos"""
+        dia_procurado = f"{int(dia):02d}"
+        pastas_encontradas = []
+        
+        with self.rastreador.span('listagem', pasta=os.path.basename(caminho_mes)):
+            subpastas = self.manifesto.subpastas(caminho_mes)
+        
+        for pasta in subpastas:
+            # Verificar diferentes formatos de data
+            if (pasta.startswith(f"{dia_procurado}-") or 
+                pasta.startswith(f"{dia_procurado}_") or
+                f"-{dia_procurado}-" in pasta or
+                f"_{dia_procurado}_" in pasta or
+                pasta == dia_procurado):
+                pastas_encontradas.append({
+                    'nome': pasta,
+                    'caminho': os.path.join(caminho_mes, pasta)
+                })
+        
+        return pastas_encontradas
+
+    def abrir_pdf_pagina(self, caminho_pdf, numero_pagina):
+        """Abre o PDF na página específica"""
+        try:
+            sistema = platform.system()
+            
+            if sistema == "Windows":
+                try:
+                    subprocess.run(['SumatraPDF', f'-page={numero_pagina}', caminho_pdf], 
+                                 timeout=10, check=True)
+                    return True
+                except:
+                    os.startfile(caminho_pdf)
+                    messagebox.showinfo("Abrir PDF", 
+                                      f"Arquivo: {os.path.basename(caminho_pdf)}\n"
+                                      f"Vá manualmente para a página: {numero_pagina}")
+                    return True
+                    
+            elif sistema == "Darwin":
+                subprocess.run(['open', caminho_pdf])
+                messagebox.showinfo("Abrir PDF", 
+                                  f"Arquivo: {os.path.basename(caminho_pdf)}\n"
+                                  f"Vá manualmente para a página: {numero_pagina}")
+                return True
+                
+            elif sistema == "Linux":
+                subprocess.run(['xdg-open', caminho_pdf])
+                messagebox.showinfo("Abrir PDF", 
+                                  f"Arquivo: {os.path.basename(caminho_pdf)}\n"
+                                  f"Vá manualmente para a página: {numero_pagina}")
+                return True
+                
+        except Exception as e:
+            self.adicionar_debug(f"Erro ao abrir PDF: {e}", nivel='erro')
+            messagebox.showerror("Erro", f"Não foi possível abrir o PDF:\n{e}")
+            return False
+
+    def registrar_falha(self, pdf_path, mensagem, erro):
+        """Registra no log um PDF que não pôde ser lido; a nota não é dada como ausente dele"""
+        self.adicionar_debug(f"{mensagem}: {erro}", nivel='erro')
+        self.arquivos_com_erro[pdf_path] = str(erro)
+    
+    def resultados_com_falhas(self, resultados):
+        """Sem resultado e com PDFs ilegíveis, um resultado de tipo 'erro' por PDF (como em buscar_lote)"""
+        if resultados or not self.arquivos_com_erro:
+            return resultados
+        self.adicionar_debug(f"Nota não encontrada, mas {len(self.arquivos_com_erro)} PDF(s) não puderam ser lidos",
+                             nivel='aviso')
+        return [{
+            'arquivo': pdf_path,
+            'pagina': None,
+            'pasta_dia': os.path.basename(os.path.dirname(pdf_path)),
+            'nome_arquivo': os.path.basename(pdf_path),
+            'tipo': 'erro',
+            'erro': erro
+        } for pdf_path, erro in sorted(self.arquivos_com_erro.items())]
+    
+    def notificar_resultado_parcial(self, resultado):
+        """Notifica um resultado parcial via callback"""
+        if self.callback_resultado:
+            self.callback_resultado(resultado)
+    
+    def documento(self, pdf_path):
+        """Sessão do PDF compartilhada por todas as etapas (o arquivo é lido uma vez)"""
+        with self._documentos_lock:
+            documento = self._documentos.get(pdf_path)
+        if documento is not None:
+            return documento
+        
+        novo = DocumentoPDF(pdf_path, self.rastreador, self.cache_pdf)
+        with self._documentos_lock:
+            documento = self._documentos.setdefault(pdf_path, novo)
+        if documento is not novo:
+            novo.fechar()
+        return documento
+    
+    @contextmanager
+    def reservar_memoria(self, pdf_path, num_pagina, escala):
+        """Reserva no orçamento de memória a página da renderização ao fim do OCR"""
+        if not self.orcamento_memoria:
+            yield
+            return
+        try:
+            quantidade = self.documento(pdf_path).pixels_pagina(num_pagina, escala) * OrcamentoMemoria.BYTES_POR_PIXEL
+        except Exception:
+            quantidade = 0  # Página ilegível: o erro aparece na renderização, como antes
+        reservado = self.orcamento_memoria.adquirir(quantidade, bloquear=False)
+        if reservado is None:
+            with self.rastreador.span('espera_memoria', pagina=num_pagina + 1):
+                reservado = self.orcamento_memoria.adquirir(quantidade)
+        try:
+            yield
+        finally:
+            self.orcamento_memoria.liberar(reservado)
+    
+    def chaves_codigo_barras(self, chave_pagina, imagem=None):
+        """Chaves de acesso lidas do código de barras da página, passando pelo cache de OCR
+        
+        Sem `imagem` só consulta o cache: None se a página ainda não foi lida nessa escala.
+        """
+        cache = self.ocr_multi.cache
+        chave = None
+        if cache and chave_pagina is not None:
+            hash_arquivo, num_pagina, matriz = chave_pagina
+            chave = cache.chave(hash_arquivo, num_pagina, 0, matriz, DecodificadorCode128.CONFIG_CACHE)
+            texto = cache.obter(chave, contar=False)
+            if texto is not None:
+                return texto.split()
+        if imagem is None:
+            return None
+        
+        inicio = time.perf_counter()
+        with self.rastreador.span('codigo_barras'):
+            chaves = DecodificadorCode128.ler_chaves(imagem)
+        if chave:
+            cache.guardar(chave, ' '.join(chaves), time.perf_counter() - inicio)
+        return chaves
+    
+    def ler_codigo_barras(self, chave_pagina, textos, imagem=None):
+        """Chaves de acesso do código de barras (None sem leitura), com o nNF registrado em `textos`
+        
+        Só o nNF vai para `textos`: os 44 dígitos da chave casariam por
+        aproximação com outras notas no índice.
+        """
+        if not self.usar_codigo_barras:
+            return None
+        try:
+            chaves = self.chaves_codigo_barras(chave_pagina, imagem)
+        except Exception as e:
+            self.adicionar_debug(f"Erro na leitura do código de barras: {e}", nivel='erro')
+            return None
+        for chave in chaves or ():
+            textos[('codigo_barras', chave)] = DecodificadorCode128.numero_nota(chave)
+        return chaves
+    
+    def buscar_codigo_barras(self, chave_pagina, numero_nota, textos, imagem=None):
+        """Pontuação da nota pelo nNF das chaves de acesso da página, antes do OCR
+        
+        1.0 se alguma chave é da nota; 0.0 se há chaves e nenhuma é dela (só
+        com CODIGO_BARRAS_CONCLUSIVO); None quando o OCR ainda precisa decidir.
+        Sem `imagem`, só com as chaves já lidas (cache) nessa escala.
+        """
+        chaves = self.ler_codigo_barras(chave_pagina, textos, imagem)
+        if not chaves:
+            return None
+        nota = numero_nota.lstrip('0') or '0'
+        for chave in chaves:
+            if DecodificadorCode128.numero_nota(chave) == nota:
+                self.adicionar_debug(f"Código de barras: nota {numero_nota} na chave de acesso {chave}")
+                return 1.0
+        return 0.0 if self.CODIGO_BARRAS_CONCLUSIVO else None
+    
+    def triar_pagina(self, pdf_path, num_pagina, chave_pagina, textos, somente_cache=False):
+        """Se a triagem descartou a página (sem dígitos impressos), marcando `textos`
+        
+        O veredito fica no cache de OCR; com `somente_cache` a miniatura não é renderizada.
+        """
+        if not self.triagem:
+            return False
+        try:
+            inicio = time.perf_counter()
+            cache = self.ocr_multi.cache
+            chave = motivo = None
+            if cache and chave_pagina is not None:
+                chave = cache.chave(chave_pagina[0], num_pagina, 0, f"miniatura{self.triagem.LADO_MINIATURA}",
+                                    self.triagem.config_cache)
+                motivo = cache.obter(chave, contar=False)
+            if motivo is None:
+                if somente_cache:
+                    return False
+                documento = self.documento(pdf_path)
+                with self.rastreador.span('triagem', pagina=num_pagina + 1):
+                    escala = self.triagem.LADO_MINIATURA / max(documento.tamanho_pagina(num_pagina))
+                    medidas = self.triagem.medir(documento.renderizar_array(num_pagina, escala))
+                    motivo = self.triagem.motivo(medidas)
+                if chave:
+                    cache.guardar(chave, motivo)
+                if motivo:
+                    self.adicionar_debug(
+                        f"Triagem: página {num_pagina + 1} de {os.path.basename(pdf_path)} sem OCR ({motivo}: "
+                        f"tinta {medidas['densidade']:.3f}, bordas {medidas['bordas']:.3f}, "
+                        f"{medidas['componentes']} componente(s))")
+            elif somente_cache and not motivo:
+                return False  # Conta na passada que vai ler a página
+            self.triagem.registrar(motivo, time.perf_counter() - inicio)
+        except Exception as e:
+            self.adicionar_debug(f"Erro na triagem da página: {e}", nivel='erro')
+            return False
+        if motivo:
+            textos[('triagem', motivo)] = ''
+        return bool(motivo)
+    
+    @staticmethod
+    def descartada_na_triagem(textos):
+        """Se os textos são de uma página descartada pela triagem"""
+        return any(isinstance(chave, tuple) and chave[0] == 'triagem' for chave in textos)
+    
+    def leitura_dispensada(self, textos):
+        """Se a escala foi resolvida sem OCR (triagem ou chave de acesso conclusiva), sem motivo para subir a resolução"""
+        return any(isinstance(chave, tuple) and (chave[0] == 'triagem' or
+                                                 chave[0] == 'codigo_barras' and self.CODIGO_BARRAS_CONCLUSIVO)
+                   for chave in textos)
+    
+    def leitura_ocr_completa(self, chave_pagina, textos):
+        """Indica se o OCR da página não precisa ser refeito para outra nota"""
+        return self.descartada_na_triagem(textos) or self.ocr_multi.leitura_completa(chave_pagina, textos)
+    
+    def pre_carregar_pdfs(self, caminhos):
+        """Traz os PDFs da busca para o cache local em segundo plano, na ordem em que serão processados"""
+        if self.cache_pdf and caminhos:
+            self.cache_pdf.pre_carregar(list(caminhos))
+    
+    def fechar_documento(self, pdf_path):
+        """Libera a sessão do PDF ao fim do processamento do arquivo"""
+        with self._documentos_lock:
+            documento = self._documentos.pop(pdf_path, None)
+        if documento is not None:
+            documento.fechar()
+    
+    def consultar_indice(self, pdf_path, metodo, completas=False, numero_nota=None, fragmentos=None):
+        """Textos guardados no índice para o PDF: {pagina: {parte: texto}} (vazio sem índice)
+        
+        Com a nota (ou os `fragmentos` de um lote), só as páginas que o índice
+        invertido aponta como candidatas trazem os textos.
+        """
+        if not self.indice:
+            return {}
+        if numero_nota is not None:
+            fragmentos = ConsultaNota.compilar(numero_nota).fragmentos(metodo)
+        try:
+            with self.rastreador.span('indice', metodo=metodo):
+                return self.indice.consultar(pdf_path, metodo, completas, fragmentos)
+        except Exception as e:
+            self.adicionar_debug(f"Erro ao consultar índice: {e}", nivel='erro')
+            return {}
+    
+    def casa_texto(self, texto, numero_nota):
+        """Regra da etapa de texto do localizador, aplicada à camada de texto crua de uma página"""
+        return bool(texto) and numero_nota in texto
+    
+    def pontuacao_indice(self, textos, numero_nota):
+        """Pontuação da nota nas leituras de OCR guardadas de uma página, com as regras da leitura ao vivo
+        
+        O nNF das chaves de acesso decide como em buscar_codigo_barras();
+        cada ângulo ou faixa é pontuado sozinho, como em tentar_todas_orientacoes().
+        """
+        nota = numero_nota.lstrip('0') or '0'
+        chaves = [texto for parte, texto in textos.items() if parte.startswith('codigo_barras:')]
+        if nota in chaves:
+            return 1.0
+        if chaves and self.CODIGO_BARRAS_CONCLUSIVO:
+            return 0.0
+        consulta = ConsultaNota.compilar(numero_nota)
+        for parte, texto in textos.items():
+            if not parte.startswith('codigo_barras:'):
+                pontuacao = consulta.pontuacao(texto)
+                if pontuacao:
+                    return pontuacao
+        return 0.0
+    
+    def paginas_texto_indice(self, pdf_path, numero_nota, todas=False):
+        """Páginas em que a camada de texto guardada no índice passa por casa_texto()
+        
+        Como a leitura do PDF, para na primeira página encontrada (todas as
+        encontradas com `todas`). None enquanto o índice não puder responder
+        por ela: falta o texto de alguma página que a leitura veria.
+        """
+        total_paginas = self.total_paginas_indexado(pdf_path)
+        if total_paginas is None:
+            return None
+        paginas = self.consultar_indice(pdf_path, 'texto', completas=True, numero_nota=numero_nota)
+        encontradas = []
+        for pagina in range(1, total_paginas + 1):
+            if pagina not in paginas:
+                return None
+            if any(self.casa_texto(texto, numero_nota) for texto in paginas[pagina].values()):
+                encontradas.append(pagina)
+                if not todas:
+                    break
+        return encontradas
+    
+    def paginas_pendentes_ocr(self, pdf_path, numero_nota, paginas):
+        """Páginas (base 0, em ordem) que a etapa de OCR ainda percorre: ([páginas], pagina_indice)
+        
+        As lidas por completo são julgadas pelo índice (pontuacao_indice())
+        sem voltar ao OCR. A etapa para na primeira com a nota, então as
+        páginas depois de `pagina_indice` (a primeira delas que a tem no
+        índice, base 1) ficam de fora; as anteriores não lidas continuam.
+        """
+        completas = self.consultar_indice(pdf_path, 'ocr', completas=True, numero_nota=numero_nota)
+        pendentes = []
+        for num_pagina in paginas:
+            textos = completas.get(num_pagina + 1)
+            if textos is None:
+                pendentes.append(num_pagina)
+            elif self.pontuacao_indice(textos, numero_nota):
+                return pendentes, num_pagina + 1
+        return pendentes, None
+    
+    def arquivos_candidatos(self, caminhos, numero_nota=None, fragmentos=None):
+        """Arquivos entre `caminhos` que o índice invertido aponta para a nota, sem abrir PDF algum
+        
+        `fragmentos` ({metodo: [trechos]}) substitui os da nota num lote.
+        None quando o índice não pode apontar (sem índice ou nota curta demais).
+        """
+        if not self.indice:
+            return None
+        try:
+            with self.rastreador.span('indice', metodo='candidatos'):
+                candidatos = set()
+                for metodo in ('texto', 'ocr'):
+                    trechos = (ConsultaNota.compilar(numero_nota).fragmentos(metodo)
+                               if numero_nota is not None else fragmentos[metodo])
+                    encontrados = self.indice.candidatos(trechos, metodo, caminhos)
+                    if encontrados is None:
+                        return None
+                    candidatos.update(encontrados)
+                return candidatos
+        except Exception as e:
+            self.adicionar_debug(f"Erro ao consultar índice: {e}", nivel='erro')
+            return None
+    
+    @staticmethod
+    def parte_indice(chave):
+        """Nome no índice de uma leitura de `textos`: o ângulo, ou os campos da chave unidos por ':'"""
+        if isinstance(chave, tuple):
+            return ':'.join(map(str, chave))
+        return str(chave)
+    
+    def indexar_pagina(self, pdf_path, pagina, metodo, textos, completo=True):
+        """Guarda no índice o texto de uma página (ou {chave: texto} das leituras do OCR)"""
+        if not self.indice:
+            return
+        try:
+            if isinstance(textos, dict):
+                textos = {self.parte_indice(chave): texto for chave, texto in textos.items()}
+            self.indice.registrar_pagina(pdf_path, pagina, metodo, textos, completo)
+        except Exception as e:
+            self.adicionar_debug(f"Erro ao indexar página: {e}", nivel='erro')
+    
+    def registrar_total_paginas(self, pdf_path, total_paginas):
+        """Guarda no índice o número de páginas do PDF"""
+        if not self.indice:
+            return
+        try:
+            self.indice.definir_total_paginas(pdf_path, total_paginas)
+        except Exception as e:
+            self.adicionar_debug(f"Erro ao registrar total de páginas: {e}", nivel='erro')
+    
+    def total_paginas_indexado(self, pdf_path):
+        """Número de páginas registrado no índice (ou None)"""
+        if not self.indice:
+            return None
+        try:
+            return self.indice.total_paginas(pdf_path)
+        except Exception:
+            return None
+    
+    def paginas_indexadas(self, pdf_path, metodo):
+        """Páginas já processadas por completo com o método informado"""
+        if not self.indice:
+            return set()
+        try:
+            return self.indice.paginas_completas(pdf_path, metodo)
+        except Exception:
+            return set()
+    
+    def texto_ja_indexado(self, pdf_path):
+        """Indica se todas as páginas do PDF já tiveram o texto indexado"""
+        total_paginas = self.total_paginas_indexado(pdf_path)
+        return total_paginas is not None and len(self.paginas_indexadas(pdf_path, 'texto')) >= total_paginas
+    
+    def escalas_ocr(self):
+        """Escalas da cascata de OCR a partir do nível inicial ajustado pelas estatísticas"""
+        return self.estatisticas_resolucao.escalas(type(self).__name__, self.ESCALAS_OCR)
+    
+    def buscar_ocr_em_cascata(self, ler_escala, textos):
+        """OCR de uma página subindo de resolução só quando a escala mais barata não basta
+        
+        `ler_escala(escala, textos_escala, somente_cache)` devolve
+        (pontuacao, chave_pagina), ou None se somente_cache e o cache não
+        resolve. Qualquer pontuação encerra a cascata (uma leitura com um
+        dígito trocado não justifica outra resolução), assim como uma escala
+        que não achou a nota mas teve leitura confiável (OSD seguro nessa
+        escala). Retorna (pontuacao, chave_pagina) da escala usada; `textos`
+        recebe os textos dela.
+        """
+        escalas = self.escalas_ocr()
+        
+        # Leituras guardadas no cache em qualquer escala dispensam o OCR
+        for nivel, escala in enumerate(escalas):
+            textos_escala = {}
+            resolvido = ler_escala(escala, textos_escala, True)
+            if resolvido and (resolvido[0] or nivel == len(escalas) - 1 or
+                              self.ocr_multi.leitura_confiavel(resolvido[1]) or
+                              self.leitura_dispensada(textos_escala)):
+                textos.update(textos_escala)
+                return resolvido
+        
+        encontrado, chave_pagina, textos_escala = False, None, {}
+        tentadas = []
+        inicio = time.perf_counter()
+        for nivel, escala in enumerate(escalas):
+            if self._stop_event.is_set():
+                break
+            textos_escala = {}
+            encontrado, chave_pagina = ler_escala(escala, textos_escala, False)
+            tentadas.append(escala)
+            if encontrado:
+                self.estatisticas_resolucao.registrar(type(self).__name__, tentadas, escala)
+                if nivel:
+                    self.adicionar_debug(f"OCR: nota lida só na escala {escala}")
+                break
+            if self.ocr_multi.leitura_confiavel(chave_pagina) or self.leitura_dispensada(textos_escala):
+                break
+        
+        if self.triagem and not self.descartada_na_triagem(textos_escala):
+            self.triagem.registrar_leitura(time.perf_counter() - inicio)
+        textos.update(textos_escala)
+        return encontrado, chave_pagina
+    
+    def ler_ocr_escala(self, pdf_path, num_pagina, escala):
+        """OCR da página numa escala, sem procurar nota: ({chave: texto}, completo, chave_pagina)"""
+        return {}, False, None
+    
+    def ler_ocr_pagina(self, pdf_path, num_pagina):
+        """OCR da página sem procurar nenhuma nota: ({chave: texto}, completo)
+        
+        Sobe na cascata de escalas enquanto a leitura não for confiável.
+        """
+        textos, completo = {}, False
+        escalas = self.escalas_ocr()
+        inicio = time.perf_counter()
+        for nivel, escala in enumerate(escalas):
+            textos, completo, chave_pagina = self.ler_ocr_escala(pdf_path, num_pagina, escala)
+            if self.descartada_na_triagem(textos):
+                return textos, completo
+            if nivel == len(escalas) - 1 or self.ocr_multi.leitura_confiavel(chave_pagina):
+                break
+        if self.triagem:
+            self.triagem.registrar_leitura(time.perf_counter() - inicio)
+        return textos, completo
+    
+    def partes_nota(self, numero_nota, metodo):
+        """Trechos da nota aceitos como correspondência em cada etapa ('nome', 'texto' ou 'ocr')"""
+        partes = [numero_nota]
+        if len(numero_nota) >= 6:
+            if metodo == 'nome':
+                partes += [numero_nota[-8:], numero_nota[-6:]]
+            else:
+                partes += [numero_nota[-10:], numero_nota[-8:], numero_nota[-6:]]
+                if metodo == 'ocr':
+                    partes.append(numero_nota[-4:])
+        return partes
+    
+    def automato_lote(self, notas, metodo):
+        """Autômato com os trechos de todas as notas do lote para a etapa"""
+        padroes = {}
+        for nota in notas:
+            for parte in self.partes_nota(nota, metodo):
+                padroes.setdefault(parte, set()).add(nota)
+        return AutomatoAhoCorasick(padroes)
+    
+    @rastrear_arquivo
+    def processar_pdf_lote(self, pdf_path, pasta_dia, nome_arquivo, notas, automatos, usar_ocr=True):
+        """Procura todas as notas do lote em uma passada pelo PDF: [(nota, pagina, tipo)]
+        
+        Como nas buscas individuais, o OCR só corre para as notas que o nome
+        e o texto não acharam no arquivo, pula as páginas cuja camada de texto
+        já casou e respeita MAX_PAGINAS_OCR. Páginas já lidas saem do índice
+        pelas mesmas regras. Erros de leitura sobem para buscar_lote.
+        """
+        achados = {}
+        paginas_texto = set()  # Páginas cuja camada de texto casou com alguma nota
+        
+        def registrar(notas_encontradas, pagina, tipo):
+            for nota in notas_encontradas:
+                if (nota, pagina) not in achados:
+                    achados[(nota, pagina)] = tipo
+                    self.notificar_resultado_parcial({
+                        'nota': nota,
+                        'arquivo': pdf_path,
+                        'pagina': pagina,
+                        'pasta_dia': pasta_dia,
+                        'nome_arquivo': nome_arquivo,
+                        'tipo': tipo
+                    })
+        
+        try:
+            # 1. Nome do arquivo
+            nome_limpo = re.sub(r'[^\d]', '', os.path.splitext(nome_arquivo)[0])
+            registrar(automatos['nome'].buscar(nome_limpo), 1, 'nome_arquivo')
+            
+            # 2. Texto: do índice se já está todo indexado, senão uma leitura do PDF
+            if self.texto_ja_indexado(pdf_path):
+                for pagina, textos in self.consultar_indice(pdf_path, 'texto', completas=True,
+                                                            fragmentos=automatos['texto'].padroes).items():
+                    for texto in textos.values():
+                        encontradas = automatos['texto'].buscar(re.sub(r'\s+', '', texto))
+                        if encontradas:
+                            registrar(encontradas, pagina, 'indice')
+                            paginas_texto.add(pagina)
+            else:
+                documento = self.documento(pdf_path)
+                self.registrar_total_paginas(pdf_path, documento.total_paginas)
+                for num_pagina, texto in self.motor_texto.paginas(documento):
+                    if self._stop_event.is_set():
+                        break
+                    self.indexar_pagina(pdf_path, num_pagina + 1, 'texto', texto)
+                    encontradas = automatos['texto'].buscar(re.sub(r'\s+', '', texto or ''))
+                    if encontradas:
+                        registrar(encontradas, num_pagina + 1, 'texto_direto')
+                        paginas_texto.add(num_pagina + 1)
+            
+            # 3. OCR só para as notas que as etapas baratas não acharam neste arquivo
+            pendentes = set(notas) - {nota for nota, _ in achados}
+            if not usar_ocr or not pendentes:
+                return [(nota, pagina, tipo) for (nota, pagina), tipo in achados.items()]
+            
+            total_paginas = self.total_paginas_indexado(pdf_path)
+            if total_paginas is None:
+                total_paginas = self.documento(pdf_path).total_paginas
+                self.registrar_total_paginas(pdf_path, total_paginas)
+            if self.MAX_PAGINAS_OCR is not None:
+                total_paginas = min(total_paginas, self.MAX_PAGINAS_OCR)
+            
+            # Páginas já lidas vêm do índice (as mesmas leituras, na mesma ordem),
+            # as demais são lidas uma vez para o lote todo
+            paginas_ocr_indexadas = self.consultar_indice(pdf_path, 'ocr', completas=True,
+                                                          fragmentos=automatos['ocr'].padroes)
+            for num_pagina in range(total_paginas):
+                if self._stop_event.is_set() or not pendentes:
+                    break
+                if (num_pagina + 1) in paginas_texto:
+                    continue
+                
+                textos_ocr, tipo = paginas_ocr_indexadas.get(num_pagina + 1), 'indice'
+                if textos_ocr is None:
+                    textos_ocr, completo = self.ler_ocr_pagina(pdf_path, num_pagina)
+                    self.indexar_pagina(pdf_path, num_pagina + 1, 'ocr', textos_ocr, completo)
+                    tipo = 'ocr'
+                for texto in textos_ocr.values():
+                    encontradas = [nota for nota in automatos['ocr'].buscar(texto) if nota in pendentes]
+                    registrar(encontradas, num_pagina + 1, tipo)
+                pendentes -= {nota for nota, pagina in achados if pagina == num_pagina + 1}
+        finally:
+            self.fechar_documento(pdf_path)
+        
+        return [(nota, pagina, tipo) for (nota, pagina), tipo in achados.items()]
+    
+    def buscar_lote(self, mes, dia, notas, usar_ocr=None, max_workers=2):
+        """Procura várias notas de uma vez, lendo (e fazendo OCR de) cada PDF uma única vez
+        
+        Retorna a lista de resultados (um por nota/página, com a chave 'nota')
+        ou uma mensagem de erro, como as buscas individuais. Uma nota não
+        encontrada num dia em que algum PDF falhou volta com tipo 'erro' (um
+        resultado por PDF com falha, sem página), não como ausente.
+        """
+        self.reset_search()
         self.resultados = []
-        self.debug_info = []
-        self._stop_event = threading.Event()
-        self.callback_resultado = None  # Callback para resultados parciais
+        self.log.limpar()
+        
+        notas = list(dict.fromkeys(nota.strip() for nota in notas if nota and nota.strip()))
+        if usar_ocr is None:
+            usar_ocr = self.usar_ocr
+        
+        self.adicionar_debug(f"Busca em lote: {len(notas)} nota(s) em {dia}/{mes}")
+        
+        mes_pasta = self.normalizar_mes(mes)
+        caminho_mes = os.path.join(self.caminho_base, mes_pasta)
+        
+        if not self.pasta_existe(caminho_mes):
+            return f"Pasta do mês {mes} não encontrada em {caminho_mes}"
+        
+        pdfs_para_processar = []
+        for pasta_info in self.encontrar_pastas_dia(caminho_mes, dia):
+            for arquivo in sorted(self.listar_pdfs(pasta_info['caminho'])):
+                pdfs_para_processar.append((
+                    os.path.join(pasta_info['caminho'], arquivo),
+                    pasta_info['nome'],
+                    arquivo
+                ))
+        
+        if not pdfs_para_processar:
+            return f"Nenhum PDF encontrado para o dia {dia}"
+        
+        automatos = {metodo: self.automato_lote(notas, metodo) for metodo in ('nome', 'texto', 'ocr')}
+        candidatos = self.arquivos_candidatos(
+            [pdf_path for pdf_path, _, _ in pdfs_para_processar],
+            fragmentos={metodo: automatos[metodo].padroes for metodo in ('texto', 'ocr')})
+        if candidatos:
+            self.adicionar_debug(f"Índice: {len(candidatos)} arquivo(s) candidato(s) de {len(pdfs_para_processar)}")
+            pdfs_para_processar.sort(key=lambda info: info[0] not in candidatos)
+        self.pre_carregar_pdfs(pdf_path for pdf_path, _, _ in pdfs_para_processar)
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self.processar_pdf_lote, pdf_path, pasta_dia, nome_arquivo,
+                                notas, automatos, usar_ocr): (pdf_path, pasta_dia, nome_arquivo)
+                for pdf_path, pasta_dia, nome_arquivo in pdfs_para_processar
+            }
+            
+            falhas = []
+            for future in as_completed(futures):
+                pdf_path, pasta_dia, nome_arquivo = futures[future]
+                try:
+                    for nota, pagina, tipo in future.result():
+                        self.resultados.append({
+                            'nota': nota,
+                            'arquivo': pdf_path,
+                            'pagina': pagina,
+                            'pasta_dia': pasta_dia,
+                            'nome_arquivo': nome_arquivo,
+                            'tipo': tipo,
+                            'mes': mes,
+                            'dia': dia
+                        })
+                except Exception as e:
+                    self.adicionar_debug(f"Erro no lote em {pdf_path}: {e}", nivel='erro')
+                    falhas.append((pdf_path, pasta_dia, nome_arquivo, e))
+        
+        # Sem o PDF que falhou não dá para dizer que a nota não está no dia
+        encontradas = {r['nota'] for r in self.resultados}
+        for nota in notas:
+            if nota in encontradas:
+                continue
+            for pdf_path, pasta_dia, nome_arquivo, erro in falhas:
+                self.resultados.append({
+                    'nota': nota,
+                    'arquivo': pdf_path,
+                    'pagina': None,
+                    'pasta_dia': pasta_dia,
+                    'nome_arquivo': nome_arquivo,
+                    'tipo': 'erro',
+                    'erro': str(erro),
+                    'mes': mes,
+                    'dia': dia
+                })
+        
+        self.resultados.sort(key=lambda r: (notas.index(r['nota']), r['arquivo'], r['pagina'] or 0))
+        self.adicionar_debug(f"Lote finalizado: {len(encontradas)}/{len(notas)} nota(s) encontrada(s)"
+                             f"{f', {len(falhas)} PDF(s) com erro' if falhas else ''}", nivel='info')
+        return self.resultados
+    
+    def buscar(self, mes, dia, numero_nota):
+        """Busca de uma nota no dia (cada tipo de documento tem seu fluxo)"""
+        raise NotImplementedError
+    
+    def etapas_baratas(self, pdf_path, numero_nota, pasta_dia, nome_arquivo):
+        """Nome do arquivo, índice e camada de texto: (páginas encontradas, páginas que ainda pedem OCR)"""
+        raise NotImplementedError
+    
+    def etapa_ocr(self, pdf_path, numero_nota, pasta_dia, nome_arquivo, paginas):
+        """OCR das páginas (índices base 0) deixadas pelas etapas baratas: lista das páginas encontradas"""
+        return []
+    
+    def custo_ocr(self, pdf_path, paginas):
+        """Custo relativo estimado do OCR do arquivo: pixels das páginas na primeira escala da cascata
+        
+        Lê só o tamanho das páginas (sem renderizar); um arquivo ilegível
+        conta como páginas A4, e o erro aparece na própria etapa de OCR.
+        """
+        escalas = self.escalas_ocr()
+        escala = escalas[0] if escalas else 1.0
+        try:
+            documento = self.documento(pdf_path)
+            return sum(documento.pixels_pagina(num_pagina, escala) for num_pagina in paginas)
+        except Exception:
+            return len(paginas) * int(595 * escala) * int(842 * escala)
+        finally:
+            self.fechar_documento(pdf_path)
+    
+    def executar_em_etapas(self, arquivos, numero_nota, max_workers=2, prioridade=None):
+        """Agenda a busca de uma nota em vários PDFs, etapas baratas primeiro
+        
+        Nome, índice e texto rodam em todos os `arquivos` ((pdf_path,
+        pasta_dia, nome_arquivo, ...)) antes de qualquer OCR; só então os
+        arquivos sem resultado vão ao OCR, do menor custo estimado para o
+        maior (depois de `prioridade(info)`, se informada). Os arquivos que
+        o índice invertido aponta para a nota passam na frente nas duas
+        filas. Gera (info, paginas) à medida que cada arquivo é resolvido; os
+        resultados parciais já são notificados pelas próprias etapas.
+        """
+        candidatos = self.arquivos_candidatos([info[0] for info in arquivos], numero_nota)
+        if candidatos:
+            self.adicionar_debug(f"Índice: {len(candidatos)} arquivo(s) candidato(s) de {len(arquivos)}")
+            arquivos = sorted(arquivos, key=lambda info: info[0] not in candidatos)
+        candidatos = candidatos or set()
+        self.pre_carregar_pdfs(info[0] for info in arquivos)
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        futures = {}
+        try:
+            futures = {executor.submit(self.etapas_baratas, info[0], numero_nota, info[1], info[2]): (ordem, info)
+                       for ordem, info in enumerate(arquivos)}
+            fila_ocr = []
+            for future in as_completed(futures):
+                if self._stop_event.is_set():
+                    break
+                ordem, info = futures[future]
+                try:
+                    paginas, paginas_ocr = future.result()
+                except Exception as e:
+                    self.registrar_falha(info[0], f"Erro ao processar {info[2]}", e)
+                    continue
+                if paginas:
+                    yield info, paginas
+                elif paginas_ocr:
+                    custo = self.custo_ocr(info[0], paginas_ocr)
+                    fila_ocr.append(((prioridade(info) if prioridade else 0, info[0] not in candidatos, custo, ordem),
+                                     info, paginas_ocr))
+            
+            if self._stop_event.is_set() or not fila_ocr:
+                return
+            
+            # O pool atende na ordem de envio: os arquivos mais baratos vão primeiro
+            fila_ocr.sort(key=lambda item: item[0])
+            self.adicionar_debug(f"Etapas baratas concluídas: {len(fila_ocr)} arquivo(s) na fila do OCR")
+            futures = {executor.submit(self.etapa_ocr, info[0], numero_nota, info[1], info[2], paginas_ocr): (0, info)
+                       for _, info, paginas_ocr in fila_ocr}
+            for future in as_completed(futures):
+                if self._stop_event.is_set():
+                    break
+                _, info = futures[future]
+                try:
+                    paginas = future.result()
+                except Exception as e:
+                    self.registrar_falha(info[0], f"Erro no OCR de {info[2]}", e)
+                    continue
+                if paginas:
+                    yield info, paginas
+        finally:
+            for pendente in futures:
+                pendente.cancel()
+            executor.shutdown(wait=not self._stop_event.is_set())
+    
+    def dias_janela(self, mes, dia, raio=3, mes_inteiro=False, ano=None):
+        """Dias a visitar, do mais próximo da data informada ao mais distante
+        
+        Retorna [(mes_pasta, dia, distancia)]. Com `mes_inteiro` são todos os
+        dias do mês; senão os dias até `raio` antes e depois, atravessando a
+        virada do mês. As pastas não têm ano: `ano` (padrão: o atual) só
+        define o tamanho dos meses.
+        """
+        mes_pasta = self.normalizar_mes(mes)
+        if mes_pasta not in MESES_PASTA:
+            raise ValueError(f"Mês desconhecido: {mes}")
+        num_mes = MESES_PASTA.index(mes_pasta) + 1
+        ano = ano or datetime.date.today().year
+        ultimo_dia = calendar.monthrange(ano, num_mes)[1]
+        centro = min(int(dia), ultimo_dia) if dia else 1
+        
+        if mes_inteiro:
+            dias = [(mes_pasta, d, abs(d - centro)) for d in range(1, ultimo_dia + 1)]
+            return sorted(dias, key=lambda item: (item[2], item[1]))
+        
+        data = datetime.date(ano, num_mes, centro)
+        dias = []
+        for distancia in range(int(raio) + 1):
+            for deslocamento in ((0,) if distancia == 0 else (-distancia, distancia)):
+                outra = data + datetime.timedelta(days=deslocamento)
+                dias.append((MESES_PASTA[outra.month - 1], outra.day, distancia))
+        return dias
+    
+    def buscar_janela(self, mes, dia, numero_nota, raio=3, mes_inteiro=False, max_resultados=None,
+                      max_workers=2, ano=None):
+        """Busca a nota em vários dias, começando pelos mais próximos da data
+        
+        Todos os PDFs da janela passam pelo mesmo agendador (etapas baratas de
+        todos antes do OCR), na ordem de proximidade. Com
+        `max_resultados`, a busca para assim que esse número de páginas é
+        encontrado.
+        """
+        self.reset_search()
+        self.resultados = []
+        self.log.limpar()
+        numero_nota = numero_nota.strip()
+        
+        try:
+            dias = self.dias_janela(mes, dia, raio, mes_inteiro, ano)
+        except ValueError as e:
+            return str(e)
+        
+        self.adicionar_debug(f"Buscando nota {numero_nota} em {len(dias)} dia(s) a partir de {dia}/{mes}")
+        
+        # A pasta de cada mês é lida uma vez (o manifesto guarda a listagem)
+        pdfs_para_processar = []
+        for mes_pasta, dia_janela, distancia in dias:
+            caminho_mes = os.path.join(self.caminho_base, mes_pasta)
+            if not self.pasta_existe(caminho_mes):
+                continue
+            
+            for pasta_info in self.encontrar_pastas_dia(caminho_mes, dia_janela):
+                for arquivo in self.listar_pdfs(pasta_info['caminho']):
+                    pdfs_para_processar.append((
+                        os.path.join(pasta_info['caminho'], arquivo),
+                        pasta_info['nome'],
+                        arquivo,
+                        mes_pasta,
+                        dia_janela,
+                        distancia
+                    ))
+        
+        if not pdfs_para_processar:
+            return f"Nenhum PDF encontrado entre os dias pesquisados de {mes}"
+        
+        # Nome, índice e texto da janela inteira antes de qualquer OCR; as duas etapas
+        # atendem os dias mais próximos primeiro
+        for info, paginas in self.executar_em_etapas(
+                pdfs_para_processar, numero_nota, max_workers, prioridade=lambda info: info[5]):
+            pdf_path, pasta_dia, nome_arquivo, mes_pasta, dia_janela, distancia = info
+            for pagina in paginas:
+                resultado = {
+                    'arquivo': pdf_path,
+                    'pagina': pagina,
+                    'pasta_dia': pasta_dia,
+                    'nome_arquivo': nome_arquivo,
+                    'mes': mes_pasta,
+                    'dia': dia_janela,
+                    'distancia': distancia
+                }
+                if resultado not in self.resultados:
+                    self.resultados.append(resultado)
+            
+            if max_resultados and len(self.resultados) >= max_resultados and not self._stop_event.is_set():
+                self.adicionar_debug(f"{len(self.resultados)} resultado(s): encerrando a busca na janela")
+                self._stop_event.set()
+                break
+        
+        self.resultados.sort(key=lambda r: (r['distancia'], r['arquivo'], r['pagina']))
+        self.adicionar_debug(f"Busca na janela finalizada. {len(self.resultados)} resultado(s) encontrado(s)", nivel='info')
+        return self.resultados_com_falhas(self.resultados)
+    
+    @rastrear_arquivo
+    def indexar_pdf(self, pdf_path, usar_ocr=True, aguardar=None):
+        """Pré-processa o PDF inteiro no índice, sem procurar nenhuma nota
+        
+        Indexa o texto de todas as páginas e faz OCR das que não têm números
+        na camada de texto (digitalizadas). `aguardar` é chamado entre as
+        páginas para permitir pausas. Retorna True se o arquivo ficou completo.
+        """
+        try:
+            if self.indice and self.indice.arquivo_completo(pdf_path):
+                return True
+            
+            documento = self.documento(pdf_path)
+            total_paginas = documento.total_paginas
+            self.registrar_total_paginas(pdf_path, total_paginas)
+            paginas_texto = self.paginas_indexadas(pdf_path, 'texto')
+            paginas_ocr = self.paginas_indexadas(pdf_path, 'ocr')
+            
+            for num_pagina in range(total_paginas):
+                if aguardar:
+                    aguardar()
+                if self._stop_event.is_set():
+                    return False
+                
+                texto = self.motor_texto.texto(documento, num_pagina)
+                if (num_pagina + 1) not in paginas_texto:
+                    self.indexar_pagina(pdf_path, num_pagina + 1, 'texto', texto)
+                
+                if (not usar_ocr or (num_pagina + 1) in paginas_ocr or
+                        IndiceNumerico.tokens_texto(texto)):
+                    continue
+                
+                textos_ocr, completo = self.ler_ocr_pagina(pdf_path, num_pagina)
+                if textos_ocr:
+                    self.indexar_pagina(pdf_path, num_pagina + 1, 'ocr', textos_ocr, completo)
+            
+            if self.indice and not self._stop_event.is_set():
+                self.indice.marcar_arquivo_completo(pdf_path)
+            return not self._stop_event.is_set()
+            
+        except Exception as e:
+            self.adicionar_debug(f"Erro ao indexar {pdf_path}: {e}", nivel='erro')
+            return False
+        finally:
+            self.fechar_documento(pdf_path)
+
+class MotorOCR:
+    """Interface dos motores de OCR: texto e OSD de uma imagem girada pelo ângulo pedido"""
+    
+    def ler_texto(self, imagem, config, angulo=0):
+        return self._ler_texto(OCRMultiOrientacao.rotacionar_imagem(imagem, angulo), config)
+    
+    def ler_osd(self, imagem, config, angulo=0):
+        return self._ler_osd(OCRMultiOrientacao.rotacionar_imagem(imagem, angulo), config)
+    
+    def fechar(self):
+        pass
+
+class MotorOCRPytesseract(MotorOCR):
+    """Motor que executa o tesseract.exe a cada imagem (via pytesseract)"""
+    
+    def _ler_texto(self, imagem, config):
+        return pytesseract.image_to_string(imagem, config=config)
+    
+    def _ler_osd(self, imagem, config):
+        return pytesseract.image_to_osd(imagem, config=config)
+
+class MotorOCRTesserocr(MotorOCR):
+    """Motor residente: mantém o Tesseract carregado na memória (via tesserocr), uma API por configuração"""
+    
+    def __init__(self, pasta_tessdata=None, idioma='eng'):
+        import tesserocr
+        self._tesserocr = tesserocr
+        self.pasta_tessdata = pasta_tessdata or os.path.join(
+            os.path.dirname(pytesseract.pytesseract.tesseract_cmd), 'tessdata')
+        self.idioma = idioma
+        self._apis = {}
+    
+    def _api(self, config):
+        """Cria (uma única vez) a API do Tesseract para a configuração"""
+        api = self._apis.get(config)
+        if api is None:
+            argumentos = config.split()
+            oem = self._tesserocr.OEM.DEFAULT
+            psm = self._tesserocr.PSM.SINGLE_BLOCK
+            variaveis = {}
+            for i, argumento in enumerate(argumentos[:-1]):
+                if argumento == '--oem':
+                    oem = int(argumentos[i + 1])
+                elif argumento == '--psm':
+                    psm = int(argumentos[i + 1])
+                elif argumento == '-c':
+                    nome, _, valor = argumentos[i + 1].partition('=')
+                    variaveis[nome] = valor
+            
+            if psm == self._tesserocr.PSM.OSD_ONLY:
+                api = self._tesserocr.PyTessBaseAPI(path=self.pasta_tessdata, lang='osd', psm=psm)
+            else:
+                api = self._tesserocr.PyTessBaseAPI(path=self.pasta_tessdata, lang=self.idioma, oem=oem, psm=psm)
+            for nome, valor in variaveis.items():
+                api.SetVariable(nome, valor)
+            self._apis[config] = api
+        return api
+    
+    def _ler_texto(self, imagem, config):
+        api = self._api(config)
+        api.SetImage(imagem)
+        return api.GetUTF8Text()
+    
+    def _ler_osd(self, imagem, config):
+        api = self._api(config)
+        api.SetImage(imagem)
+        resultado = api.DetectOrientationScript()
+        if not resultado:
+            raise RuntimeError("OSD sem resultado")
+        
+        # Mesmo formato do "tesseract --psm 0" (Rotate é o giro horário que endireita a página)
+        return (f"Orientation in degrees: {resultado['orient_deg']}\n"
+                f"Rotate: {(360 - resultado['orient_deg']) % 360}\n"
+                f"Orientation confidence: {resultado['orient_conf']:.2f}\n"
+                f"Script: {resultado['script_name']}\n"
+                f"Script confidence: {resultado['script_conf']:.2f}\n")
+    
+    def fechar(self):
+        for api in self._apis.values():
+            api.End()
+        self._apis.clear()
+
+class MotorOCRSimulado(MotorOCR):
+    """Motor substituto para testes sem Tesseract: devolve textos pré-definidos por imagem"""
+    
+    def __init__(self, textos=None, texto_padrao='', osd='Rotate: 0\nOrientation confidence: 0.00\n', atraso=0.0):
+        self.textos = textos or {}  # impressao(imagem já girada) -> texto
+        self.texto_padrao = texto_padrao
+        self.osd = osd
+        self.atraso = atraso  # Segundos por chamada, para simular o custo do OCR
+    
+    @staticmethod
+    def impressao(imagem):
+        """Identifica o conteúdo de uma imagem"""
+        resumo = hashlib.blake2b(digest_size=16)
+        resumo.update(f"{imagem.mode}|{imagem.size}".encode('utf-8'))
+        resumo.update(imagem.tobytes())
+        return resumo.hexdigest()
+    
+    def _ler_texto(self, imagem, config):
+        if self.atraso:
+            time.sleep(self.atraso)
+        return self.textos.get(self.impressao(imagem), self.texto_padrao)
+    
+    def _ler_osd(self, imagem, config):
+        if self.atraso:
+            time.sleep(self.atraso)
+        return self.osd
+
+def _laco_trabalhador_ocr(conexao, classe_motor, argumentos_motor):
+    """Laço de um processo OCR residente: recebe imagens pelo pipe e devolve o texto"""
+    motor = classe_motor(**argumentos_motor)
+    try:
+        while True:
+            try:
+                pedido = conexao.recv()
+            except EOFError:
+                break
+            if pedido is None:
+                break
+            
+            tipo, config, angulo, modo, tamanho = pedido
+            dados = conexao.recv_bytes()
+            try:
+                imagem = Image.frombytes(modo, tamanho, dados)
+                if tipo == 'osd':
+                    conexao.send(('ok', motor.ler_osd(imagem, config, angulo)))
+                else:
+                    conexao.send(('ok', motor.ler_texto(imagem, config, angulo)))
+            except Exception as e:
+                conexao.send(('erro', f"{type(e).__name__}: {e}"))
+    finally:
+        motor.fechar()
+
+class PoolOCR(MotorOCR):
+    """Pool de processos OCR de longa duração que mantêm o motor e a configuração carregados
+    
+    As imagens (e o ângulo de rotação) são enviadas pelo pipe de cada
+    processo; a rotação e o OCR acontecem no processo trabalhador.
+    """
+    
+    def __init__(self, tamanho=None, classe_motor=None, argumentos_motor=None, tempo_limite=120):
+        self.tamanho = tamanho or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self.classe_motor = classe_motor or MotorOCRTesserocr
+        self.argumentos_motor = argumentos_motor or {}
+        self.tempo_limite = tempo_limite  # Segundos de espera por uma imagem antes de dar o processo por travado
+        self._contexto = multiprocessing.get_context('spawn')
+        self._livres = queue.Queue()  # Processos prontos; None é uma vaga cujo processo ainda precisa ser iniciado
+        self._trabalhadores = []
+        self._lock = threading.Lock()
+        self._fechado = False
+        for _ in range(self.tamanho):
+            self._livres.put(self._iniciar_trabalhador())
+    
+    def _iniciar_trabalhador(self):
+        conexao_pai, conexao_filho = self._contexto.Pipe()
+        processo = self._contexto.Process(
+            target=_laco_trabalhador_ocr,
+            args=(conexao_filho, self.classe_motor, self.argumentos_motor),
+            daemon=True)
+        processo.start()
+        conexao_filho.close()
+        trabalhador = (processo, conexao_pai)
+        with self._lock:
+            self._trabalhadores.append(trabalhador)
+        return trabalhador
+    
+    def _descartar_trabalhador(self, trabalhador):
+        """Encerra um processo que morreu ou travou"""
+        processo, conexao = trabalhador
+        with self._lock:
+            if trabalhador in self._trabalhadores:
+                self._trabalhadores.remove(trabalhador)
+        conexao.close()
+        if processo.is_alive():
+            processo.kill()
+            processo.join(timeout=5)
+    
+    def _executar(self, tipo, imagem, config, angulo):
+        if self._fechado:
+            raise RuntimeError("Pool de OCR encerrado")
+        
+        trabalhador = self._livres.get()
+        devolver = None  # Só volta à fila um processo saudável ou o seu substituto
+        try:
+            if trabalhador is None:
+                trabalhador = self._iniciar_trabalhador()
+            _, conexao = trabalhador
+            try:
+                conexao.send((tipo, config, angulo, imagem.mode, imagem.size))
+                conexao.send_bytes(imagem.tobytes())
+                if not conexao.poll(self.tempo_limite):
+                    raise TimeoutError(f"OCR sem resposta em {self.tempo_limite}s")
+                status, valor = conexao.recv()
+            except (EOFError, OSError) as e:
+                self._descartar_trabalhador(trabalhador)
+                devolver = self._iniciar_trabalhador()
+                if isinstance(e, TimeoutError):
+                    raise RuntimeError(f"Processo de OCR travado: {e}")
+                raise RuntimeError("Processo de OCR encerrado inesperadamente")
+            devolver = trabalhador
+        finally:
+            self._livres.put(devolver)
+        
+        if status == 'erro':
+            raise RuntimeError(valor)
+        return valor
+    
+    def ler_texto(self, imagem, config, angulo=0):
+        return self._executar('texto', imagem, config, angulo)
+    
+    def ler_osd(self, imagem, config, angulo=0):
+        return self._executar('osd', imagem, config, angulo)
+    
+    def fechar(self):
+        """Encerra os processos trabalhadores"""
+        self._fechado = True
+        with self._lock:
+            trabalhadores = list(self._trabalhadores)
+            self._trabalhadores.clear()
+        for processo, conexao in trabalhadores:
+            try:
+                conexao.send(None)
+            except OSError:
+                pass
+            processo.join(timeout=5)
+            if processo.is_alive():
+                processo.kill()
+            conexao.close()
+
+_motor_ocr_padrao = None
+_motor_ocr_padrao_lock = threading.Lock()
+
+def obter_motor_ocr_padrao():
+    """Retorna o motor de OCR compartilhado
+    
+    Com o tesserocr instalado, um PoolOCR de processos residentes; sem ele,
+    o pytesseract (um tesseract.exe por imagem) no próprio processo.
+    """
+    global _motor_ocr_padrao
+    with _motor_ocr_padrao_lock:
+        if _motor_ocr_padrao is None:
+            try:
+                import tesserocr  # noqa: F401 (só verifica a disponibilidade)
+                pool = PoolOCR()
+                try:
+                    # Falha cedo se o tessdata não for encontrado pelos trabalhadores
+                    pool.ler_texto(Image.new('L', (64, 64), 255), OCRMultiOrientacao.CONFIG_DIGITOS)
+                except Exception:
+                    pool.fechar()
+                    raise
+                atexit.register(pool.fechar)
+                _motor_ocr_padrao = pool
+            except Exception as e:
+                print(f"Pool de OCR residente indisponível, usando pytesseract: {e}")
+                _motor_ocr_padrao = MotorOCRPytesseract()
+        return _motor_ocr_padrao
+
+class PreprocessadorOCR:
+    """Pré-processamento vetorizado (NumPy) para OCR sobre um único buffer de trabalho
+    
+    Escala de cinza e esticamento de contraste saem juntos de uma tabela
+    (LUT) aplicada aos bytes da página; a máscara de nitidez é feita no mesmo
+    buffer. O limiar de Sauvola é calculado numa grade reduzida (é uma
+    superfície suave) e o de Otsu sai do histograma já calculado para o
+    contraste.
+    """
+    
+    PERCENTIS_CONTRASTE = (0.01, 0.99)  # Frações do histograma levadas a preto/branco
+    RAIO_NITIDEZ = 2
+    QUANTIDADE_NITIDEZ = 1.0
+    JANELA_SAUVOLA = 31  # Lado da janela em pixels da página
+    K_SAUVOLA = 0.2
+    R_SAUVOLA = 128.0
+    FATOR_GRADE = 4  # Redução da grade onde o limiar de Sauvola é calculado
+    
+    @staticmethod
+    def _media_caixa(imagem, raio, saida=None):
+        """Média na janela (2*raio+1)² de cada pixel (borda replicada), por somas de fatias"""
+        altura, largura = imagem.shape
+        borda = np.pad(imagem, raio, mode='edge')
+        vertical = borda[0:altura].copy()
+        for deslocamento in range(1, 2 * raio + 1):
+            vertical += borda[deslocamento:deslocamento + altura]
+        del borda  # Libera a cópia com borda antes de alocar a saída
+        if saida is None:
+            saida = np.empty_like(imagem)
+        np.copyto(saida, vertical[:, 0:largura])
+        for deslocamento in range(1, 2 * raio + 1):
+            saida += vertical[:, deslocamento:deslocamento + largura]
+        saida *= 1.0 / (2 * raio + 1) ** 2
+        return saida
+    
+    @staticmethod
+    def _limiar_otsu(histograma):
+        """Limiar de Otsu a partir do histograma de 256 níveis"""
+        niveis = np.arange(256, dtype=np.float64)
+        peso = np.cumsum(histograma, dtype=np.float64)
+        soma = np.cumsum(histograma * niveis)
+        total, soma_total = peso[-1], soma[-1]
+        fundo = total - peso
+        with np.errstate(divide='ignore', invalid='ignore'):
+            variancia = (soma_total * peso - soma * total) ** 2 / (peso * fundo)
+        variancia[~np.isfinite(variancia)] = 0
+        return int(np.argmax(variancia))
+    
+    @classmethod
+    def _limiar_sauvola(cls, imagem):
+        """Superfície de limiar T = m * (1 + k * (s / R - 1)) no tamanho da imagem"""
+        altura, largura = imagem.shape
+        fator = cls.FATOR_GRADE if min(altura, largura) >= cls.FATOR_GRADE * 16 else 1
+        linhas, colunas = altura // fator, largura // fator
+        
+        # Médias de x e x² por bloco fator×fator, somando uma linha do bloco por
+        # vez (temporários de 1/fator da imagem, sem cópias do tamanho dela)
+        media = np.zeros((linhas, largura), dtype=np.float32)
+        quadrados = np.zeros_like(media)
+        for deslocamento in range(fator):
+            faixa = imagem[deslocamento:linhas * fator:fator]
+            media += faixa
+            quadrados += np.square(faixa)
+        media = media[:, :colunas * fator].reshape(linhas, colunas, fator).sum(axis=2)
+        quadrados = quadrados[:, :colunas * fator].reshape(linhas, colunas, fator).sum(axis=2)
+        
+        # Janela de Sauvola na grade reduzida
+        raio = max(1, cls.JANELA_SAUVOLA // (2 * fator))
+        media = cls._media_caixa(media, raio) * (1.0 / (fator * fator))
+        quadrados = cls._media_caixa(quadrados, raio) * (1.0 / (fator * fator))
+        quadrados -= media * media
+        np.maximum(quadrados, 0, out=quadrados)
+        desvio = np.sqrt(quadrados, out=quadrados)
+        limiar = (media * (1 + cls.K_SAUVOLA * (desvio / cls.R_SAUVOLA - 1))).astype(np.float32)
+        
+        # Ampliação direto no tamanho da imagem (o último bloco cobre a sobra),
+        # em float32: a superfície cheia é o maior buffer do pré-processamento
+        repeticoes_linhas = np.full(linhas, fator)
+        repeticoes_linhas[-1] += altura - linhas * fator
+        repeticoes_colunas = np.full(colunas, fator)
+        repeticoes_colunas[-1] += largura - colunas * fator
+        return np.repeat(np.repeat(limiar, repeticoes_linhas, axis=0), repeticoes_colunas, axis=1)
+    
+    @classmethod
+    def processar(cls, imagem, binarizacao='sauvola'):
+        """Imagem 'L' pronta para o OCR (binarizacao: 'sauvola', 'otsu' ou None)
         
-    def set_callback_resultado(self, callback):
-        """Define callback para receber resultados parciais"""
-        self.callback_resultado = callback
+        Aceita uma imagem PIL ou um array em tons de cinza (ex.: DocumentoPDF.renderizar_array).
+        """
+        cinza = OCRMultiOrientacao.array_cinza(imagem)
+        
+        # Escala de cinza + contraste: uma LUT de 256 posições aplicada de uma vez
+        histograma = np.bincount(cinza.ravel(), minlength=256)
+        acumulado = np.cumsum(histograma) / cinza.size
+        baixo = int(np.searchsorted(acumulado, cls.PERCENTIS_CONTRASTE[0]))
+        alto = int(np.searchsorted(acumulado, cls.PERCENTIS_CONTRASTE[1]))
+        if alto <= baixo:
+            baixo, alto = 0, 255
+        lut = np.clip((np.arange(256, dtype=np.float32) - baixo) * (255.0 / (alto - baixo)), 0, 255)
+        buffer = lut[cinza]  # Indexação direta: np.take converteria os índices para int64 (8 bytes/pixel)
+        
+        # Máscara de nitidez no próprio buffer: buffer += q * (buffer - média local)
+        detalhe = cls._media_caixa(buffer, cls.RAIO_NITIDEZ)
+        np.subtract(buffer, detalhe, out=detalhe)
+        detalhe *= cls.QUANTIDADE_NITIDEZ
+        buffer += detalhe
+        del detalhe
+        
+        if binarizacao == 'sauvola':
+            # Limiar da imagem contrastada (antes da nitidez, que só mexe nas bordas)
+            limiar = cls._limiar_sauvola(lut[cinza])
+            return Image.fromarray(np.greater(buffer, limiar).view(np.uint8) * np.uint8(255), 'L')
+        
+        if binarizacao == 'otsu':
+            histograma_contraste = np.bincount(lut.astype(np.uint8), weights=histograma, minlength=256)
+            limiar = cls._limiar_otsu(histograma_contraste)
+            return Image.fromarray(np.greater(buffer, limiar).view(np.uint8) * np.uint8(255), 'L')
+        
+        np.clip(buffer, 0, 255, out=buffer)
+        return Image.fromarray(buffer.astype(np.uint8), 'L')
+
+class DecodificadorCode128:
+    """Lê a chave de acesso (44 dígitos em Code-128 C) do código de barras do DANFE
     
-    def adicionar_debug(self, mensagem):
-        """Adiciona mensagem de debug"""
-        self.debug_info.append(mensagem)
-        print(f"DEBUG: {mensagem}")
+    As linhas e colunas amostradas da página são binarizadas pelo meio entre
+    o tom mais claro e o mais escuro de cada uma e viram sequências de
+    corridas. Toda janela de 6 corridas é classificada de uma vez (larguras
+    normalizadas para os 11 módulos do símbolo); a partir de cada Start C os
+    símbolos são lidos até o Stop, conferindo o dígito do Code-128 e o da
+    chave (módulo 11). Colunas e sequências invertidas cobrem as quatro
+    orientações.
+    """
     
-    def stop_search(self):
-        """Para a busca em andamento"""
-        self._stop_event.set()
+    # Larguras (barra, espaço, ...) em módulos dos símbolos 0 a 105; o Stop (106) tem uma barra a mais
+    PADROES = (
+        '212222', '222122', '222221', '121223', '121322', '131222', '122213', '122312', '132212', '221213',
+        '221312', '231212', '112232', '122132', '122231', '113222', '123122', '123221', '223211', '221132',
+        '221231', '213212', '223112', '312131', '311222', '321122', '321221', '312212', '322112', '322211',
+        '212123', '212321', '232121', '111323', '131123', '131321', '112313', '132113', '132311', '211313',
+        '231113', '231311', '112133', '112331', '132131', '113123', '113321', '133121', '313121', '211331',
+        '231131', '213113', '213311', '213131', '311123', '311321', '331121', '312113', '312311', '332111',
+        '314111', '221411', '431111', '111224', '111422', '121124', '121421', '141122', '141221', '112214',
+        '112412', '122114', '122411', '142112', '142211', '241211', '221114', '413111', '241112', '134111',
+        '111242', '121142', '121241', '114212', '124112', '124211', '411212', '421112', '421211', '212141',
+        '214121', '412121', '111143', '111341', '131141', '114113', '114311', '411113', '411311', '113141',
+        '114131', '311141', '411131', '211412', '211214', '211232', '2331112',
+    )
+    START_C = 105
+    STOP = 106
+    LINHAS_POR_EIXO = 150  # Linhas (e colunas) amostradas da página
+    CONTRASTE_MINIMO = 64  # Linhas com menos contraste que isso não têm barras
+    TAMANHO_CHAVE = 44
+    POSICAO_NUMERO = slice(25, 34)  # nNF: posições 26 a 34 da chave
+    CONFIG_CACHE = 'code128'  # Distingue as chaves lidas dos textos do OCR no cache
     
-    def reset_search(self):
-        """Reinicia o estado da busca"""
-        self._stop_event.clear()
+    DISTANCIA_MAXIMA = 3.0  # Desvio total (em módulos) aceito entre as corridas e o símbolo mais próximo
     
-    def normalizar_mes(self, mes):
-        """Normaliza o nome do mês para o formato das pastas"""
-        meses = {
-            'janeiro': 'JANEIRO', 'fevereiro': 'FEVEREIRO', 'março': 'MARÇO', 'marco': 'MARÇO',
-            'abril': 'ABRIL', 'maio': 'MAIO', 'junho': 'JUNHO',
-            'julho': 'JULHO', 'agosto': 'AGOSTO', 'setembro': 'SETEMBRO',
-            'outubro': 'OUTUBRO', 'novembro': 'NOVEMBRO', 'dezembro': 'DEZEMBRO'
-        }
-        return meses.get(mes.lower(), mes.upper())
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def matriz(cls):
+        """Símbolos como matriz 107×6 de módulos, montada na primeira leitura (sem carregar o NumPy na importação)"""
+        return np.array([[int(modulos) for modulos in padrao[:6]] for padrao in cls.PADROES], dtype=np.float32)
     
-    def encontrar_pastas_dia(self, caminho_mes, dia):
-        """Encontra pastas do dia em diferentes formatos"""
-        dia_procurado = f"{int(dia):02d}"
-        pastas_encontradas = []
+    @staticmethod
+    def digito_verificador(chave):
+        """Dígito módulo 11 (pesos 2 a 9 da direita para a esquerda) dos 43 primeiros dígitos da chave"""
+        soma = sum(int(digito) * peso for digito, peso in zip(reversed(chave[:43]), itertools.cycle(range(2, 10))))
+        resto = soma % 11
+        return 0 if resto < 2 else 11 - resto
+    
+    @classmethod
+    def chave_valida(cls, chave):
+        return (len(chave) == cls.TAMANHO_CHAVE and chave.isdigit()
+                and cls.digito_verificador(chave) == int(chave[-1]))
+    
+    @classmethod
+    def numero_nota(cls, chave):
+        """nNF da chave, sem os zeros à esquerda"""
+        return chave[cls.POSICAO_NUMERO].lstrip('0') or '0'
+    
+    @classmethod
+    def _ler_corridas(cls, larguras, primeira_escura):
+        """Chaves válidas numa sequência de corridas (a primeira escura ou não)
         
-        for pasta in os.listdir(caminho_mes):
-            caminho_pasta = os.path.join(caminho_mes, pasta)
-            
-            if os.path.isdir(caminho_pasta):
-                # Verificar diferentes formatos de data
-                if (pasta.startswith(f"{dia_procurado}-") or 
-                    pasta.startswith(f"{dia_procurado}_") or
-                    f"-{dia_procurado}-" in pasta or
-                    f"_{dia_procurado}_" in pasta or
-                    pasta == dia_procurado):
-                    pastas_encontradas.append({
-                        'nome': pasta,
-                        'caminho': caminho_pasta
-                    })
+        Cada janela de 6 corridas é normalizada para 11 módulos e lida como o
+        símbolo mais próximo; os dígitos de verificação descartam o que a
+        tolerância deixar passar errado.
+        """
+        if larguras.size < 6 * 3 + 7:
+            return []
+        janelas = np.lib.stride_tricks.sliding_window_view(larguras, 6).astype(np.float32)
+        janelas *= 11.0 / janelas.sum(axis=1, keepdims=True)
+        matriz = cls.matriz()
         
-        return pastas_encontradas
-
-    def abrir_pdf_pagina(self, caminho_pdf, numero_pagina):
-        """Abre o PDF na página específica"""
-        try:
-            sistema = platform.system()
-            
-            if sistema == "Windows":
-                try:
-                    subprocess.run(['SumatraPDF', f'-page={numero_pagina}', caminho_pdf], 
-                                 timeout=10, check=True)
-                    return True
-                except:
-                    os.startfile(caminho_pdf)
-                    messagebox.showinfo("Abrir PDF", 
-                                      f"Arquivo: {os.path.basename(caminho_pdf)}\n"
-                                      f"Vá manualmente para a página: {numero_pagina}")
-                    return True
-                    
-            elif sistema == "Darwin":
-                subprocess.run(['open', caminho_pdf])
-                messagebox.showinfo("Abrir PDF", 
-                                  f"Arquivo: {os.path.basename(caminho_pdf)}\n"
-                                  f"Vá manualmente para a página: {numero_pagina}")
-                return True
-                
-            elif sistema == "Linux":
-                subprocess.run(['xdg-open', caminho_pdf])
-                messagebox.showinfo("Abrir PDF", 
-                                  f"Arquivo: {os.path.basename(caminho_pdf)}\n"
-                                  f"Vá manualmente para a página: {numero_pagina}")
-                return True
-                
-        except Exception as e:
-            self.adicionar_debug(f"Erro ao abrir PDF: {e}")
-            messagebox.showerror("Erro", f"Não foi possível abrir o PDF:\n{e}")
-            return False
+        # Candidatos a Start C começando por uma barra
+        distancia_start = np.abs(janelas - matriz[cls.START_C]).sum(axis=1)
+        candidatos = np.flatnonzero(distancia_start <= cls.DISTANCIA_MAXIMA)
+        candidatos = candidatos[(candidatos % 2 == 0) == primeira_escura]
+        
+        simbolos_chave = cls.TAMANHO_CHAVE // 2 + 2  # Dados, verificador e Stop
+        chaves = []
+        for inicio in candidatos.tolist():
+            seguintes = janelas[inicio + 6:inicio + 6 * (simbolos_chave + 1):6]
+            distancias = np.abs(seguintes[:, None, :] - matriz[None, :, :]).sum(axis=2)
+            valores = distancias.argmin(axis=1)
+            dados = []
+            for valor, distancia in zip(valores.tolist(), distancias.min(axis=1).tolist()):
+                if distancia > cls.DISTANCIA_MAXIMA or valor >= 100:
+                    break
+                dados.append(valor)
+            else:
+                continue
+            if valor != cls.STOP or distancia > cls.DISTANCIA_MAXIMA or len(dados) < 2:
+                continue
+            *dados, verificador = dados
+            if (cls.START_C + sum(peso * valor for peso, valor in enumerate(dados, 1))) % 103 != verificador:
+                continue
+            chave = ''.join(f"{valor:02d}" for valor in dados)
+            if cls.chave_valida(chave) and chave not in chaves:
+                chaves.append(chave)
+        return chaves
+    
+    @classmethod
+    def ler_chaves(cls, imagem):
+        """Chaves de acesso válidas nos códigos de barras da imagem, em qualquer orientação"""
+        cinza = OCRMultiOrientacao.array_cinza(imagem)
+        passo_linhas = max(1, cinza.shape[0] // cls.LINHAS_POR_EIXO)
+        passo_colunas = max(1, cinza.shape[1] // cls.LINHAS_POR_EIXO)
+        chaves = []
+        for amostra in (cinza[passo_linhas // 2::passo_linhas], cinza[:, passo_colunas // 2::passo_colunas].T):
+            minimo, maximo = amostra.min(axis=1), amostra.max(axis=1)
+            meio = (minimo.astype(np.float32) + maximo) / 2
+            escuro = amostra <= meio[:, None]
+            for linha in np.flatnonzero(maximo.astype(np.int16) - minimo >= cls.CONTRASTE_MINIMO).tolist():
+                bordas = np.flatnonzero(escuro[linha, 1:] != escuro[linha, :-1]) + 1
+                # Borda com precisão de subpixel: onde o tom cruza o meio entre os dois pixels
+                antes = amostra[linha, bordas - 1].astype(np.float32)
+                depois = amostra[linha, bordas].astype(np.float32)
+                bordas = bordas - 0.5 + (meio[linha] - antes) / (depois - antes)
+                larguras = np.diff(bordas, prepend=0.0, append=float(escuro.shape[1]))
+                primeira_escura = bool(escuro[linha, 0])
+                ultima_escura = primeira_escura if larguras.size % 2 else not primeira_escura
+                # Da esquerda para a direita e ao contrário (página de ponta-cabeça)
+                for chave in (cls._ler_corridas(larguras, primeira_escura) +
+                              cls._ler_corridas(larguras[::-1], ultima_escura)):
+                    if chave not in chaves:
+                        chaves.append(chave)
+        return chaves
 
-    def notificar_resultado_parcial(self, resultado):
-        """Notifica um resultado parcial via callback"""
-        if self.callback_resultado:
-            self.callback_resultado(resultado)
+class TriagemPagina:
+    """Separa, numa miniatura da página, as que não têm dígitos impressos (verso em branco, folha
+    separadora, foto) para dispensar o OCR
+    
+    Três medidas baratas em NumPy: densidade de tinta (pixels bem mais
+    escuros que o papel), energia de bordas (gradientes fortes) e o número de
+    componentes conexos do tamanho de caracteres. Os limiares são atributos
+    da instância e podem ser trocados na criação, ex.:
+    TriagemPagina(componentes_minimos=20).
+    """
+    
+    LADO_MINIATURA = 400  # Lado maior da miniatura em pixels (~35 dpi numa A4)
+    CONFIG_CACHE = 'triagem'  # Distingue o veredito da triagem dos textos do OCR no cache
+    
+    # Limiares padrão (ver LIMIARES)
+    CONTRASTE_TINTA = 80  # Quanto um pixel precisa ser mais escuro que o papel para ser tinta
+    DENSIDADE_MINIMA = 0.002  # Menos tinta que isso: página em branco (ou só sujeira)
+    COMPONENTES_MINIMOS = 10  # Menos manchas do tamanho de caracteres que isso: sem texto
+    AREA_MAXIMA_CARACTERE = 0.02  # Fração da miniatura acima da qual a mancha não é caractere
+    DENSIDADE_FOTO = 0.25  # Acima dessa densidade, pouca borda por tinta indica foto
+    BORDAS_POR_TINTA = 0.35
+    LIMIARES = ('contraste_tinta', 'densidade_minima', 'componentes_minimos', 'area_maxima_caractere',
+                'densidade_foto', 'bordas_por_tinta')
+    
+    def __init__(self, **limiares):
+        for nome in self.LIMIARES:
+            setattr(self, nome, limiares.pop(nome, getattr(self, nome.upper())))
+        if limiares:
+            raise TypeError(f"Limiares desconhecidos: {', '.join(limiares)}")
+        self._lock = threading.Lock()
+        self.reiniciar_estatisticas()
+    
+    def reiniciar_estatisticas(self):
+        with self._lock:
+            self.avaliadas = 0
+            self.descartadas = {}  # {motivo: páginas}
+            self.tempo = 0.0
+            self.leituras = 0
+            self.tempo_leituras = 0.0
+    
+    @property
+    def config_cache(self):
+        """Configuração do cache: outro conjunto de limiares não aproveita vereditos antigos"""
+        return f"{self.CONFIG_CACHE}:" + ','.join(f"{getattr(self, nome):g}" for nome in self.LIMIARES)
+    
+    @staticmethod
+    def areas_componentes(mascara):
+        """Áreas dos componentes conexos (vizinhança 8) da máscara, a partir das corridas de cada linha"""
+        altura, largura = mascara.shape
+        com_borda = np.zeros((altura, largura + 2), dtype=np.int8)
+        com_borda[:, 1:-1] = mascara
+        variacao = np.diff(com_borda, axis=1)
+        linhas, inicios = np.nonzero(variacao == 1)
+        fins = np.nonzero(variacao == -1)[1]  # Fim exclusivo, na mesma ordem dos inícios
+        if not linhas.size:
+            return np.zeros(0, dtype=np.int64)
+        
+        # Corridas de linhas vizinhas que se tocam (inclusive na diagonal), todas de uma vez:
+        # posições numa reta única, linha * (largura + 2) + coluna, mantêm a ordem
+        passo = largura + 2
+        chave_inicios = linhas * passo + inicios
+        chave_fins = linhas * passo + fins
+        acima = (linhas - 1) * passo
+        primeira = np.searchsorted(chave_fins, acima + inicios, 'left')
+        ultima = np.searchsorted(chave_inicios, acima + fins, 'right')
+        quantidades = np.maximum(ultima - primeira, 0)
+        corridas = np.repeat(np.arange(linhas.size), quantidades)
+        deslocamentos = np.arange(corridas.size) - np.repeat(np.cumsum(quantidades) - quantidades, quantidades)
+        vizinhas = np.repeat(primeira, quantidades) + deslocamentos
+        
+        # Rótulo de cada corrida: o menor índice do componente (propagação com salto de ponteiros)
+        rotulos = np.arange(linhas.size)
+        while True:
+            anteriores = rotulos.copy()
+            np.minimum.at(rotulos, corridas, rotulos[vizinhas])
+            np.minimum.at(rotulos, vizinhas, rotulos[corridas])
+            rotulos = rotulos[rotulos]
+            if np.array_equal(rotulos, anteriores):
+                break
+        areas = np.bincount(rotulos, weights=fins - inicios)
+        return areas[areas > 0].astype(np.int64)
+    
+    def medir(self, imagem):
+        """{'densidade', 'bordas', 'componentes'} da miniatura (array ou imagem PIL)"""
+        cinza = OCRMultiOrientacao.array_cinza(imagem)
+        papel = float(np.percentile(cinza, 90))
+        tinta = cinza < papel - self.contraste_tinta
+        
+        variacao = cinza.astype(np.int16)
+        bordas = (np.count_nonzero(np.abs(np.diff(variacao, axis=1)) > self.contraste_tinta) +
+                  np.count_nonzero(np.abs(np.diff(variacao, axis=0)) > self.contraste_tinta))
+        
+        areas = self.areas_componentes(tinta)
+        return {
+            'densidade': float(tinta.mean()),
+            'bordas': bordas / cinza.size,
+            'componentes': int(np.count_nonzero(areas <= self.area_maxima_caractere * cinza.size)),
+        }
+    
+    def motivo(self, medidas):
+        """Por que a página não vale o OCR ('' se ela pode ter dígitos impressos)"""
+        if medidas['densidade'] < self.densidade_minima:
+            return 'em branco'
+        if medidas['densidade'] > self.densidade_foto and medidas['bordas'] < self.bordas_por_tinta * medidas['densidade']:
+            return 'foto'
+        if medidas['componentes'] < self.componentes_minimos:
+            return 'sem caracteres'
+        return ''
+    
+    def registrar(self, motivo, tempo=0.0):
+        """Contabiliza uma página avaliada (e descartada, se houver motivo)"""
+        with self._lock:
+            self.avaliadas += 1
+            self.tempo += tempo
+            if motivo:
+                self.descartadas[motivo] = self.descartadas.get(motivo, 0) + 1
+    
+    def registrar_leitura(self, tempo):
+        """Tempo de uma página que passou pela triagem e foi lida, base da economia estimada"""
+        with self._lock:
+            self.leituras += 1
+            self.tempo_leituras += tempo
+    
+    def estatisticas(self):
+        """Páginas avaliadas e descartadas (por motivo), custo da triagem e tempo de leitura estimado como economizado"""
+        with self._lock:
+            descartadas = sum(self.descartadas.values())
+            tempo_medio = self.tempo_leituras / self.leituras if self.leituras else 0.0
+            return {
+                'avaliadas': self.avaliadas,
+                'descartadas': descartadas,
+                'motivos': dict(self.descartadas),
+                'tempo_triagem': self.tempo,
+                'tempo_economizado': descartadas * tempo_medio,
+            }
 
 class OCRMultiOrientacao:
     """Classe para lidar com OCR em múltiplas orientações"""
     
-    @staticmethod
-    def detectar_orientacao_texto(imagem):
-        """Detecta a orientação do texto usando OCR do Tesseract"""
+    ORIENTACOES = [0, 90, 180, 270]  # Todas as orientações possíveis
+    CONFIG_DIGITOS = r'--oem 3 --psm 6 -c tessedit_char_whitelist=0123456789'
+    CONFIG_OSD = '--psm 0'
+    CONFIANCA_MINIMA_OSD = 2.0  # Abaixo disso o OSD é só uma sugestão de ordem
+    LADO_MAXIMO_OSD = 1400  # O OSD roda numa cópia reduzida da página
+    
+    # 'pil' (cadeia ImageEnhance) ou 'numpy' (PreprocessadorOCR). A binarização do
+    # NumPy só vira padrão quando o recall com o Tesseract real for conferido
+    # (benchmark.py preprocessamento --ocr real)
+    PREPROCESSAMENTO_PADRAO = 'pil'
+    
+    def __init__(self, cache=None, estatisticas=None, motor=None, rastreador=None, preprocessamento=None):
+        self.cache = cache if cache is not None else obter_cache_ocr_padrao()
+        self.estatisticas = estatisticas if estatisticas is not None else obter_estatisticas_orientacao_padrao()
+        self._motor = motor
+        self.rastreador = rastreador if rastreador is not None else RastreadorNulo()
+        self.preprocessamento = preprocessamento or self.PREPROCESSAMENTO_PADRAO
+    
+    @property
+    def motor(self):
+        """Motor de OCR, criado só quando a primeira página precisa de OCR"""
+        if self._motor is None:
+            self._motor = obter_motor_ocr_padrao()
+        return self._motor
+    
+    def detectar_orientacao_texto(self, imagem):
+        """Detecta a orientação do texto usando o OSD do Tesseract
+        
+        Retorna (rotacao, confianca), onde rotacao é o valor "Rotate" do
+        Tesseract (graus no sentido horário para endireitar a página).
+        """
         try:
+            # O OSD não precisa de resolução alta: usar uma cópia reduzida
+            if max(imagem.size) > self.LADO_MAXIMO_OSD:
+                imagem = imagem.copy()
+                imagem.thumbnail((self.LADO_MAXIMO_OSD, self.LADO_MAXIMO_OSD))
+            
             # Configuração para detecção de orientação e script
-            osd = pytesseract.image_to_osd(imagem, config='--psm 0')
+            osd = self.motor.ler_osd(imagem, self.CONFIG_OSD)
             
-            # Extrair ângulo de rotação do resultado OSD
+            # Extrair ângulo de rotação e confiança do resultado OSD
             rotacao = 0
+            confianca = 0.0
             linhas = osd.split('\n')
             for linha in linhas:
                 if 'Rotate:' in linha:
                     rotacao = int(linha.split(':')[1].strip())
-                    break
+                elif 'Orientation confidence:' in linha:
+                    confianca = float(linha.split(':')[1].strip())
             
-            return rotacao
-        except:
-            return 0  # Se falhar, assume orientação normal
+            return rotacao, confianca
+        except (RuntimeError, OSError, ValueError, IndexError):
+            # TesseractError e os erros do pool/tesserocr são RuntimeError, Tesseract ausente é
+            # OSError, saída inesperada é ValueError/IndexError: assume orientação normal sem confiança
+            return 0, 0.0
+    
+    def _orientacao_em_cache(self, chave_pagina, contar=False):
+        """Resultado do OSD guardado para a página: (angulo, confianca) ou None"""
+        chave = self._chave_angulo(chave_pagina, 'osd', self.CONFIG_OSD)
+        texto = self.cache.obter(chave, contar) if chave else None
+        if texto is None:
+            return None
+        angulo, confianca = texto.split()
+        return int(angulo), float(confianca)
+    
+    def orientacao_pagina(self, imagem, chave_pagina=None):
+        """Ângulo (para Image.rotate) que endireita a página e a confiança do OSD"""
+        resultado = self._orientacao_em_cache(chave_pagina, contar=True)
+        if resultado is None:
+            inicio = time.perf_counter()
+            with self.rastreador.span('osd', pagina=chave_pagina[1] + 1 if chave_pagina else None):
+                rotacao, confianca = self.detectar_orientacao_texto(imagem)
+            # "Rotate" é no sentido horário; Image.rotate gira no anti-horário
+            resultado = ((360 - rotacao) % 360, confianca)
+            chave = self._chave_angulo(chave_pagina, 'osd', self.CONFIG_OSD)
+            if chave:
+                self.cache.guardar(chave, f"{resultado[0]} {resultado[1]}", time.perf_counter() - inicio)
+        return resultado
+    
+    def ordem_orientacoes(self, imagem, chave_pagina=None):
+        """Ângulos a tentar: só o previsto pelo OSD se confiável, senão todos
+        
+        Com confiança baixa o ângulo previsto vem primeiro e os demais seguem
+        a frequência de acertos registrada (que se adapta aos scanners).
+        """
+        angulo, confianca = self.orientacao_pagina(imagem, chave_pagina)
+        if confianca >= self.CONFIANCA_MINIMA_OSD:
+            return [angulo]
+        
+        restantes = self.estatisticas.ordenar(self.ORIENTACOES)
+        if confianca > 0:
+            restantes.remove(angulo)
+            return [angulo] + restantes
+        return restantes
+    
+    def orientacoes_necessarias(self, chave_pagina):
+        """Ângulos que compõem uma leitura completa da página (pelo OSD guardado)"""
+        if chave_pagina is not None and self.cache:
+            resultado = self._orientacao_em_cache(chave_pagina)
+            if resultado and resultado[1] >= self.CONFIANCA_MINIMA_OSD:
+                return [resultado[0]]
+        return list(self.ORIENTACOES)
+    
+    def leitura_confiavel(self, chave_pagina):
+        """Indica se o OSD guardado para a página (nessa escala) foi seguro, sinal de texto legível"""
+        resultado = self._orientacao_em_cache(chave_pagina) if chave_pagina is not None and self.cache else None
+        return resultado is not None and resultado[1] >= self.CONFIANCA_MINIMA_OSD
+    
+    def leitura_completa(self, chave_pagina, textos):
+        """Indica se os textos lidos cobrem todos os ângulos necessários da página"""
+        return all(angulo in textos for angulo in self.orientacoes_necessarias(chave_pagina))
     
     @staticmethod
     def rotacionar_imagem(imagem, angulo):
         """Rotaciona a imagem pelo ângulo especificado"""
         if angulo == 0:
             return imagem
+        if angulo % 90 == 0:
+            # Ângulos retos são transposições exatas, sem reamostragem
+            return imagem.transpose({90: Image.Transpose.ROTATE_90, 180: Image.Transpose.ROTATE_180,
+                                     270: Image.Transpose.ROTATE_270}[angulo % 360])
         return imagem.rotate(angulo, expand=True, resample=Image.BICUBIC, fillcolor='white')
     
     @staticmethod
-    def tentar_todas_orientacoes(imagem, numero_nota, config_ocr):
-        """Tenta encontrar o texto em todas as orientações possíveis"""
-        orientacoes = [0, 90, 180, 270]  # Todas as orientações possíveis
+    def array_cinza(imagem):
+        """Array NumPy em tons de cinza de uma imagem PIL ou de um array já em cinza (sem cópia)"""
+        if isinstance(imagem, np.ndarray):
+            return imagem
+        return np.asarray(imagem if imagem.mode == 'L' else imagem.convert('L'))
+    
+    @staticmethod
+    def imagem_pil(imagem):
+        """Imagem PIL de um array em tons de cinza (compartilha o buffer); imagens PIL passam direto"""
+        if isinstance(imagem, np.ndarray):
+            return Image.fromarray(imagem, 'L')
+        return imagem
+    
+    @staticmethod
+    def contem_nota(texto_limpo, numero_nota):
+        """Pontuação (0 a 1) do número da nota (um de seus finais ou a nota com poucos erros) no texto"""
+        return ConsultaNota.compilar(numero_nota).pontuacao(texto_limpo)
+    
+    def chave_pagina(self, pdf_path, num_pagina, matriz, documento=None):
+        """Identifica a página no cache de OCR (None se o cache estiver desativado)"""
+        if not self.cache:
+            return None
+        try:
+            dados = documento.dados if documento is not None else None
+            if self.preprocessamento != 'pil':
+                # Textos lidos de imagens com outro pré-processamento não se misturam
+                matriz = f"{matriz}/{self.preprocessamento}"
+            return self.cache.hash_conteudo(pdf_path, dados), num_pagina, matriz
+        except OSError:
+            return None
+    
+    def _chave_angulo(self, chave_pagina, angulo, config_ocr):
+        if not self.cache or chave_pagina is None:
+            return None
+        hash_arquivo, num_pagina, matriz = chave_pagina
+        return self.cache.chave(hash_arquivo, num_pagina, angulo, matriz, config_ocr)
+    
+    def verificar_cache(self, chave_pagina, numero_nota, config_ocr, textos=None):
+        """Resolve a página só com o cache, sem renderizar
+        
+        Retorna (pontuacao, angulo) se achou, (0.0, 0) se os ângulos
+        necessários estão no cache sem a nota, ou None se falta algum e é
+        preciso fazer OCR.
+        """
+        if not self.cache or chave_pagina is None:
+            return None
+        
+        lidos = {}
+        pontuacao = 0.0
+        for angulo in self.orientacoes_necessarias(chave_pagina):
+            texto = self.cache.obter(self._chave_angulo(chave_pagina, angulo, config_ocr), contar=False)
+            if texto is None:
+                return None
+            lidos[angulo] = re.sub(r'\s+', '', texto)
+            pontuacao = self.contem_nota(lidos[angulo], numero_nota)
+            if pontuacao:
+                break
+        
+        self.cache.registrar_acertos(len(lidos))
+        if textos is not None:
+            textos.update(lidos)
+        
+        return (pontuacao, angulo) if pontuacao else (0.0, 0)
+    
+    def ler_angulo(self, imagem, angulo, config_ocr, chave_pagina=None):
+        """Texto (sem espaços) da imagem girada pelo ângulo, passando pelo cache de OCR"""
+        chave = self._chave_angulo(chave_pagina, angulo, config_ocr)
+        texto = self.cache.obter(chave) if chave else None
         
+        if texto is None:
+            # Fazer OCR (a rotação é feita pelo motor)
+            inicio = time.perf_counter()
+            with self.rastreador.span('ocr', angulo=angulo, pagina=chave_pagina[1] + 1 if chave_pagina else None,
+                                      largura=imagem.width, altura=imagem.height):
+                texto = self.motor.ler_texto(imagem, config_ocr, angulo)
+            if chave:
+                self.cache.guardar(chave, texto, time.perf_counter() - inicio)
+        
+        return re.sub(r'\s+', '', texto)
+    
+    def ler_todas_orientacoes(self, imagem, config_ocr, chave_pagina=None, orientacoes=None):
+        """Lê a página em todos os ângulos necessários, sem procurar nenhuma nota (pré-indexação)"""
+        if orientacoes is None:
+            orientacoes = self.ordem_orientacoes(imagem, chave_pagina)
+        
+        textos = {}
         for angulo in orientacoes:
             try:
-                # Rotacionar imagem
-                if angulo != 0:
-                    imagem_rotacionada = imagem.rotate(angulo, expand=True, 
-                                                     resample=Image.BICUBIC, 
-                                                     fillcolor='white')
-                else:
-                    imagem_rotacionada = imagem
-                
-                # Fazer OCR
-                texto = pytesseract.image_to_string(imagem_rotacionada, config=config_ocr)
-                texto_limpo = re.sub(r'\s+', '', texto)
+                textos[angulo] = self.ler_angulo(imagem, angulo, config_ocr, chave_pagina)
+            except Exception:
+                continue
+        return textos
+    
+    def tentar_todas_orientacoes(self, imagem, numero_nota, config_ocr, textos=None, chave_pagina=None,
+                                 orientacoes=None):
+        """Tenta encontrar o texto nas orientações possíveis, começando pela prevista pelo OSD
+        
+        Retorna (pontuacao, angulo) na primeira orientação com a nota (ver
+        contem_nota()), ou (0.0, 0). Se `textos` (dict) for informado, recebe
+        o texto lido em cada ângulo. Com `chave_pagina` (ver chave_pagina()) o texto de cada ângulo passa
+        pelo cache de OCR. `orientacoes` restringe os ângulos tentados (nessa
+        ordem, sem OSD).
+        """
+        if orientacoes is None:
+            orientacoes = self.ordem_orientacoes(imagem, chave_pagina)
+        
+        for angulo in orientacoes:
+            try:
+                texto_limpo = self.ler_angulo(imagem, angulo, config_ocr, chave_pagina)
+                if textos is not None:
+                    textos[angulo] = texto_limpo
                 
                 # Verificar se encontrou
-                if numero_nota in texto_limpo:
-                    return True, angulo
-                
-                # Verificar partes do número
-                if len(numero_nota) >= 6:
-                    partes = [
-                        numero_nota[-10:],
-                        numero_nota[-8:],  
-                        numero_nota[-6:],
-                        numero_nota[-4:],
-                    ]
-                    
-                    for parte in partes:
-                        if parte in texto_limpo:
-                            return True, angulo
+                with self.rastreador.span('correspondencia', angulo=angulo):
+                    pontuacao = self.contem_nota(texto_limpo, numero_nota)
+                if pontuacao:
+                    self.estatisticas.registrar(angulo)
+                    return pontuacao, angulo
                             
             except Exception as e:
                 continue
         
-        return False, 0
+        return 0.0, 0
+    
+    def preparar_imagem(self, imagem):
+        """Pré-processamento da página para o OCR, conforme o modo configurado"""
+        if self.preprocessamento == 'numpy':
+            try:
+                return PreprocessadorOCR.processar(imagem)
+            except Exception:
+                pass
+        return self.melhorar_imagem_para_ocr(self.imagem_pil(imagem))
     
     @staticmethod
     def melhorar_imagem_para_ocr(imagem):
@@ -210,74 +3590,98 @@ class OCRMultiOrientacao:
             return imagem
 
 class LocalizadorNotasDevolucoes(LocalizadorBase):
-    def __init__(self, caminho_base):
-        super().__init__(caminho_base)
-        self.ocr_multi = OCRMultiOrientacao()
+    MATRIZ_RENDER = 2.0  # Resolução maior para melhor detecção de orientação
+    ESCALAS_OCR = (1.4, MATRIZ_RENDER)
+    CODIGO_BARRAS_CONCLUSIVO = False  # A devolução cita a nota original no corpo, fora da chave
+    
+    def __init__(self, caminho_base, indice=None, motor_texto=None):
+        super().__init__(caminho_base, indice, motor_texto)
+        self.ocr_multi = OCRMultiOrientacao(rastreador=self.rastreador)
         
-    def converter_pdf_para_imagem_otimizado(self, pdf_path, pagina_num):
-        """Converte uma página PDF em imagem com otimizações"""
+    def converter_pdf_para_imagem_otimizado(self, pdf_path, pagina_num, escala=None):
+        """Renderiza a página em tons de cinza como array NumPy (vista do pixmap, sem cópia)"""
         if self._stop_event.is_set():
             return None
             
         try:
-            doc = fitz.open(pdf_path)
-            pagina = doc.load_page(pagina_num)
-            
             # Aumentar resolução para melhor detecção de orientação
-            matriz = fitz.Matrix(2.0, 2.0)
-            pix = pagina.get_pixmap(matrix=matriz)
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-            
-            doc.close()
-            return img
+            return self.documento(pdf_path).renderizar_array(pagina_num, escala or self.MATRIZ_RENDER)
             
         except Exception as e:
-            self.adicionar_debug(f"Erro ao converter PDF: {e}")
+            self.adicionar_debug(f"Erro ao converter PDF: {e}", nivel='erro')
             return None
     
-    def preprocessar_imagem_otimizado(self, imagem):
-        """Pré-processa a imagem de forma otimizada"""
-        try:
-            if imagem.mode != 'L':
-                imagem = imagem.convert('L')
-            
-            max_size = 2000
-            if max(imagem.size) > max_size:
-                ratio = max_size / max(imagem.size)
-                new_size = (int(imagem.size[0] * ratio), int(imagem.size[1] * ratio))
-                imagem = imagem.resize(new_size, Image.Resampling.LANCZOS)
-            
-            return imagem
-        except Exception as e:
-            self.adicionar_debug(f"Erro no pré-processamento: {e}")
-            return imagem
-    
-    def buscar_texto_ocr_multiorientacao(self, imagem, numero_nota):
+    def buscar_texto_ocr_multiorientacao(self, imagem, numero_nota, textos=None, chave_pagina=None):
         """OCR otimizado para todas as orientações"""
         if self._stop_event.is_set():
             return False
             
         try:
             # Melhorar imagem para OCR
-            imagem_melhorada = self.ocr_multi.melhorar_imagem_para_ocr(imagem)
+            with self.rastreador.span('preprocessamento'):
+                imagem_melhorada = self.ocr_multi.preparar_imagem(imagem)
             
-            config = r'--oem 3 --psm 6 -c tessedit_char_whitelist=0123456789'
+            config = self.ocr_multi.CONFIG_DIGITOS
             
             # Tentar todas as orientações
             encontrado, angulo = self.ocr_multi.tentar_todas_orientacoes(
-                imagem_melhorada, numero_nota, config
+                imagem_melhorada, numero_nota, config, textos, chave_pagina
             )
             
             if encontrado:
-                self.adicionar_debug(f"Texto encontrado com rotação de {angulo} graus")
-                return True
+                self.adicionar_debug(f"Texto encontrado com rotação de {angulo} graus (pontuação {encontrado:.2f})")
+                return encontrado
             
-            return False
+            return 0.0
             
         except Exception as e:
-            self.adicionar_debug(f"Erro no OCR multi-orientação: {e}")
+            self.adicionar_debug(f"Erro no OCR multi-orientação: {e}", nivel='erro')
             return False
     
+    def ler_ocr_escala(self, pdf_path, num_pagina, escala):
+        """OCR da página em todas as orientações necessárias, sem procurar nota"""
+        chave_pagina = self.ocr_multi.chave_pagina(pdf_path, num_pagina, escala, self.documento(pdf_path))
+        textos = {}
+        if self.triar_pagina(pdf_path, num_pagina, chave_pagina, textos):
+            return textos, True, chave_pagina
+        with self.reservar_memoria(pdf_path, num_pagina, escala):
+            imagem = self.converter_pdf_para_imagem_otimizado(pdf_path, num_pagina, escala)
+            if imagem is None:
+                return {}, False, chave_pagina
+            self.ler_codigo_barras(chave_pagina, textos, imagem)
+            
+            # A renderização sai de memória assim que a imagem preparada existe
+            with self.rastreador.span('preprocessamento', pagina=num_pagina + 1):
+                imagem = self.ocr_multi.preparar_imagem(imagem)
+            textos.update(self.ocr_multi.ler_todas_orientacoes(imagem, self.ocr_multi.CONFIG_DIGITOS, chave_pagina))
+        return textos, self.ocr_multi.leitura_completa(chave_pagina, textos), chave_pagina
+    
+    def buscar_ocr_pagina(self, pdf_path, num_pagina, numero_nota, escala, textos, somente_cache=False):
+        """OCR da página numa escala da cascata: (pontuacao, chave_pagina)"""
+        # OCR de buscas anteriores (outra nota no mesmo dia) dispensa a renderização
+        chave_pagina = self.ocr_multi.chave_pagina(pdf_path, num_pagina, escala, self.documento(pdf_path))
+        resolvido = self.ocr_multi.verificar_cache(chave_pagina, numero_nota, self.ocr_multi.CONFIG_DIGITOS, textos)
+        if resolvido is not None:
+            return resolvido[0], chave_pagina
+        pontuacao = self.buscar_codigo_barras(chave_pagina, numero_nota, textos)
+        if pontuacao is not None:
+            return pontuacao, chave_pagina
+        # Página sem dígitos impressos (pela miniatura) não vale a renderização nem o OCR
+        if self.triar_pagina(pdf_path, num_pagina, chave_pagina, textos, somente_cache):
+            return False, chave_pagina
+        if somente_cache:
+            return None
+        
+        with self.reservar_memoria(pdf_path, num_pagina, escala):
+            imagem = self.converter_pdf_para_imagem_otimizado(pdf_path, num_pagina, escala)
+            if imagem is None:
+                return False, chave_pagina
+            # A chave de acesso no código de barras dispensa o OCR em quatro orientações
+            pontuacao = self.buscar_codigo_barras(chave_pagina, numero_nota, textos, imagem)
+            if pontuacao is not None:
+                return pontuacao, chave_pagina
+            return self.buscar_texto_ocr_multiorientacao(imagem, numero_nota, textos, chave_pagina), chave_pagina
+    
     def buscar_texto_direto_pdf(self, pdf_path, numero_nota):
         """Busca textual no PDF"""
         if self._stop_event.is_set():
@@ -286,39 +3690,38 @@ class LocalizadorNotasDevolucoes(LocalizadorBase):
         try:
             paginas_encontradas = []
             
-            with open(pdf_path, 'rb') as arquivo:
-                leitor = PyPDF2.PdfReader(arquivo)
-                total_paginas = len(leitor.pages)
+            documento = self.documento(pdf_path)
+            self.registrar_total_paginas(pdf_path, documento.total_paginas)
+            
+            for num_pagina, texto in self.motor_texto.paginas(documento):
+                if self._stop_event.is_set():
+                    break
                 
-                for num_pagina in range(total_paginas):
-                    if self._stop_event.is_set():
-                        break
-                        
-                    pagina = leitor.pages[num_pagina]
-                    texto = pagina.extract_text()
-                    
-                    if texto:
-                        texto_limpo = re.sub(r'\s+', '', texto)
-                        
-                        if numero_nota in texto_limpo:
-                            paginas_encontradas.append(num_pagina + 1)
-                            return paginas_encontradas
-                        
-                        if len(numero_nota) >= 6:
-                            partes = [
-                                numero_nota[-10:],
-                                numero_nota[-8:], 
-                                numero_nota[-6:],
-                            ]
-                            for parte in partes:
-                                if parte in texto_limpo:
-                                    paginas_encontradas.append(num_pagina + 1)
-                                    return paginas_encontradas
+                self.indexar_pagina(pdf_path, num_pagina + 1, 'texto', texto)
+                
+                if self.casa_texto(texto, numero_nota):
+                    paginas_encontradas.append(num_pagina + 1)
+                    return paginas_encontradas
             
             return paginas_encontradas
         except Exception as e:
+            self.registrar_falha(pdf_path, f"Erro na busca textual em {pdf_path}", e)
             return []
     
+    def termos_busca(self, numero_nota):
+        """Termos aceitos como correspondência (número completo e finais)"""
+        termos = [numero_nota]
+        if len(numero_nota) >= 6:
+            termos += [numero_nota[-10:], numero_nota[-8:], numero_nota[-6:]]
+        return termos
+    
+    def casa_texto(self, texto, numero_nota):
+        """A nota ou um de seus finais no texto da página, ignorando os espaços"""
+        if not texto:
+            return False
+        texto_limpo = re.sub(r'\s+', '', texto)
+        return any(termo in texto_limpo for termo in self.termos_busca(numero_nota))
+    
     def buscar_nome_arquivo(self, pdf_path, numero_nota):
         """Verifica se o número da nota está no nome do arquivo"""
         nome_arquivo = os.path.basename(pdf_path)
@@ -339,12 +3742,11 @@ class LocalizadorNotasDevolucoes(LocalizadorBase):
         
         return False
     
-    def processar_pdf(self, pdf_info):
-        """Processa um PDF e notifica resultados parciais"""
-        pdf_path, numero_nota, pasta_dia, nome_arquivo = pdf_info
-        
+    @rastrear_arquivo
+    def etapas_baratas(self, pdf_path, numero_nota, pasta_dia, nome_arquivo):
+        """Nome, índice e texto do PDF: (páginas encontradas, páginas que ainda pedem OCR)"""
         if self._stop_event.is_set():
-            return None
+            return [], []
             
         try:
             resultados_paginas = []
@@ -360,10 +3762,14 @@ class LocalizadorNotasDevolucoes(LocalizadorBase):
                     'tipo': 'nome_arquivo'
                 }
                 self.notificar_resultado_parcial(resultado)
-                return pdf_path, resultados_paginas
+                return resultados_paginas, []
             
-            # 2. Busca textual direta
-            paginas_texto = self.buscar_texto_direto_pdf(pdf_path, numero_nota)
+            # 2. Busca textual: pelo índice se ele já responde pela leitura do PDF, senão direta
+            paginas_texto = self.paginas_texto_indice(pdf_path, numero_nota)
+            tipo = 'indice'
+            if paginas_texto is None:
+                paginas_texto = self.buscar_texto_direto_pdf(pdf_path, numero_nota)
+                tipo = 'texto_direto'
             if paginas_texto:
                 resultados_paginas.extend(paginas_texto)
                 for pagina in paginas_texto:
@@ -372,45 +3778,92 @@ class LocalizadorNotasDevolucoes(LocalizadorBase):
                         'pagina': pagina,
                         'pasta_dia': pasta_dia,
                         'nome_arquivo': nome_arquivo,
-                        'tipo': 'texto_direto'
+                        'tipo': tipo
                     }
                     self.notificar_resultado_parcial(resultado)
-                return pdf_path, resultados_paginas
+                return resultados_paginas, []
             
-            # 3. OCR multi-orientação
-            with open(pdf_path, 'rb') as arquivo:
-                leitor = PyPDF2.PdfReader(arquivo)
-                total_paginas = len(leitor.pages)
+            # 3. OCR multi-orientação fica para depois: quais páginas ainda precisam dele
+            if not self.usar_ocr:
+                return [], []
             
-            for num_pagina in range(total_paginas):
+            total_paginas = self.total_paginas_indexado(pdf_path)
+            if total_paginas is None:
+                total_paginas = self.documento(pdf_path).total_paginas
+                self.registrar_total_paginas(pdf_path, total_paginas)
+            
+            # Páginas já lidas em todas as orientações são julgadas pelo índice
+            paginas_ocr, pagina_indice = self.paginas_pendentes_ocr(pdf_path, numero_nota, range(total_paginas))
+            if pagina_indice and not paginas_ocr:
+                resultado = {
+                    'arquivo': pdf_path,
+                    'pagina': pagina_indice,
+                    'pasta_dia': pasta_dia,
+                    'nome_arquivo': nome_arquivo,
+                    'tipo': 'indice'
+                }
+                self.notificar_resultado_parcial(resultado)
+                return [pagina_indice], []
+            if pagina_indice:
+                paginas_ocr.append(pagina_indice - 1)  # Resolvida pelo índice se as anteriores não tiverem a nota
+            return [], paginas_ocr
+            
+        except Exception as e:
+            self.registrar_falha(pdf_path, f"Erro ao processar {pdf_path}", e)
+            return [], []
+        finally:
+            self.fechar_documento(pdf_path)
+    
+    @rastrear_arquivo
+    def etapa_ocr(self, pdf_path, numero_nota, pasta_dia, nome_arquivo, paginas):
+        """OCR multi-orientação das páginas, até a primeira que tiver a nota"""
+        try:
+            resultados_paginas = []
+            paginas_ocr_indexadas = self.consultar_indice(pdf_path, 'ocr', completas=True, numero_nota=numero_nota)
+            
+            for num_pagina in paginas:
                 if self._stop_event.is_set():
                     break
-                    
-                imagem = self.converter_pdf_para_imagem_otimizado(pdf_path, num_pagina)
-                if imagem:
-                    encontrado = self.buscar_texto_ocr_multiorientacao(imagem, numero_nota)
-                    if encontrado:
-                        resultados_paginas.append(num_pagina + 1)
-                        resultado = {
-                            'arquivo': pdf_path,
-                            'pagina': num_pagina + 1,
-                            'pasta_dia': pasta_dia,
-                            'nome_arquivo': nome_arquivo,
-                            'tipo': 'ocr'
-                        }
-                        self.notificar_resultado_parcial(resultado)
-                        break
+                
+                # Página já lida por completo: as leituras guardadas respondem sem OCR
+                textos_ocr, tipo = paginas_ocr_indexadas.get(num_pagina + 1), 'indice'
+                if textos_ocr is not None:
+                    encontrado = self.pontuacao_indice(textos_ocr, numero_nota)
+                else:
+                    textos_ocr, tipo = {}, 'ocr'
+                    encontrado, chave_pagina = self.buscar_ocr_em_cascata(
+                        functools.partial(self.buscar_ocr_pagina, pdf_path, num_pagina, numero_nota), textos_ocr)
+                    self.indexar_pagina(pdf_path, num_pagina + 1, 'ocr', textos_ocr,
+                                        completo=self.leitura_ocr_completa(chave_pagina, textos_ocr))
+                if encontrado:
+                    resultados_paginas.append(num_pagina + 1)
+                    resultado = {
+                        'arquivo': pdf_path,
+                        'pagina': num_pagina + 1,
+                        'pasta_dia': pasta_dia,
+                        'nome_arquivo': nome_arquivo,
+                        'tipo': tipo,
+                        'pontuacao': round(encontrado, 2)
+                    }
+                    self.notificar_resultado_parcial(resultado)
+                    break
             
-            return pdf_path, resultados_paginas if resultados_paginas else None
+            return resultados_paginas
             
         except Exception as e:
-            return pdf_path, None
+            self.registrar_falha(pdf_path, f"Erro no OCR de {pdf_path}", e)
+            return []
+        finally:
+            self.fechar_documento(pdf_path)
+    
+    def buscar(self, mes, dia, numero_nota):
+        return self.buscar_nota(mes, dia, numero_nota)
     
     def buscar_nota(self, mes, dia, numero_nota, max_workers=2):
         """Busca principal com notificação de resultados parciais"""
         self.reset_search()
         self.resultados = []
-        self.debug_info = []
+        self.log.limpar()
         numero_nota = numero_nota.strip()
         
         self.adicionar_debug(f"Buscando nota {numero_nota} para {dia}/{mes}")
@@ -418,7 +3871,7 @@ class LocalizadorNotasDevolucoes(LocalizadorBase):
         mes_pasta = self.normalizar_mes(mes)
         caminho_mes = os.path.join(self.caminho_base, mes_pasta)
         
-        if not os.path.exists(caminho_mes):
+        if not self.pasta_existe(caminho_mes):
             return f"Pasta do mês {mes} não encontrada"
         
         # Buscar nas pastas de dias
@@ -432,125 +3885,126 @@ class LocalizadorNotasDevolucoes(LocalizadorBase):
             caminho_dia = pasta_info['caminho']
             pasta_nome = pasta_info['nome']
             
-            for arquivo in os.listdir(caminho_dia):
-                if arquivo.lower().endswith('.pdf'):
-                    pdf_path = os.path.join(caminho_dia, arquivo)
-                    pdfs_para_processar.append((
-                        pdf_path,
-                        numero_nota,
-                        pasta_nome,
-                        arquivo
-                    ))
+            for arquivo in self.listar_pdfs(caminho_dia):
+                pdf_path = os.path.join(caminho_dia, arquivo)
+                pdfs_para_processar.append((
+                    pdf_path,
+                    pasta_nome,
+                    arquivo
+                ))
         
         if not pdfs_para_processar:
             return f"Nenhum PDF encontrado para o dia {dia}"
         
-        # Processar PDFs em paralelo
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = {
-                executor.submit(self.processar_pdf, pdf_info): pdf_info 
-                for pdf_info in pdfs_para_processar
-            }
-            
-            for future in as_completed(futures):
-                if self._stop_event.is_set():
-                    executor.shutdown(wait=False)
-                    break
-                    
-                pdf_info = futures[future]
-                pdf_path, numero_nota, pasta_dia, nome_arquivo = pdf_info
-                
-                try:
-                    resultado_path, paginas = future.result()
-                    
-                    if paginas:
-                        for pagina in paginas:
-                            resultado = {
-                                'arquivo': pdf_path,
-                                'pagina': pagina,
-                                'pasta_dia': pasta_dia,
-                                'nome_arquivo': nome_arquivo
-                            }
-                            if resultado not in self.resultados:
-                                self.resultados.append(resultado)
-                            
-                except Exception:
-                    pass
+        # Processar PDFs em paralelo: nome, índice e texto de todos antes de qualquer OCR
+        for (pdf_path, pasta_dia, nome_arquivo), paginas in self.executar_em_etapas(
+                pdfs_para_processar, numero_nota, max_workers):
+            for pagina in paginas:
+                resultado = {
+                    'arquivo': pdf_path,
+                    'pagina': pagina,
+                    'pasta_dia': pasta_dia,
+                    'nome_arquivo': nome_arquivo
+                }
+                if resultado not in self.resultados:
+                    self.resultados.append(resultado)
         
-        return self.resultados
+        return self.resultados_com_falhas(self.resultados)
 
 class LocalizadorNotasFiscais(LocalizadorBase):
-    def __init__(self, caminho_base):
-        super().__init__(caminho_base)
-        self.ocr_multi = OCRMultiOrientacao()
+    MATRIZ_RENDER = 1.8
+    ESCALAS_OCR = (1.3, MATRIZ_RENDER)
+    MAX_PAGINAS_OCR = 10  # Notas de entrada vêm em PDFs curtos: o resto do arquivo não vale o OCR
+    
+    def __init__(self, caminho_base, indice=None, motor_texto=None):
+        super().__init__(caminho_base, indice, motor_texto)
+        self.ocr_multi = OCRMultiOrientacao(rastreador=self.rastreador)
     
-    def converter_pdf_para_imagem_otimizado(self, pdf_path, pagina_num):
-        """Converte uma página PDF em imagem com otimizações"""
+    def converter_pdf_para_imagem_otimizado(self, pdf_path, pagina_num, escala=None):
+        """Renderiza a página em tons de cinza como array NumPy (vista do pixmap, sem cópia)"""
         if self._stop_event.is_set():
             return None
             
         try:
-            doc = fitz.open(pdf_path)
-            pagina = doc.load_page(pagina_num)
-            
             # Usar resolução adequada para detecção de orientação
-            matriz = fitz.Matrix(1.8, 1.8)
-            pix = pagina.get_pixmap(matrix=matriz)
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-            
-            doc.close()
-            return img
+            return self.documento(pdf_path).renderizar_array(pagina_num, escala or self.MATRIZ_RENDER)
             
         except Exception as e:
-            self.adicionar_debug(f"Erro ao converter PDF {pdf_path}, página {pagina_num}: {e}")
+            self.adicionar_debug(f"Erro ao converter PDF {pdf_path}, página {pagina_num}: {e}", nivel='erro')
             return None
     
-    def preprocessar_imagem_otimizado(self, imagem):
-        """Pré-processa a imagem de forma otimizada"""
-        try:
-            # Converter para escala de cinza
-            if imagem.mode != 'L':
-                imagem = imagem.convert('L')
-            
-            # Redimensionar imagem se for muito grande (mantém proporção)
-            max_size = 1600
-            if max(imagem.size) > max_size:
-                ratio = max_size / max(imagem.size)
-                new_size = (int(imagem.size[0] * ratio), int(imagem.size[1] * ratio))
-                imagem = imagem.resize(new_size, Image.Resampling.LANCZOS)
-            
-            return imagem
-        except Exception as e:
-            self.adicionar_debug(f"Erro no pré-processamento: {e}")
-            return imagem
-    
-    def buscar_texto_ocr_multiorientacao(self, imagem, numero_nota):
+    def buscar_texto_ocr_multiorientacao(self, imagem, numero_nota, textos=None, chave_pagina=None):
         """OCR otimizado para todas as orientações"""
         if self._stop_event.is_set():
             return False
             
         try:
             # Melhorar imagem primeiro
-            imagem_melhorada = self.ocr_multi.melhorar_imagem_para_ocr(imagem)
+            with self.rastreador.span('preprocessamento'):
+                imagem_melhorada = self.ocr_multi.preparar_imagem(imagem)
             
             # Configuração única otimizada para números
-            config = r'--oem 3 --psm 6 -c tessedit_char_whitelist=0123456789'
+            config = self.ocr_multi.CONFIG_DIGITOS
             
             # Tentar todas as orientações
             encontrado, angulo = self.ocr_multi.tentar_todas_orientacoes(
-                imagem_melhorada, numero_nota, config
+                imagem_melhorada, numero_nota, config, textos, chave_pagina
             )
             
             if encontrado:
-                self.adicionar_debug(f"Nota encontrada com rotação de {angulo}°")
-                return True
+                self.adicionar_debug(f"Nota encontrada com rotação de {angulo}° (pontuação {encontrado:.2f})")
+                return encontrado
             
-            return False
+            return 0.0
             
         except Exception as e:
-            self.adicionar_debug(f"Erro no OCR multi-orientação: {e}")
+            self.adicionar_debug(f"Erro no OCR multi-orientação: {e}", nivel='erro')
             return False
     
+    def ler_ocr_escala(self, pdf_path, num_pagina, escala):
+        """OCR da página em todas as orientações necessárias, sem procurar nota"""
+        chave_pagina = self.ocr_multi.chave_pagina(pdf_path, num_pagina, escala, self.documento(pdf_path))
+        textos = {}
+        if self.triar_pagina(pdf_path, num_pagina, chave_pagina, textos):
+            return textos, True, chave_pagina
+        with self.reservar_memoria(pdf_path, num_pagina, escala):
+            imagem = self.converter_pdf_para_imagem_otimizado(pdf_path, num_pagina, escala)
+            if imagem is None:
+                return {}, False, chave_pagina
+            self.ler_codigo_barras(chave_pagina, textos, imagem)
+            
+            # A renderização sai de memória assim que a imagem preparada existe
+            with self.rastreador.span('preprocessamento', pagina=num_pagina + 1):
+                imagem = self.ocr_multi.preparar_imagem(imagem)
+            textos.update(self.ocr_multi.ler_todas_orientacoes(imagem, self.ocr_multi.CONFIG_DIGITOS, chave_pagina))
+        return textos, self.ocr_multi.leitura_completa(chave_pagina, textos), chave_pagina
+    
+    def buscar_ocr_pagina(self, pdf_path, num_pagina, numero_nota, escala, textos, somente_cache=False):
+        """OCR da página numa escala da cascata: (pontuacao, chave_pagina)"""
+        # OCR de buscas anteriores (outra nota no mesmo dia) dispensa a renderização
+        chave_pagina = self.ocr_multi.chave_pagina(pdf_path, num_pagina, escala, self.documento(pdf_path))
+        resolvido = self.ocr_multi.verificar_cache(chave_pagina, numero_nota, self.ocr_multi.CONFIG_DIGITOS, textos)
+        if resolvido is not None:
+            return resolvido[0], chave_pagina
+        pontuacao = self.buscar_codigo_barras(chave_pagina, numero_nota, textos)
+        if pontuacao is not None:
+            return pontuacao, chave_pagina
+        # Página sem dígitos impressos (pela miniatura) não vale a renderização nem o OCR
+        if self.triar_pagina(pdf_path, num_pagina, chave_pagina, textos, somente_cache):
+            return False, chave_pagina
+        if somente_cache:
+            return None
+        
+        with self.reservar_memoria(pdf_path, num_pagina, escala):
+            imagem = self.converter_pdf_para_imagem_otimizado(pdf_path, num_pagina, escala)
+            if imagem is None:
+                return False, chave_pagina
+            # A chave de acesso no código de barras dispensa o OCR em quatro orientações
+            pontuacao = self.buscar_codigo_barras(chave_pagina, numero_nota, textos, imagem)
+            if pontuacao is not None:
+                return pontuacao, chave_pagina
+            return self.buscar_texto_ocr_multiorientacao(imagem, numero_nota, textos, chave_pagina), chave_pagina
+    
     def buscar_texto_direto_pdf_otimizado(self, pdf_path, numero_nota):
         """Busca textual otimizada com leitura em chunks"""
         if self._stop_event.is_set():
@@ -559,29 +4013,33 @@ class LocalizadorNotasFiscais(LocalizadorBase):
         try:
             paginas_encontradas = []
             
-            with open(pdf_path, 'rb') as arquivo:
-                leitor = PyPDF2.PdfReader(arquivo)
+            documento = self.documento(pdf_path)
+            
+            # Verificar número total de páginas primeiro
+            self.registrar_total_paginas(pdf_path, documento.total_paginas)
+            
+            for num_pagina, texto in self.motor_texto.paginas(documento):
+                if self._stop_event.is_set():
+                    break
                 
-                # Verificar número total de páginas primeiro
-                total_paginas = len(leitor.pages)
+                self.indexar_pagina(pdf_path, num_pagina + 1, 'texto', texto)
                 
-                for num_pagina in range(total_paginas):
-                    if self._stop_event.is_set():
-                        break
-                        
-                    pagina = leitor.pages[num_pagina]
-                    texto = pagina.extract_text()
-                    
-                    if texto and numero_nota in texto:
-                        paginas_encontradas.append(num_pagina + 1)
-                        self.adicionar_debug(f"Encontrado via texto direto em {pdf_path} página {num_pagina + 1}")
-                        break  # Parar na primeira ocorrência
+                if self.casa_texto(texto, numero_nota):
+                    paginas_encontradas.append(num_pagina + 1)
+                    self.adicionar_debug(f"Encontrado via texto direto em {pdf_path} página {num_pagina + 1}")
+                    break  # Parar na primeira ocorrência
             
             return paginas_encontradas
         except Exception as e:
-            self.adicionar_debug(f"Erro na busca direta: {e}")
+            self.registrar_falha(pdf_path, f"Erro na busca direta em {pdf_path}", e)
             return []
     
+    def partes_nota(self, numero_nota, metodo):
+        """Nome e texto exigem a nota inteira; o OCR aceita os finais"""
+        if metodo == 'ocr':
+            return super().partes_nota(numero_nota, metodo)
+        return [numero_nota]
+    
     def buscar_nome_arquivo(self, pdf_path, numero_nota):
         """Verifica se o número da nota está no nome do arquivo"""
         nome_arquivo = os.path.basename(pdf_path)
@@ -590,12 +4048,11 @@ class LocalizadorNotasFiscais(LocalizadorBase):
             return True
         return False
     
-    def processar_pdf_paralelo(self, pdf_info):
-        """Processa um PDF em paralelo e notifica resultados parciais"""
-        pdf_path, numero_nota, pasta_dia, nome_arquivo = pdf_info
-        
+    @rastrear_arquivo
+    def etapas_baratas(self, pdf_path, numero_nota, pasta_dia, nome_arquivo):
+        """Nome, índice e texto do PDF: (páginas encontradas, páginas que ainda pedem OCR)"""
         if self._stop_event.is_set():
-            return None
+            return [], []
             
         try:
             resultados_paginas = []
@@ -611,10 +4068,16 @@ class LocalizadorNotasFiscais(LocalizadorBase):
                     'tipo': 'nome_arquivo'
                 }
                 self.notificar_resultado_parcial(resultado)
-                return pdf_path, resultados_paginas
+                return resultados_paginas, []
             
-            # Estratégia 2: Busca textual direta
-            paginas_texto = self.buscar_texto_direto_pdf_otimizado(pdf_path, numero_nota)
+            # Estratégia 2: Busca textual, pelo índice se ele já responde pela leitura do PDF
+            paginas_texto = self.paginas_texto_indice(pdf_path, numero_nota)
+            tipo = 'indice'
+            if paginas_texto is None:
+                paginas_texto = self.buscar_texto_direto_pdf_otimizado(pdf_path, numero_nota)
+                tipo = 'texto_direto'
+            elif paginas_texto:
+                self.adicionar_debug(f"Encontrado via índice em {pdf_path} página(s) {paginas_texto}")
             if paginas_texto:
                 resultados_paginas.extend(paginas_texto)
                 for pagina in paginas_texto:
@@ -623,52 +4086,95 @@ class LocalizadorNotasFiscais(LocalizadorBase):
                         'pagina': pagina,
                         'pasta_dia': pasta_dia,
                         'nome_arquivo': nome_arquivo,
-                        'tipo': 'texto_direto'
+                        'tipo': tipo
                     }
                     self.notificar_resultado_parcial(resultado)
-                return pdf_path, resultados_paginas
+                return resultados_paginas, []
             
-            # Estratégia 3: OCR multi-orientação
-            if not resultados_paginas:
-                self.adicionar_debug(f"Usando OCR multi-orientação para: {os.path.basename(pdf_path)}")
-                
-                with open(pdf_path, 'rb') as arquivo:
-                    leitor = PyPDF2.PdfReader(arquivo)
-                    total_paginas = len(leitor.pages)
-                
-                # Limitar número de páginas para OCR
-                max_paginas_ocr = min(total_paginas, 10)  # Máximo 10 páginas por PDF
+            # Estratégia 3 (OCR multi-orientação) fica para depois: quais páginas ainda precisam dele
+            if not self.usar_ocr:
+                return [], []
+            
+            total_paginas = self.total_paginas_indexado(pdf_path)
+            if total_paginas is None:
+                total_paginas = self.documento(pdf_path).total_paginas
+                self.registrar_total_paginas(pdf_path, total_paginas)
+            
+            # Limitar número de páginas para OCR; as já lidas são julgadas pelo índice
+            max_paginas_ocr = min(total_paginas, self.MAX_PAGINAS_OCR)
+            paginas_ocr, pagina_indice = self.paginas_pendentes_ocr(pdf_path, numero_nota, range(max_paginas_ocr))
+            if pagina_indice and not paginas_ocr:
+                self.adicionar_debug(f"Encontrado via índice em {pdf_path} página {pagina_indice}")
+                resultado = {
+                    'arquivo': pdf_path,
+                    'pagina': pagina_indice,
+                    'pasta_dia': pasta_dia,
+                    'nome_arquivo': nome_arquivo,
+                    'tipo': 'indice'
+                }
+                self.notificar_resultado_parcial(resultado)
+                return [pagina_indice], []
+            if pagina_indice:
+                paginas_ocr.append(pagina_indice - 1)  # Resolvida pelo índice se as anteriores não tiverem a nota
+            return [], paginas_ocr
+            
+        except Exception as e:
+            self.registrar_falha(pdf_path, f"Erro ao processar {pdf_path}", e)
+            return [], []
+        finally:
+            self.fechar_documento(pdf_path)
+    
+    @rastrear_arquivo
+    def etapa_ocr(self, pdf_path, numero_nota, pasta_dia, nome_arquivo, paginas):
+        """OCR multi-orientação das páginas, até a primeira que tiver a nota"""
+        try:
+            resultados_paginas = []
+            paginas_ocr_indexadas = self.consultar_indice(pdf_path, 'ocr', completas=True, numero_nota=numero_nota)
+            self.adicionar_debug(f"Usando OCR multi-orientação para: {os.path.basename(pdf_path)}")
+            
+            for num_pagina in paginas:
+                if self._stop_event.is_set():
+                    break
                 
-                for num_pagina in range(max_paginas_ocr):
-                    if self._stop_event.is_set():
-                        break
-                        
-                    imagem = self.converter_pdf_para_imagem_otimizado(pdf_path, num_pagina)
-                    if imagem:
-                        encontrado = self.buscar_texto_ocr_multiorientacao(imagem, numero_nota)
-                        if encontrado:
-                            resultados_paginas.append(num_pagina + 1)
-                            resultado = {
-                                'arquivo': pdf_path,
-                                'pagina': num_pagina + 1,
-                                'pasta_dia': pasta_dia,
-                                'nome_arquivo': nome_arquivo,
-                                'tipo': 'ocr'
-                            }
-                            self.notificar_resultado_parcial(resultado)
-                            break
-            
-            return pdf_path, resultados_paginas if resultados_paginas else None
+                # Página já lida por completo: as leituras guardadas respondem sem OCR
+                textos_ocr, tipo = paginas_ocr_indexadas.get(num_pagina + 1), 'indice'
+                if textos_ocr is not None:
+                    encontrado = self.pontuacao_indice(textos_ocr, numero_nota)
+                else:
+                    textos_ocr, tipo = {}, 'ocr'
+                    encontrado, chave_pagina = self.buscar_ocr_em_cascata(
+                        functools.partial(self.buscar_ocr_pagina, pdf_path, num_pagina, numero_nota), textos_ocr)
+                    self.indexar_pagina(pdf_path, num_pagina + 1, 'ocr', textos_ocr,
+                                        completo=self.leitura_ocr_completa(chave_pagina, textos_ocr))
+                if encontrado:
+                    resultados_paginas.append(num_pagina + 1)
+                    resultado = {
+                        'arquivo': pdf_path,
+                        'pagina': num_pagina + 1,
+                        'pasta_dia': pasta_dia,
+                        'nome_arquivo': nome_arquivo,
+                        'tipo': tipo,
+                        'pontuacao': round(encontrado, 2)
+                    }
+                    self.notificar_resultado_parcial(resultado)
+                    break
+            
+            return resultados_paginas
             
         except Exception as e:
-            self.adicionar_debug(f"Erro ao processar {pdf_path}: {e}")
-            return pdf_path, None
+            self.registrar_falha(pdf_path, f"Erro ao processar {pdf_path}", e)
+            return []
+        finally:
+            self.fechar_documento(pdf_path)
+    
+    def buscar(self, mes, dia, numero_nota):
+        return self.buscar_nota_otimizada(mes, dia, numero_nota)
     
     def buscar_nota_otimizada(self, mes, dia, numero_nota, max_workers=3):
         """Busca otimizada com processamento paralelo e notificação de resultados parciais"""
         self.reset_search()
         self.resultados = []
-        self.debug_info = []
+        self.log.limpar()
         numero_nota = numero_nota.strip()
         
         self.adicionar_debug(f"Iniciando busca otimizada: {dia}/{mes} - Nota: {numero_nota}")
@@ -676,7 +4182,7 @@ class LocalizadorNotasFiscais(LocalizadorBase):
         mes_pasta = self.normalizar_mes(mes)
         caminho_mes = os.path.join(self.caminho_base, mes_pasta)
         
-        if not os.path.exists(caminho_mes):
+        if not self.pasta_existe(caminho_mes):
             return f"Pasta do mês {mes} não encontrada em {caminho_mes}"
         
         # Buscar nas pastas de dias
@@ -693,133 +4199,348 @@ class LocalizadorNotasFiscais(LocalizadorBase):
             self.adicionar_debug(f"Buscando na pasta: {pasta_nome}")
             
             # Coletar todos os PDFs primeiro
-            for arquivo in os.listdir(caminho_dia):
-                if arquivo.lower().endswith('.pdf'):
-                    pdfs_para_processar.append((
-                        os.path.join(caminho_dia, arquivo),
-                        numero_nota,
-                        pasta_nome,
-                        arquivo
-                    ))
+            for arquivo in self.listar_pdfs(caminho_dia):
+                pdfs_para_processar.append((
+                    os.path.join(caminho_dia, arquivo),
+                    pasta_nome,
+                    arquivo
+                ))
         
         if not pdfs_para_processar:
             return f"Nenhum PDF encontrado para o dia {dia} em {mes}"
         
-        # Processar PDFs em paralelo
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = {
-                executor.submit(self.processar_pdf_paralelo, pdf_info): pdf_info 
-                for pdf_info in pdfs_para_processar
-            }
+        # Processar PDFs em paralelo: nome, índice e texto de todos antes de qualquer OCR
+        for (pdf_path, pasta_dia, nome_arquivo), paginas in self.executar_em_etapas(
+                pdfs_para_processar, numero_nota, max_workers):
+            for pagina in paginas:
+                resultado = {
+                    'arquivo': pdf_path,
+                    'pagina': pagina,
+                    'pasta_dia': pasta_dia,
+                    'nome_arquivo': nome_arquivo
+                }
+                if resultado not in self.resultados:
+                    self.resultados.append(resultado)
+        
+        self.adicionar_debug(f"Busca finalizada. {len(self.resultados)} resultado(s) encontrado(s)", nivel='info')
+        return self.resultados_com_falhas(self.resultados)
+
+class DetectorCanhoto:
+    """Localiza a faixa do canhoto nas bordas da página por projeção de tinta e linhas de régua"""
+    
+    LIMIAR_TINTA = 160  # Pixels mais escuros que isso contam como tinta
+    LADO_ANALISE = 1000  # A análise roda numa versão reduzida da página
+    INICIO_JANELA = 0.03  # Ignora molduras coladas na borda
+    FIM_JANELA = 0.22  # O canhoto ocupa no máximo essa fração a partir da borda
+    FRACAO_LINHA = 0.45  # Fração de tinta para uma linha/coluna ser régua (pontilhada inclusive)
+    FRACAO_VAZIO = 0.004  # Fração de tinta abaixo da qual a linha/coluna é considerada vazia
+    ESPACO_MINIMO = 0.01  # Altura mínima do espaço em branco que separa o canhoto
+    TINTA_MINIMA = 0.005  # Faixas quase vazias não valem o OCR
+    MARGEM = 0.01
+    
+    @staticmethod
+    def _suavizar(perfil):
+        """Máximo numa janela de 3 posições (tolera linhas levemente inclinadas)"""
+        suave = perfil.copy()
+        suave[1:] = np.maximum(suave[1:], perfil[:-1])
+        suave[:-1] = np.maximum(suave[:-1], perfil[1:])
+        return suave
+    
+    @classmethod
+    def _profundidade_faixa(cls, perfil):
+        """Distância da borda (início do perfil) até o fim do canhoto, e se veio de uma régua"""
+        tamanho = perfil.size
+        inicio = int(tamanho * cls.INICIO_JANELA)
+        fim = int(tamanho * cls.FIM_JANELA)
+        janela = perfil[inicio:fim]
+        
+        # Régua (linha contínua ou pontilhada) mais afastada da borda dentro da janela
+        reguas = np.flatnonzero(cls._suavizar(janela) >= cls.FRACAO_LINHA)
+        if reguas.size:
+            return inicio + int(reguas[-1]) + 1, True
+        
+        # Sem régua: primeiro espaço em branco depois de algum conteúdo
+        espaco = max(1, int(tamanho * cls.ESPACO_MINIMO))
+        vazias = (janela < cls.FRACAO_VAZIO).astype(np.int32)
+        if vazias.size < espaco:
+            return None, False
+        trechos = np.flatnonzero(np.convolve(vazias, np.ones(espaco, dtype=np.int32), 'valid') == espaco)
+        conteudo = np.flatnonzero(~vazias.astype(bool))
+        if conteudo.size:
+            trechos = trechos[trechos > conteudo[0]]
+        if trechos.size:
+            return inicio + int(trechos[0]), False
+        return None, False
+    
+    @classmethod
+    def regioes(cls, imagem):
+        """Retorna [(caixa, orientacoes, por_regua)] com as faixas candidatas a canhoto
+        
+        `caixa` é (x0, y0, x1, y1) nas coordenadas da imagem e `orientacoes`
+        os ângulos de leitura plausíveis para uma faixa naquela borda.
+        """
+        cinza = OCRMultiOrientacao.array_cinza(imagem)
+        escala = max(1, int(np.ceil(max(cinza.shape) / cls.LADO_ANALISE)))
+        tinta = cinza[::escala, ::escala] < cls.LIMIAR_TINTA
+        altura, largura = tinta.shape
+        perfil_linhas = tinta.mean(axis=1)
+        perfil_colunas = tinta.mean(axis=0)
+        
+        # (perfil a partir da borda, tamanho, borda, ângulos de leitura)
+        bordas = [
+            (perfil_linhas, altura, 'topo', [0, 180]),
+            (perfil_linhas[::-1], altura, 'base', [180, 0]),
+            (perfil_colunas, largura, 'esquerda', [270, 90]),
+            (perfil_colunas[::-1], largura, 'direita', [90, 270]),
+        ]
+        
+        regioes = []
+        for perfil, tamanho, borda, orientacoes in bordas:
+            profundidade, por_regua = cls._profundidade_faixa(perfil)
+            if profundidade is None:
+                continue
+            profundidade = min(tamanho, profundidade + int(tamanho * cls.MARGEM))
             
-            for future in as_completed(futures):
-                if self._stop_event.is_set():
-                    executor.shutdown(wait=False)
-                    break
-                    
-                pdf_info = futures[future]
-                pdf_path, numero_nota, pasta_dia, nome_arquivo = pdf_info
-                
-                try:
-                    resultado_path, paginas = future.result()
-                    
-                    if paginas:
-                        for pagina in paginas:
-                            resultado = {
-                                'arquivo': pdf_path,
-                                'pagina': pagina,
-                                'pasta_dia': pasta_dia,
-                                'nome_arquivo': nome_arquivo
-                            }
-                            if resultado not in self.resultados:
-                                self.resultados.append(resultado)
-                            
-                except Exception as e:
-                    self.adicionar_debug(f"Erro no processamento paralelo: {e}")
+            if borda == 'topo':
+                caixa = (0, 0, largura, profundidade)
+            elif borda == 'base':
+                caixa = (0, altura - profundidade, largura, altura)
+            elif borda == 'esquerda':
+                caixa = (0, 0, profundidade, altura)
+            else:
+                caixa = (largura - profundidade, 0, largura, altura)
+            
+            x0, y0, x1, y1 = caixa
+            if tinta[y0:y1, x0:x1].mean() < cls.TINTA_MINIMA:
+                continue
+            
+            caixa_original = (x0 * escala, y0 * escala,
+                              min(cinza.shape[1], x1 * escala), min(cinza.shape[0], y1 * escala))
+            regioes.append((caixa_original, orientacoes, por_regua))
         
-        self.adicionar_debug(f"Busca finalizada. {len(self.resultados)} resultado(s) encontrado(s)")
-        return self.resultados
+        return regioes
 
 class BuscadorCanhotosAvancado(LocalizadorBase):
-    def __init__(self, caminho_base):
-        super().__init__(caminho_base)
+    MATRIZ_RENDER = 3.0  # Aumentar a resolução
+    ESCALAS_OCR = (2.0, MATRIZ_RENDER)
+    
+    def __init__(self, caminho_base, indice=None, motor_texto=None):
+        super().__init__(caminho_base, indice, motor_texto)
         self.usar_ocr = True  # Ativar OCR como fallback
-        self.ocr_multi = OCRMultiOrientacao()
+        self.recortar_canhoto = True  # OCR só nas faixas do canhoto antes da página inteira
+        self.paginas_paralelas = 2  # Páginas do mesmo PDF no OCR ao mesmo tempo
+        self.ocr_multi = OCRMultiOrientacao(rastreador=self.rastreador)
     
     def melhorar_imagem_ocr(self, imagem):
         """Melhora a imagem para OCR"""
+        with self.rastreador.span('preprocessamento'):
+            if self.ocr_multi.preprocessamento == 'numpy':
+                try:
+                    return PreprocessadorOCR.processar(imagem)
+                except Exception as e:
+                    self.adicionar_debug(f"Erro no pré-processamento NumPy, usando PIL: {e}", nivel='erro')
+            imagem = self.ocr_multi.imagem_pil(imagem)
+            try:
+                # Aumentar contraste
+                enhancer = ImageEnhance.Contrast(imagem)
+                imagem = enhancer.enhance(2.0)
+                
+                # Aumentar nitidez
+                enhancer = ImageEnhance.Sharpness(imagem)
+                imagem = enhancer.enhance(2.0)
+                
+                # Aumentar brilho se necessário
+                enhancer = ImageEnhance.Brightness(imagem)
+                imagem = enhancer.enhance(1.1)
+                
+                return imagem
+            except Exception as e:
+                self.adicionar_debug(f"Erro no pré-processamento de imagem: {e}", nivel='erro')
+                return imagem
+    
+    def buscar_com_ocr_multiorientacao(self, pdf_path, numero_nota, num_pagina, textos=None):
+        """Busca o texto usando OCR em todas as orientações, subindo de resolução só se preciso
+        
+        Retorna (encontrado, chave_pagina) da escala usada.
+        """
+        return self.buscar_ocr_em_cascata(
+            functools.partial(self.buscar_ocr_pagina, pdf_path, num_pagina, numero_nota),
+            textos if textos is not None else {})
+    
+    def buscar_ocr_pagina(self, pdf_path, num_pagina, numero_nota, escala, textos, somente_cache=False):
+        """OCR da página numa escala da cascata: (pontuacao, chave_pagina)"""
+        chave_pagina = None
         try:
-            # Aumentar contraste
-            enhancer = ImageEnhance.Contrast(imagem)
-            imagem = enhancer.enhance(2.0)
+            # Configurações do Tesseract
+            config_tesseract = self.ocr_multi.CONFIG_DIGITOS
             
-            # Aumentar nitidez
-            enhancer = ImageEnhance.Sharpness(imagem)
-            imagem = enhancer.enhance(2.0)
+            # OCR de buscas anteriores (outra nota no mesmo dia) dispensa a renderização
+            chave_pagina = self.ocr_multi.chave_pagina(pdf_path, num_pagina, escala, self.documento(pdf_path))
+            resolvido = self.ocr_multi.verificar_cache(chave_pagina, numero_nota, config_tesseract, textos)
+            if resolvido is not None:
+                encontrado, angulo = resolvido
+                if encontrado:
+                    self.adicionar_debug(f"Cache OCR: '{numero_nota}' na página {num_pagina + 1} "
+                                         f"(rotação: {angulo}°, pontuação {encontrado:.2f})")
+                return encontrado, chave_pagina
+            pontuacao = self.buscar_codigo_barras(chave_pagina, numero_nota, textos)
+            if pontuacao is not None:
+                return pontuacao, chave_pagina
+            # Página sem dígitos impressos (pela miniatura) não vale a renderização nem o OCR
+            if self.triar_pagina(pdf_path, num_pagina, chave_pagina, textos, somente_cache):
+                return False, chave_pagina
+            if somente_cache:
+                return None
             
-            # Aumentar brilho se necessário
-            enhancer = ImageEnhance.Brightness(imagem)
-            imagem = enhancer.enhance(1.1)
+            with self.reservar_memoria(pdf_path, num_pagina, escala):
+                # Converter a página em imagem na escala da cascata
+                imagem = self.documento(pdf_path).renderizar_array(num_pagina, escala)
+                
+                # A chave de acesso no código de barras dispensa o OCR
+                pontuacao = self.buscar_codigo_barras(chave_pagina, numero_nota, textos, imagem)
+                if pontuacao is not None:
+                    return pontuacao, chave_pagina
+                
+                # Melhorar imagem para OCR
+                imagem_melhorada = self.melhorar_imagem_ocr(imagem)
+                del imagem
+                
+                # Primeiro só as faixas candidatas a canhoto
+                encontrado, confiavel = self.buscar_nas_regioes_canhoto(
+                    imagem_melhorada, numero_nota, config_tesseract, textos, chave_pagina)
+                if encontrado:
+                    self.adicionar_debug(f"OCR encontrou '{numero_nota}' no canhoto da página {num_pagina + 1} "
+                                         f"(pontuação {encontrado:.2f})")
+                    return encontrado, chave_pagina
+                if confiavel:
+                    self.avaliar_legibilidade(imagem_melhorada, escala, chave_pagina)
+                    return False, chave_pagina
+                
+                # Página inteira em todas as orientações
+                encontrado, angulo = self.ocr_multi.tentar_todas_orientacoes(
+                    imagem_melhorada, numero_nota, config_tesseract, textos, chave_pagina
+                )
+                
+                if encontrado:
+                    self.adicionar_debug(f"OCR encontrou '{numero_nota}' na página {num_pagina + 1} "
+                                         f"(rotação: {angulo}°, pontuação {encontrado:.2f})")
+                    return encontrado, chave_pagina
+                
+                return 0.0, chave_pagina
             
-            return imagem
         except Exception as e:
-            self.adicionar_debug(f"Erro no pré-processamento de imagem: {e}")
-            return imagem
+            self.adicionar_debug(f"Erro no OCR página {num_pagina + 1}: {e}", nivel='erro')
+            return False, chave_pagina
+    
+    def avaliar_legibilidade(self, imagem, escala, chave_pagina):
+        """OSD da página numa escala intermediária em que só as faixas foram lidas
+        
+        Sem ele a cascata não teria como saber se a leitura foi confiável e
+        sempre subiria de resolução.
+        """
+        if escala < self.ESCALAS_OCR[-1] and chave_pagina is not None:
+            self.ocr_multi.orientacao_pagina(imagem, chave_pagina)
     
-    def buscar_com_ocr_multiorientacao(self, pdf_path, numero_nota, num_pagina):
-        """Busca o texto usando OCR em todas as orientações"""
+    def buscar_nas_regioes_canhoto(self, imagem, numero_nota, config_tesseract, textos, chave_pagina=None):
+        """OCR apenas nas faixas de borda onde o canhoto pode estar
+        
+        Retorna (pontuacao, confiavel). A leitura é confiável (dispensa o OCR
+        da página inteira) quando alguma faixa foi delimitada por uma régua.
+        """
+        if not self.recortar_canhoto:
+            return False, False
+        
         try:
-            doc = fitz.open(pdf_path)
-            pagina = doc.load_page(num_pagina)
-            
-            # Converter a página em imagem com alta resolução
-            mat = fitz.Matrix(3, 3)  # Aumentar a resolução
-            pix = pagina.get_pixmap(matrix=mat)
-            img_data = pix.tobytes("ppm")
+            with self.rastreador.span('deteccao_canhoto'):
+                regioes = DetectorCanhoto.regioes(imagem)
+        except Exception as e:
+            self.adicionar_debug(f"Erro na detecção do canhoto: {e}", nivel='erro')
+            return False, False
+        
+        for caixa, orientacoes, _ in regioes:
+            if self._stop_event.is_set():
+                break
             
-            # Converter para imagem PIL
-            imagem = Image.open(io.BytesIO(img_data))
+            chave_regiao = None
+            if chave_pagina is not None:
+                hash_arquivo, pagina, matriz = chave_pagina
+                chave_regiao = (hash_arquivo, pagina, f"{matriz}@{','.join(map(str, caixa))}")
             
-            # Melhorar imagem para OCR
-            imagem_melhorada = self.melhorar_imagem_ocr(imagem)
+            textos_regiao = {}
+            encontrado, angulo = self.ocr_multi.tentar_todas_orientacoes(
+                imagem.crop(caixa), numero_nota, config_tesseract, textos_regiao, chave_regiao, orientacoes)
+            textos.update({('canhoto', caixa, a): texto for a, texto in textos_regiao.items()})
             
-            # Configurações do Tesseract
-            config_tesseract = r'--oem 3 --psm 6 -c tessedit_char_whitelist=0123456789'
+            if encontrado:
+                return encontrado, True
+        
+        return 0.0, any(por_regua for _, _, por_regua in regioes)
+    
+    def ler_ocr_escala(self, pdf_path, num_pagina, escala):
+        """OCR das faixas do canhoto (ou da página inteira), sem procurar nota"""
+        config_tesseract = self.ocr_multi.CONFIG_DIGITOS
+        chave_pagina = self.ocr_multi.chave_pagina(pdf_path, num_pagina, escala, self.documento(pdf_path))
+        textos = {}
+        if self.triar_pagina(pdf_path, num_pagina, chave_pagina, textos):
+            return textos, True, chave_pagina
+        with self.reservar_memoria(pdf_path, num_pagina, escala):
+            imagem = self.documento(pdf_path).renderizar_array(num_pagina, escala)
+            self.ler_codigo_barras(chave_pagina, textos, imagem)
+            imagem = self.melhorar_imagem_ocr(imagem)
             
-            # Tentar todas as orientações
-            encontrado, angulo = self.ocr_multi.tentar_todas_orientacoes(
-                imagem_melhorada, numero_nota, config_tesseract
-            )
+            if self.recortar_canhoto:
+                try:
+                    with self.rastreador.span('deteccao_canhoto'):
+                        regioes = DetectorCanhoto.regioes(imagem)
+                except Exception as e:
+                    self.adicionar_debug(f"Erro na detecção do canhoto: {e}", nivel='erro')
+                    regioes = []
             
-            doc.close()
+                for caixa, orientacoes, _ in regioes:
+                    chave_regiao = None
+                    if chave_pagina is not None:
+                        hash_arquivo, pagina, matriz = chave_pagina
+                        chave_regiao = (hash_arquivo, pagina, f"{matriz}@{','.join(map(str, caixa))}")
+                    textos_regiao = self.ocr_multi.ler_todas_orientacoes(
+                        imagem.crop(caixa), config_tesseract, chave_regiao, orientacoes)
+                    textos.update({('canhoto', caixa, a): texto for a, texto in textos_regiao.items()})
             
-            if encontrado:
-                self.adicionar_debug(f"OCR encontrou '{numero_nota}' na página {num_pagina + 1} (rotação: {angulo}°)")
-                return True
-                
-            return False
+                # Faixas delimitadas por régua dispensam a página inteira (como na busca)
+                if any(por_regua for _, _, por_regua in regioes):
+                    self.avaliar_legibilidade(imagem, escala, chave_pagina)
+                    return textos, True, chave_pagina
             
-        except Exception as e:
-            self.adicionar_debug(f"Erro no OCR página {num_pagina + 1}: {e}")
-            return False
+            textos.update(self.ocr_multi.ler_todas_orientacoes(imagem, config_tesseract, chave_pagina))
+            return textos, self.ocr_multi.leitura_completa(chave_pagina, textos), chave_pagina
+    
+    def leitura_ocr_completa(self, chave_pagina, textos):
+        """Indica se o OCR da página não precisa ser refeito para outra nota"""
+        if super().leitura_ocr_completa(chave_pagina, textos):
+            return True
+        # Só as faixas do canhoto foram lidas: a detecção foi confiável
+        leituras = [chave for chave in textos if not (isinstance(chave, tuple) and chave[0] == 'codigo_barras')]
+        return bool(leituras) and all(isinstance(chave, tuple) for chave in leituras)
     
     def buscar_texto_no_pdf(self, caminho_pdf, numero_nota, pasta_dia, nome_arquivo):
-        """Busca o número da nota no PDF usando múltiplas estratégias"""
+        """Busca o número da nota na camada de texto: (páginas encontradas, páginas que ainda pedem OCR)"""
         try:
             paginas_encontradas = []
-            pdf_document = fitz.open(caminho_pdf)
+            documento = self.documento(caminho_pdf)
+            self.registrar_total_paginas(caminho_pdf, documento.total_paginas)
+            paginas_ocr = []
             
-            for num_pagina in range(len(pdf_document)):
+            for num_pagina, texto in self.motor_texto.paginas(documento):
                 if self._stop_event.is_set():
                     break
                     
-                pagina = pdf_document.load_page(num_pagina)
-                texto = pagina.get_text()
+                self.indexar_pagina(caminho_pdf, num_pagina + 1, 'texto', texto)
                 
-                # Estratégia 1: Busca direta
-                if numero_nota in texto:
+                # Estratégias 1 e 2: nota inteira (busca direta) ou seus primeiros/últimos
+                # dígitos, numa única passada pela página
+                regra = self.casa_texto(texto, numero_nota)
+                if regra:
                     paginas_encontradas.append(num_pagina + 1)
-                    self.adicionar_debug(f"Busca direta: encontrado na página {num_pagina + 1}")
+                    self.adicionar_debug(f"Regra '{regra}': encontrado na página {num_pagina + 1}")
                     
                     # Notificar resultado parcial
                     resultado = {
@@ -827,70 +4548,159 @@ class BuscadorCanhotosAvancado(LocalizadorBase):
                         'pagina': num_pagina + 1,
                         'pasta_dia': pasta_dia,
                         'nome_arquivo': nome_arquivo,
-                        'tipo': 'texto_direto'
+                        'tipo': 'texto_direto' if regra == 'nota' else 'regex'
                     }
                     self.notificar_resultado_parcial(resultado)
                     continue
+                paginas_ocr.append(num_pagina)
+            
+            # Estratégia 3 (OCR multi-orientação) só se as anteriores não funcionaram
+            if paginas_encontradas or not self.usar_ocr:
+                return paginas_encontradas, []
+            return paginas_encontradas, paginas_ocr
+            
+        except Exception as e:
+            self.registrar_falha(caminho_pdf, f"Erro ao processar {caminho_pdf}", e)
+            return [], []
+        finally:
+            self.fechar_documento(caminho_pdf)
+    
+    def buscar_paginas_ocr(self, caminho_pdf, numero_nota, pasta_dia, nome_arquivo, paginas):
+        """OCR de várias páginas do PDF em paralelo; as pendentes são canceladas na primeira que tiver a nota"""
+        paginas_encontradas = []
+        achou = threading.Event()
+        
+        paginas_ocr_indexadas = self.consultar_indice(caminho_pdf, 'ocr', completas=True, numero_nota=numero_nota)
+        
+        def ocr_pagina(num_pagina):
+            if self._stop_event.is_set() or achou.is_set():
+                return False, None
+            # Página já lida por completo: as leituras guardadas respondem sem OCR
+            textos_ocr = paginas_ocr_indexadas.get(num_pagina + 1)
+            if textos_ocr is not None:
+                return self.pontuacao_indice(textos_ocr, numero_nota), 'indice'
+            with self.rastreador.span('pagina', arquivo=nome_arquivo, pagina=num_pagina + 1):
+                self.adicionar_debug(f"Tentando OCR multi-orientação na página {num_pagina + 1}...")
+                textos_ocr = {}
+                encontrado, chave_pagina = self.buscar_com_ocr_multiorientacao(
+                    caminho_pdf, numero_nota, num_pagina, textos_ocr)
+                self.indexar_pagina(caminho_pdf, num_pagina + 1, 'ocr', textos_ocr,
+                                    completo=self.leitura_ocr_completa(chave_pagina, textos_ocr))
+                return encontrado, 'ocr'
+        
+        with ThreadPoolExecutor(max_workers=max(1, self.paginas_paralelas)) as executor:
+            futures = {executor.submit(ocr_pagina, num_pagina): num_pagina for num_pagina in paginas}
+            for future in as_completed(futures):
+                try:
+                    encontrado, tipo = future.result()
+                except Exception as e:
+                    self.adicionar_debug(f"Erro no OCR página {futures[future] + 1}: {e}", nivel='erro')
+                    continue
+                if not encontrado:
+                    continue
                 
-                # Estratégia 2: Busca por padrões com regex
-                padroes = [
-                    rf"\b{numero_nota}\b",
-                    rf"\b{numero_nota[:6]}.*\b",
-                    rf"\b.*{numero_nota[-6:]}\b",
-                    rf"N[°º]?\s*{re.escape(numero_nota)}",
-                    rf"NF-?E?\s*{re.escape(numero_nota)}",
-                    rf"Nota\s*Fiscal\s*{re.escape(numero_nota)}",
-                    rf"NUMERO\s*NF-?E?\s*{re.escape(numero_nota)}",
-                ]
-                
-                texto_limpo = re.sub(r'\s+', ' ', texto)  # Normalizar espaços
+                num_pagina = futures[future]
+                paginas_encontradas.append(num_pagina + 1)
+                self.adicionar_debug(f"{'OCR' if tipo == 'ocr' else 'Índice'}: encontrado na página {num_pagina + 1}")
                 
-                for padrao in padroes:
-                    if re.search(padrao, texto_limpo, re.IGNORECASE):
-                        if (num_pagina + 1) not in paginas_encontradas:
-                            paginas_encontradas.append(num_pagina + 1)
-                            self.adicionar_debug(f"Regex '{padrao}': encontrado na página {num_pagina + 1}")
-                            
-                            # Notificar resultado parcial
-                            resultado = {
-                                'arquivo': caminho_pdf,
-                                'pagina': num_pagina + 1,
-                                'pasta_dia': pasta_dia,
-                                'nome_arquivo': nome_arquivo,
-                                'tipo': 'regex'
-                            }
-                            self.notificar_resultado_parcial(resultado)
-                            break
+                # Notificar resultado parcial
+                resultado = {
+                    'arquivo': caminho_pdf,
+                    'pagina': num_pagina + 1,
+                    'pasta_dia': pasta_dia,
+                    'nome_arquivo': nome_arquivo,
+                    'tipo': tipo,
+                    'pontuacao': round(encontrado, 2)
+                }
+                self.notificar_resultado_parcial(resultado)
                 
-                # Estratégia 3: OCR multi-orientação (se as anteriores não funcionaram)
-                if not paginas_encontradas and self.usar_ocr:
-                    self.adicionar_debug(f"Tentando OCR multi-orientação na página {num_pagina + 1}...")
-                    if self.buscar_com_ocr_multiorientacao(caminho_pdf, numero_nota, num_pagina):
-                        paginas_encontradas.append(num_pagina + 1)
-                        self.adicionar_debug(f"OCR: encontrado na página {num_pagina + 1}")
-                        
-                        # Notificar resultado parcial
-                        resultado = {
-                            'arquivo': caminho_pdf,
-                            'pagina': num_pagina + 1,
-                            'pasta_dia': pasta_dia,
-                            'nome_arquivo': nome_arquivo,
-                            'tipo': 'ocr'
-                        }
-                        self.notificar_resultado_parcial(resultado)
-            
-            pdf_document.close()
-            return paginas_encontradas
-            
+                # Como na leitura sequencial, a primeira página encontrada encerra o OCR do arquivo
+                achou.set()
+                for pendente in futures:
+                    pendente.cancel()
+        
+        return sorted(paginas_encontradas)
+    
+    def partes_nota(self, numero_nota, metodo):
+        """O nome não é usado; no texto valem a nota e seus seis primeiros/últimos dígitos"""
+        if metodo == 'nome':
+            return []
+        if metodo == 'texto':
+            return list(dict.fromkeys([numero_nota, numero_nota[:6], numero_nota[-6:]]))
+        return super().partes_nota(numero_nota, metodo)
+    
+    def casa_texto(self, texto, numero_nota):
+        """Regra que achou a nota na camada de texto ('nota', 'inicio' ou 'final'), ou None"""
+        return ConsultaNota.compilar(numero_nota).buscar_texto(texto)
+    
+    def buscar_no_indice(self, caminho_pdf, numero_nota, pasta_dia, nome_arquivo):
+        """Camada de texto pelo índice, antes de abrir o PDF: (páginas encontradas, páginas que ainda pedem OCR)
+        
+        (None, None) enquanto o índice não tiver o texto de todas as páginas.
+        """
+        paginas_encontradas = self.paginas_texto_indice(caminho_pdf, numero_nota, todas=True)
+        if paginas_encontradas is None:
+            return None, None
+        
+        for pagina in paginas_encontradas:
+            self.adicionar_debug(f"Índice: encontrado na página {pagina}")
+            resultado = {
+                'arquivo': caminho_pdf,
+                'pagina': pagina,
+                'pasta_dia': pasta_dia,
+                'nome_arquivo': nome_arquivo,
+                'tipo': 'indice'
+            }
+            self.notificar_resultado_parcial(resultado)
+        
+        if paginas_encontradas or not self.usar_ocr:
+            return paginas_encontradas, []
+        return paginas_encontradas, list(range(self.total_paginas_indexado(caminho_pdf)))
+    
+    def buscar(self, mes, dia, numero_nota):
+        return self.buscar_canhotos(mes, dia, numero_nota)
+    
+    @rastrear_arquivo
+    def etapas_baratas(self, pdf_path, numero_nota, pasta_dia, nome_arquivo):
+        paginas, paginas_ocr = self.buscar_no_indice(pdf_path, numero_nota, pasta_dia, nome_arquivo)
+        if paginas is None:
+            paginas, paginas_ocr = self.buscar_texto_no_pdf(pdf_path, numero_nota, pasta_dia, nome_arquivo)
+        if paginas or not paginas_ocr:
+            return paginas, []
+        
+        # Páginas já lidas pelo OCR são julgadas pelo índice
+        paginas_ocr, pagina_indice = self.paginas_pendentes_ocr(pdf_path, numero_nota, paginas_ocr)
+        if pagina_indice and not paginas_ocr:
+            self.adicionar_debug(f"Índice: encontrado na página {pagina_indice}")
+            resultado = {
+                'arquivo': pdf_path,
+                'pagina': pagina_indice,
+                'pasta_dia': pasta_dia,
+                'nome_arquivo': nome_arquivo,
+                'tipo': 'indice'
+            }
+            self.notificar_resultado_parcial(resultado)
+            return [pagina_indice], []
+        if pagina_indice:
+            paginas_ocr.append(pagina_indice - 1)  # Resolvida pelo índice se as anteriores não tiverem a nota
+        return [], paginas_ocr
+    
+    @rastrear_arquivo
+    def etapa_ocr(self, pdf_path, numero_nota, pasta_dia, nome_arquivo, paginas):
+        """OCR multi-orientação das páginas (várias de uma vez), até a primeira que tiver a nota"""
+        try:
+            return self.buscar_paginas_ocr(pdf_path, numero_nota, pasta_dia, nome_arquivo, paginas)
         except Exception as e:
-            self.adicionar_debug(f"Erro ao processar {caminho_pdf}: {e}")
+            self.registrar_falha(pdf_path, f"Erro no OCR de {pdf_path}", e)
             return []
+        finally:
+            self.fechar_documento(pdf_path)
     
-    def buscar_canhotos(self, mes, dia, numero_nota):
+    def buscar_canhotos(self, mes, dia, numero_nota, max_workers=2):
         """Busca principal pelos canhotos com notificação de resultados parciais"""
         self.reset_search()
         self.resultados = []
-        self.debug_info = []
+        self.log.limpar()
         
         self.adicionar_debug(f"Iniciando busca: {dia}/{mes} - Nota: {numero_nota}")
         
@@ -898,7 +4708,7 @@ class BuscadorCanhotosAvancado(LocalizadorBase):
         mes_pasta = self.normalizar_mes(mes)
         caminho_mes = os.path.join(self.caminho_base, mes_pasta)
         
-        if not os.path.exists(caminho_mes):
+        if not self.pasta_existe(caminho_mes):
             return f"Pasta do mês {mes} não encontrada em {caminho_mes}"
         
         self.adicionar_debug(f"Buscando em: {caminho_mes}")
@@ -911,41 +4721,165 @@ class BuscadorCanhotosAvancado(LocalizadorBase):
         
         self.adicionar_debug(f"Encontradas {len(pastas_dia)} pasta(s) do dia {dia}")
         
-        # Buscar em todas as pastas do dia
+        # PDFs de todas as pastas do dia
+        pdfs_para_processar = []
         for pasta_info in pastas_dia:
-            self.adicionar_debug(f"Buscando na pasta: {pasta_info['nome']}")
+            if self._stop_event.is_set():
+                break
             
-            pdfs_processados = 0
-            for arquivo in os.listdir(pasta_info['caminho']):
-                if self._stop_event.is_set():
+            pdfs_pasta = self.listar_pdfs(pasta_info['caminho'])
+            self.adicionar_debug(f"Pasta {pasta_info['nome']}: {len(pdfs_pasta)} PDF(s)")
+            pdfs_para_processar.extend(
+                (os.path.join(pasta_info['caminho'], arquivo), pasta_info['nome'], arquivo) for arquivo in pdfs_pasta)
+        
+        # Processar PDFs em paralelo: índice e texto de todos antes de qualquer OCR
+        # (as páginas de cada PDF também vão ao OCR em paralelo)
+        for (caminho_pdf, pasta_dia, arquivo), paginas in self.executar_em_etapas(
+                pdfs_para_processar, numero_nota, max_workers):
+            for pagina in paginas:
+                resultado = {
+                    'arquivo': caminho_pdf,
+                    'pagina': pagina,
+                    'pasta_dia': pasta_dia,
+                    'nome_arquivo': arquivo,
+                    'mes': mes,
+                    'dia': dia
+                }
+                if resultado not in self.resultados:
+                    self.resultados.append(resultado)
+        
+        self.adicionar_debug(f"Processados {len(pdfs_para_processar)} PDFs")
+        self.adicionar_debug(f"Busca finalizada. {len(self.resultados)} resultado(s) encontrado(s)", nivel='info')
+        return self.resultados_com_falhas(self.resultados)
+
+CAMINHOS_BASE = {
+    "Canhoto": r"Z:\NOTAS-CANHOTOS-DEVOLUÇÕES\CANHOTOS",
+    "Devolução": r"Z:\NOTAS-CANHOTOS-DEVOLUÇÕES\DEVOLUÇÕES",
+    "Nota de Entrada": r"Z:\NOTAS-CANHOTOS-DEVOLUÇÕES\NOTAS ENTRADA"
+}
+
+CLASSES_LOCALIZADOR = {
+    "Canhoto": BuscadorCanhotosAvancado,
+    "Devolução": LocalizadorNotasDevolucoes,
+    "Nota de Entrada": LocalizadorNotasFiscais,
+}
+
+# Nomes aceitos em --tipo na linha de comando
+TIPOS_CLI = {
+    "canhoto": "Canhoto",
+    "devolucao": "Devolução",
+    "entrada": "Nota de Entrada",
+}
+
+class IndexadorIncremental:
+    """Indexa em segundo plano os PDFs novos ou alterados das pastas base
+    
+    Percorre as árvores mês/dia de cada tipo, do arquivo mais recente para o
+    mais antigo, e pré-processa no índice numérico (e no cache de OCR) os
+    arquivos cujo mtime/tamanho ainda não estão completos. Como o estado fica
+    no índice em disco, um reinício não reprocessa arquivos inalterados.
+    """
+    
+    INTERVALO_VARREDURA = 300  # segundos entre varreduras
+    IDADE_MINIMA_ARQUIVO = 60  # não mexer em arquivos que o scanner ainda pode estar gravando
+    
+    def __init__(self, caminhos_base=None, usar_ocr=True, intervalo=None):
+        self.caminhos_base = caminhos_base or CAMINHOS_BASE
+        self.usar_ocr = usar_ocr
+        self.intervalo = intervalo or self.INTERVALO_VARREDURA
+        self.localizadores = {tipo: CLASSES_LOCALIZADOR[tipo](caminho)
+                              for tipo, caminho in self.caminhos_base.items()}
+        for localizador in self.localizadores.values():
+            # Cada arquivo é lido uma vez: copiar tudo só expulsaria do cache os PDFs das buscas
+            localizador.cache_pdf = None
+        self.arquivos_indexados = 0
+        self._parar = threading.Event()
+        self._liberado = threading.Event()
+        self._liberado.set()
+        self._thread = None
+    
+    @staticmethod
+    def reduzir_prioridade():
+        """Baixa a prioridade da thread atual para não disputar CPU com as buscas"""
+        try:
+            if platform.system() == "Windows":
+                import ctypes
+                kernel32 = ctypes.windll.kernel32
+                kernel32.SetThreadPriority(kernel32.GetCurrentThread(), -2)  # THREAD_PRIORITY_LOWEST
+            else:
+                os.nice(10)
+        except Exception:
+            pass
+    
+    def iniciar(self):
+        """Inicia a thread de indexação (se ainda não estiver rodando)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._parar.clear()
+        for localizador in self.localizadores.values():
+            localizador.reset_search()
+        self._thread = threading.Thread(target=self._executar, name="IndexadorIncremental", daemon=True)
+        self._thread.start()
+    
+    def parar(self):
+        """Interrompe a indexação (o arquivo em andamento fica para a próxima vez)"""
+        self._parar.set()
+        self._liberado.set()
+        for localizador in self.localizadores.values():
+            localizador.stop_search()
+    
+    def pausar(self):
+        """Suspende a indexação entre páginas (ex.: durante uma busca interativa)"""
+        self._liberado.clear()
+    
+    def retomar(self):
+        self._liberado.set()
+    
+    def _aguardar(self):
+        self._liberado.wait()
+    
+    def arquivos_pendentes(self):
+        """PDFs que ainda precisam ser indexados: [(mtime, tipo, caminho)], mais recentes primeiro"""
+        pendentes = []
+        limite = time.time() - self.IDADE_MINIMA_ARQUIVO
+        for tipo, caminho_base in self.caminhos_base.items():
+            indice = self.localizadores[tipo].indice
+            if not indice:
+                continue
+            # A árvore vem do manifesto: só as pastas alteradas são listadas de novo
+            for caminho, _, mtime in obter_manifesto_padrao().percorrer(caminho_base):
+                if self._parar.is_set():
+                    return pendentes
+                if not caminho.lower().endswith('.pdf'):
+                    continue
+                try:
+                    if mtime > limite or indice.arquivo_completo(caminho):
+                        continue
+                except Exception:
+                    continue
+                pendentes.append((mtime, tipo, caminho))
+        pendentes.sort(reverse=True)
+        return pendentes
+    
+    def _executar(self):
+        self.reduzir_prioridade()
+        while not self._parar.is_set():
+            for _, tipo, caminho in self.arquivos_pendentes():
+                self._aguardar()
+                if self._parar.is_set():
                     break
-                    
-                if arquivo.lower().endswith('.pdf'):
-                    pdfs_processados += 1
-                    caminho_pdf = os.path.join(pasta_info['caminho'], arquivo)
-                    
-                    self.adicionar_debug(f"Processando: {arquivo}")
-                    paginas = self.buscar_texto_no_pdf(caminho_pdf, numero_nota, pasta_info['nome'], arquivo)
-                    
-                    if paginas:
-                        for pagina in paginas:
-                            resultado = {
-                                'arquivo': caminho_pdf,
-                                'pagina': pagina,
-                                'pasta_dia': pasta_info['nome'],
-                                'nome_arquivo': arquivo,
-                                'mes': mes,
-                                'dia': dia
-                            }
-                            if resultado not in self.resultados:
-                                self.resultados.append(resultado)
-            
-            self.adicionar_debug(f"Processados {pdfs_processados} PDFs na pasta {pasta_info['nome']}")
-        
-        self.adicionar_debug(f"Busca finalizada. {len(self.resultados)} resultado(s) encontrado(s)")
-        return self.resultados
+                localizador = self.localizadores[tipo]
+                localizador.log.limpar()
+                localizador.rastreador.reiniciar()
+                if localizador.indexar_pdf(caminho, self.usar_ocr, self._aguardar):
+                    self.arquivos_indexados += 1
+            self._parar.wait(self.intervalo)
 
 class InterfaceLocalizadorUnificado:
+    INTERVALO_LOG_MS = 200  # Timer que passa o log da busca para a aba de log
+    LOTE_LOG = 500  # Mensagens por atualização
+    LIMITE_LINHAS_LOG = 5000  # Linhas mantidas na aba de log
+    
     def __init__(self, root):
         self.root = root
         self.root.title("Localizador de Número de Nota")
@@ -953,28 +4887,28 @@ class InterfaceLocalizadorUnificado:
         self.root.geometry("500x600")
         
         # Caminhos base para cada tipo
-        self.caminhos_base = {
-            "Canhoto": r"Z:\NOTAS-CANHOTOS-DEVOLUÇÕES\CANHOTOS",
-            "Devolução": r"Z:\NOTAS-CANHOTOS-DEVOLUÇÕES\DEVOLUÇÕES", 
-            "Nota de Entrada": r"Z:\NOTAS-CANHOTOS-DEVOLUÇÕES\NOTAS ENTRADA"
-        }
+        self.caminhos_base = dict(CAMINHOS_BASE)
         
         self.localizador_atual = None
+        self.indexador = None  # Indexação em segundo plano (opcional)
         self.tipo_busca_atual = None
         self.busca_ativa = False
         self.resultados_parciais = []
+        self._registro_log = None  # Log lido pela aba de log e o cursor da leitura
+        self._cursor_log = 0
         
         self.criar_interface()
         self.carregar_meses_disponiveis()
+        self.root.after(self.INTERVALO_LOG_MS, self.atualizar_log)
     
     def carregar_meses_disponiveis(self):
         """Carrega os meses disponíveis no caminho base atual"""
         try:
             if self.tipo_busca_atual and self.tipo_busca_atual in self.caminhos_base:
                 caminho_base = self.caminhos_base[self.tipo_busca_atual]
-                if os.path.exists(caminho_base):
-                    pastas = [p for p in os.listdir(caminho_base) 
-                             if os.path.isdir(os.path.join(caminho_base, p))]
+                manifesto = obter_manifesto_padrao()
+                if manifesto.existe_pasta(caminho_base):
+                    pastas = manifesto.subpastas(caminho_base)
                     meses_ordenados = self.ordenar_meses(pastas)
                     self.mes_combobox['values'] = meses_ordenados
         except Exception as e:
@@ -982,11 +4916,7 @@ class InterfaceLocalizadorUnificado:
     
     def ordenar_meses(self, meses):
         """Ordena os meses cronologicamente"""
-        ordem_meses = [
-            'JANEIRO', 'FEVEREIRO', 'MARÇO', 'ABRIL', 'MAIO', 'JUNHO',
-            'JULHO', 'AGOSTO', 'SETEMBRO', 'OUTUBRO', 'NOVEMBRO', 'DEZEMBRO'
-        ]
-        return [mes for mes in ordem_meses if mes in meses]
+        return [mes for mes in MESES_PASTA if mes in meses]
     
     def criar_interface(self):
         # Frame principal
@@ -1024,6 +4954,12 @@ class InterfaceLocalizadorUnificado:
         self.dia_combobox['values'] = [f"{i:02d}" for i in range(1, 32)]
         self.dia_combobox.grid(row=3, column=1, sticky=tk.W, pady=4, padx=4)
         
+        # Janela de dias ao redor da data (os mais próximos são buscados primeiro)
+        self.janela_combobox = ttk.Combobox(main_frame, width=12, font=('Arial', 9), state='readonly',
+                                            values=["Só o dia", "± 1 dia", "± 3 dias", "± 7 dias", "Mês inteiro"])
+        self.janela_combobox.current(0)
+        self.janela_combobox.grid(row=3, column=2, sticky=tk.W, pady=4, padx=4)
+        
         ttk.Label(main_frame, text="Número da Nota:", font=('Arial', 9)).grid(
             row=4, column=0, sticky=tk.W, pady=4)
         self.nota_entry = ttk.Entry(main_frame, width=20, font=('Arial', 9))
@@ -1038,6 +4974,11 @@ class InterfaceLocalizadorUnificado:
                                        variable=self.ocr_var)
         self.ocr_check.pack(side=tk.LEFT, padx=8)
         
+        self.indexar_var = tk.BooleanVar(value=False)
+        self.indexar_check = ttk.Checkbutton(settings_frame, text="Indexar em segundo plano",
+                                           variable=self.indexar_var, command=self.alternar_indexador)
+        self.indexar_check.pack(side=tk.LEFT, padx=8)
+        
         # Botões
         botoes_frame = ttk.Frame(main_frame)
         botoes_frame.grid(row=6, column=0, columnspan=3, pady=12)
@@ -1120,18 +5061,49 @@ class InterfaceLocalizadorUnificado:
         self.resultados_texto.tag_configure('sucesso', foreground='green', font=('Arial', 10, 'bold'))
         self.resultados_texto.tag_configure('normal', font=('Arial', 8))
         self.resultados_texto.tag_configure('resultado_parcial', foreground='blue', font=('Arial', 9))
+        self.log_texto.tag_configure('log_debug', foreground='#b0b0b0')
+        self.log_texto.tag_configure('log_info', foreground='white')
+        self.log_texto.tag_configure('log_aviso', foreground='orange')
+        self.log_texto.tag_configure('log_erro', foreground='#ff6060')
+    
+    def drenar_log(self):
+        """Passa para a aba de log um lote das mensagens novas do localizador atual"""
+        if not self.localizador_atual:
+            return
+        registro = self.localizador_atual.log
+        if registro is not self._registro_log:
+            self._registro_log, self._cursor_log = registro, 0
+        
+        entradas, self._cursor_log, perdidas = registro.ler(self._cursor_log, self.LOTE_LOG)
+        argumentos = [f"… {perdidas} mensagem(ns) descartada(s) pelo log\n", 'log_aviso'] if perdidas else []
+        for _, nivel, mensagem in entradas:
+            argumentos += [mensagem + '\n', f'log_{nivel}']
+        if not argumentos:
+            return
+        
+        # Um único insert por lote; a aba guarda só as últimas LIMITE_LINHAS_LOG linhas
+        self.log_texto.insert(tk.END, *argumentos)
+        excesso = int(self.log_texto.index('end-1c').split('.')[0]) - self.LIMITE_LINHAS_LOG
+        if excesso > 0:
+            self.log_texto.delete('1.0', f'{excesso + 1}.0')
+        self.log_texto.see(tk.END)
+    
+    def atualizar_log(self):
+        """Timer da interface que esvazia o log da busca em lotes"""
+        try:
+            self.drenar_log()
+        except Exception as e:
+            print(f"Erro ao atualizar o log: {e}")
+        self.root.after(self.INTERVALO_LOG_MS, self.atualizar_log)
     
     def tipo_selecionado(self):
         """Atualiza o localizador quando o tipo de busca é alterado"""
         self.tipo_busca_atual = self.tipo_var.get()
         caminho_base = self.caminhos_base.get(self.tipo_busca_atual)
         
-        if self.tipo_busca_atual == "Canhoto":
-            self.localizador_atual = BuscadorCanhotosAvancado(caminho_base)
-        elif self.tipo_busca_atual == "Devolução":
-            self.localizador_atual = LocalizadorNotasDevolucoes(caminho_base)
-        elif self.tipo_busca_atual == "Nota de Entrada":
-            self.localizador_atual = LocalizadorNotasFiscais(caminho_base)
+        classe_localizador = CLASSES_LOCALIZADOR.get(self.tipo_busca_atual)
+        if classe_localizador:
+            self.localizador_atual = classe_localizador(caminho_base)
         
         # Configurar callback para resultados parciais
         if self.localizador_atual:
@@ -1140,6 +5112,18 @@ class InterfaceLocalizadorUnificado:
         self.status_label.config(text=f"Busca configurada para: {self.tipo_busca_atual}")
         self.carregar_meses_disponiveis()
     
+    def alternar_indexador(self):
+        """Liga/desliga a indexação em segundo plano dos PDFs novos ou alterados"""
+        if self.indexar_var.get():
+            if self.indexador is None:
+                self.indexador = IndexadorIncremental(self.caminhos_base, usar_ocr=self.ocr_var.get())
+            self.indexador.iniciar()
+            self.status_label.config(text="Indexação em segundo plano ativada")
+        elif self.indexador is not None:
+            self.indexador.parar()
+            self.indexador = None
+            self.status_label.config(text="Indexação em segundo plano desativada")
+    
     def receber_resultado_parcial(self, resultado):
         """Recebe resultados parciais da busca"""
         self.root.after(0, self.mostrar_resultado_parcial, resultado)
@@ -1149,13 +5133,18 @@ class InterfaceLocalizadorUnificado:
         if resultado not in self.resultados_parciais:
             self.resultados_parciais.append(resultado)
             
+            # Correspondências aproximadas do OCR mostram a pontuação
+            metodo = resultado.get('tipo', 'desconhecido')
+            if resultado.get('pontuacao', 1.0) < 1.0:
+                metodo += f" (pontuação {resultado['pontuacao']:.2f})"
+            
             # Adicionar ao texto de resultados
             self.resultados_texto.insert(tk.END, 
                 f"✅ ENCONTRADO - {time.strftime('%H:%M:%S')}\n"
                 f"   Arquivo: {resultado['nome_arquivo']}\n"
                 f"   Pasta: {resultado['pasta_dia']}\n"
                 f"   Página: {resultado['pagina']}\n"
-                f"   Método: {resultado.get('tipo', 'desconhecido')}\n", 'resultado_parcial')
+                f"   Método: {metodo}\n", 'resultado_parcial')
             
             # Botão para abrir o PDF
             self.resultados_texto.insert(tk.END, "   ")
@@ -1169,6 +5158,14 @@ class InterfaceLocalizadorUnificado:
             self.resultados_texto.see(tk.END)
             self.status_label.config(text=f"Encontrado: {resultado['nome_arquivo']}")
     
+    def janela_selecionada(self):
+        """(raio, mes_inteiro) escolhidos na janela de dias"""
+        janela = self.janela_combobox.get()
+        if janela == "Mês inteiro":
+            return 0, True
+        numeros = re.findall(r'\d+', janela)
+        return (int(numeros[0]) if numeros else 0), False
+    
     def iniciar_busca(self):
         if self.busca_ativa:
             return
@@ -1199,13 +5196,15 @@ class InterfaceLocalizadorUnificado:
         self.resultados_parciais = []
         
         self.busca_ativa = True
+        if self.indexador:
+            self.indexador.pausar()  # A busca interativa tem prioridade
         self.buscar_btn.config(state='disabled')
         self.parar_btn.config(state='normal')
         self.progress.start()
         self.status_label.config(text=f"Buscando {self.tipo_busca_atual}...")
         
         # Executar em thread separada
-        thread = threading.Thread(target=self.executar_busca, args=(mes, dia, nota))
+        thread = threading.Thread(target=self.executar_busca, args=(mes, dia, nota) + self.janela_selecionada())
         thread.daemon = True
         thread.start()
     
@@ -1215,21 +5214,49 @@ class InterfaceLocalizadorUnificado:
             self.busca_ativa = False
             self.status_label.config(text="Busca interrompida")
     
-    def executar_busca(self, mes, dia, nota):
+    def executar_busca(self, mes, dia, nota, raio=0, mes_inteiro=False):
         try:
             start_time = time.time()
             
-            if self.tipo_busca_atual == "Canhoto":
-                resultados = self.localizador_atual.buscar_canhotos(mes, dia, nota)
-            elif self.tipo_busca_atual == "Devolução":
-                resultados = self.localizador_atual.buscar_nota(mes, dia, nota)
-            elif self.tipo_busca_atual == "Nota de Entrada":
-                resultados = self.localizador_atual.buscar_nota_otimizada(mes, dia, nota)
+            with MonitorMemoria(self.localizador_atual.orcamento_memoria) as memoria:
+                if raio or mes_inteiro:
+                    resultados = self.localizador_atual.buscar_janela(mes, dia, nota, raio, mes_inteiro)
+                else:
+                    resultados = self.localizador_atual.buscar(mes, dia, nota)
             
             end_time = time.time()
             tempo_decorrido = end_time - start_time
             
-            self.localizador_atual.adicionar_debug(f"Tempo total da busca: {tempo_decorrido:.2f} segundos")
+            self.localizador_atual.adicionar_debug(f"Tempo total da busca: {tempo_decorrido:.2f} segundos", nivel='info')
+            self.localizador_atual.adicionar_debug(
+                f"Tempo por etapa: {self.localizador_atual.rastreador.texto_resumo() or 'nenhuma'}", nivel='info')
+            self.localizador_atual.adicionar_debug(f"Memória: {memoria.texto()}", nivel='info')
+            
+            cache_ocr = self.localizador_atual.ocr_multi.cache
+            if cache_ocr:
+                estatisticas = cache_ocr.estatisticas()
+                self.localizador_atual.adicionar_debug(
+                    f"Cache OCR: {estatisticas['acertos']} acerto(s), {estatisticas['falhas']} falha(s), "
+                    f"~{estatisticas['tempo_economizado']:.1f}s de OCR economizados, "
+                    f"{estatisticas['bytes'] / (1024 * 1024):.1f} MB em disco", nivel='info')
+            
+            cache_pdf = self.localizador_atual.cache_pdf
+            if cache_pdf:
+                estatisticas = cache_pdf.estatisticas()
+                self.localizador_atual.adicionar_debug(
+                    f"Cache de PDFs: {estatisticas['acertos']} acerto(s), {estatisticas['falhas']} cópia(s), "
+                    f"{estatisticas['bytes_rede'] / (1024 * 1024):.1f} MB pela rede, "
+                    f"{estatisticas['bytes'] / (1024 * 1024):.1f} MB em disco", nivel='info')
+            
+            triagem = self.localizador_atual.triagem
+            if triagem:
+                estatisticas = triagem.estatisticas()
+                if estatisticas['avaliadas']:
+                    motivos = ', '.join(f"{motivo}: {quantidade}" for motivo, quantidade in estatisticas['motivos'].items())
+                    self.localizador_atual.adicionar_debug(
+                        f"Triagem: {estatisticas['descartadas']} de {estatisticas['avaliadas']} página(s) sem OCR"
+                        f"{f' ({motivos})' if motivos else ''}, ~{estatisticas['tempo_economizado']:.1f}s economizados, "
+                        f"{estatisticas['tempo_triagem']:.2f}s na triagem", nivel='info')
             
             # Atualizar interface na thread principal
             self.root.after(0, self.mostrar_resultados_finais, resultados, mes, dia, nota, tempo_decorrido)
@@ -1239,13 +5266,14 @@ class InterfaceLocalizadorUnificado:
     
     def mostrar_resultados_finais(self, resultados, mes, dia, nota, tempo_decorrido):
         self.busca_ativa = False
+        if self.indexador:
+            self.indexador.retomar()
         self.progress.stop()
         self.buscar_btn.config(state='normal')
         self.parar_btn.config(state='disabled')
         
-        # Mostrar log de debug
-        for mensagem in self.localizador_atual.debug_info:
-            self.log_texto.insert(tk.END, mensagem + '\n')
+        # Mostrar o restante do log (o timer segue com o que passar do lote)
+        self.drenar_log()
         
         # Resumo final
         self.resultados_texto.insert(tk.END, 
@@ -1283,6 +5311,8 @@ class InterfaceLocalizadorUnificado:
     
     def mostrar_erro(self, erro):
         self.busca_ativa = False
+        if self.indexador:
+            self.indexador.retomar()
         self.progress.stop()
         self.buscar_btn.config(state='normal')
         self.parar_btn.config(state='disabled')
@@ -1307,5 +5337,198 @@ def main():
         print(f"Erro ao iniciar aplicação: {e}")
         messagebox.showerror("Erro", f"Erro ao iniciar aplicação:\n{e}")
 
+def localizar_nota(tipo, mes, dia, numero_nota, caminho_base=None, usar_ocr=True, callback=None,
+                   raio=0, mes_inteiro=False, max_resultados=None, rastro=None, formato_rastro='chrome'):
+    """Busca uma nota sem interface gráfica (API para scripts e tarefas agendadas)
+    
+    `tipo` aceita o nome da interface ("Canhoto") ou o da linha de comando
+    ("canhoto"). Com `raio` ou `mes_inteiro` a busca cobre vários dias (ver
+    LocalizadorBase.buscar_janela). Com `rastro`, os tempos por etapa são
+    gravados nesse arquivo (formato 'chrome' ou 'json'). Retorna a lista de
+    resultados, cada um com a nota e o método que o encontrou, ou uma mensagem
+    de erro (str), como as buscas da interface. Sem resultado, cada PDF que
+    não pôde ser lido volta com tipo 'erro' (página None).
+    """
+    tipo = TIPOS_CLI.get(tipo, tipo)
+    localizador = CLASSES_LOCALIZADOR[tipo](caminho_base or CAMINHOS_BASE[tipo])
+    localizador.usar_ocr = usar_ocr
+    
+    metodos = {}
+    def receber(resultado):
+        metodos.setdefault((resultado['arquivo'], resultado['pagina']), resultado.get('tipo'))
+        if callback:
+            callback(resultado)
+    localizador.set_callback_resultado(receber)
+    
+    if raio or mes_inteiro:
+        resultados = localizador.buscar_janela(mes, dia, numero_nota, raio, mes_inteiro, max_resultados)
+    else:
+        resultados = localizador.buscar(mes, dia, numero_nota.strip())
+    if rastro:
+        localizador.rastreador.exportar(rastro, formato_rastro)
+    if isinstance(resultados, str):
+        return resultados
+    return [dict(resultado, nota=numero_nota.strip(),
+                 tipo='erro' if resultado.get('tipo') == 'erro' else
+                 metodos.get((resultado['arquivo'], resultado['pagina']), 'desconhecido'))
+            for resultado in resultados]
+
+TAMANHO_MAXIMO_NOTA = 9  # O nNF tem até nove dígitos
+PALAVRAS_COLUNA_NOTA = ('nota', 'notas', 'nf', 'nfe', 'nnf')
+
+def coluna_notas(cabecalho, coluna=None):
+    """Índice da coluna das notas: a pedida (nome ou número a partir de 1), a de cabeçalho "nota"/"nf" ou a primeira"""
+    nomes = [celula.strip().lower() for celula in cabecalho]
+    if coluna is not None:
+        if str(coluna).isdigit() and int(coluna) >= 1:
+            return int(coluna) - 1
+        if coluna.strip().lower() in nomes:
+            return nomes.index(coluna.strip().lower())
+        raise ValueError(f"Coluna {coluna!r} não encontrada no cabeçalho")
+    for indice, nome in enumerate(nomes):
+        if any(palavra in PALAVRAS_COLUNA_NOTA for palavra in re.split(r'[\W_]+', nome)):
+            return indice
+    return 0
+
+def ler_notas(arquivo, coluna=None):
+    """Lê os números de nota de uma coluna de um CSV (ou de uma lista simples, um por linha)
+    
+    A coluna é a informada (nome do cabeçalho ou número a partir de 1), a
+    de cabeçalho "nota"/"nf" ou a primeira; as demais (datas, valores,
+    CNPJ) não entram no lote. Células sem dígitos (o cabeçalho) ou com mais
+    dígitos que um nNF são ignoradas. Aceita vírgula, ponto e vírgula ou
+    tabulação.
+    """
+    conteudo = arquivo.read()
+    try:
+        dialeto = csv.Sniffer().sniff(conteudo[:4096], delimiters=',;\t')
+    except csv.Error:
+        dialeto = csv.excel
+    
+    linhas = [linha for linha in csv.reader(io.StringIO(conteudo), dialeto) if any(celula.strip() for celula in linha)]
+    if not linhas:
+        return []
+    indice = coluna_notas(linhas[0], coluna)
+    
+    notas = []
+    descartadas = 0
+    for linha in linhas:
+        if indice >= len(linha):
+            continue
+        nota = re.sub(r'[^\d]', '', linha[indice])
+        if len(nota) > TAMANHO_MAXIMO_NOTA:
+            descartadas += 1
+        elif nota:
+            notas.append(nota)
+    if descartadas:
+        print(f"{descartadas} célula(s) com mais de {TAMANHO_MAXIMO_NOTA} dígitos ignorada(s)", file=sys.stderr)
+    return list(dict.fromkeys(notas))
+
+def imprimir_tabela(resultados, notas, saida=None):
+    """Mostra a tabela de resultados (e grava em CSV se pedido)"""
+    colunas = ['nota', 'pasta_dia', 'nome_arquivo', 'pagina', 'tipo', 'arquivo']
+    linhas = [['' if resultado[coluna] is None else str(resultado[coluna]) for coluna in colunas]
+              for resultado in resultados]
+    encontradas = {resultado['nota'] for resultado in resultados if resultado['tipo'] != 'erro'}
+    com_erro = {resultado['nota'] for resultado in resultados if resultado['tipo'] == 'erro'}
+    linhas += [[nota, '', '', '', 'nao_encontrada', ''] for nota in notas
+               if nota not in encontradas and nota not in com_erro]
+    
+    larguras = [max([len(coluna)] + [len(linha[i]) for linha in linhas]) for i, coluna in enumerate(colunas[:-1])]
+    print('  '.join(coluna.ljust(largura) for coluna, largura in zip(colunas, larguras)) + '  arquivo')
+    for linha in linhas:
+        print('  '.join(valor.ljust(largura) for valor, largura in zip(linha, larguras)) + '  ' + linha[-1])
+    print(f"\n{len(encontradas)}/{len(notas)} nota(s) encontrada(s)"
+          f"{f', {len(com_erro)} com erro de leitura' if com_erro else ''}")
+    
+    if saida:
+        with open(saida, 'w', newline='', encoding='utf-8-sig') as arquivo:
+            escritor = csv.writer(arquivo, delimiter=';')
+            escritor.writerow(colunas)
+            escritor.writerows(linhas)
+
+def comando_lote(argumentos):
+    """Busca em lote pela linha de comando"""
+    try:
+        if argumentos.notas:
+            with open(argumentos.notas, newline='', encoding='utf-8-sig') as arquivo:
+                notas = ler_notas(arquivo, argumentos.coluna)
+        else:
+            notas = ler_notas(sys.stdin, argumentos.coluna)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    
+    if not notas:
+        print("Nenhum número de nota informado.", file=sys.stderr)
+        return 1
+    
+    tipo = TIPOS_CLI[argumentos.tipo]
+    localizador = CLASSES_LOCALIZADOR[tipo](argumentos.base or CAMINHOS_BASE[tipo])
+    resultados = localizador.buscar_lote(argumentos.mes, argumentos.dia, notas,
+                                         usar_ocr=not argumentos.sem_ocr)
+    if isinstance(resultados, str):
+        print(resultados, file=sys.stderr)
+        return 1
+    
+    imprimir_tabela(resultados, notas, argumentos.saida)
+    return 0
+
+def comando_find(argumentos):
+    """Busca de uma nota pela linha de comando"""
+    nota = argumentos.nota.strip()
+    if not nota.isdigit():
+        print("O número da nota deve conter apenas dígitos.", file=sys.stderr)
+        return 1
+    
+    resultados = localizar_nota(argumentos.tipo, argumentos.mes, argumentos.dia, nota,
+                                argumentos.base, usar_ocr=not argumentos.sem_ocr, raio=argumentos.raio,
+                                mes_inteiro=argumentos.mes_inteiro, max_resultados=argumentos.max_resultados,
+                                rastro=argumentos.rastro, formato_rastro=argumentos.formato_rastro)
+    if isinstance(resultados, str):
+        print(resultados, file=sys.stderr)
+        return 1
+    
+    imprimir_tabela(resultados, [nota], argumentos.saida)
+    return 0 if any(resultado['tipo'] != 'erro' for resultado in resultados) else 2
+
+def main_cli(argv=None):
+    """Entrada pela linha de comando (sem argumentos, abre a interface gráfica)"""
+    parser = argparse.ArgumentParser(description="Localizador de número de nota")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+    
+    find = subparsers.add_parser('find', help="Procura uma nota sem abrir a interface gráfica")
+    find.add_argument('--tipo', required=True, choices=list(TIPOS_CLI))
+    find.add_argument('--mes', required=True)
+    find.add_argument('--dia', required=True)
+    find.add_argument('--nota', required=True)
+    find.add_argument('--raio', type=int, default=0, help="Procura também N dias antes e depois, os mais próximos primeiro")
+    find.add_argument('--mes-inteiro', action='store_true', help="Procura em todos os dias do mês")
+    find.add_argument('--max-resultados', type=int, help="Para depois de encontrar este número de páginas")
+    find.add_argument('--saida', help="Grava a tabela de resultados neste CSV")
+    find.add_argument('--base', help="Pasta base no lugar da configurada para o tipo")
+    find.add_argument('--sem-ocr', action='store_true', help="Não usar OCR")
+    find.add_argument('--rastro', help="Grava os tempos de cada etapa neste arquivo")
+    find.add_argument('--formato-rastro', choices=['chrome', 'json'], default='chrome',
+                      help="chrome: abrir em chrome://tracing ou ui.perfetto.dev")
+    find.set_defaults(funcao=comando_find)
+    
+    lote = subparsers.add_parser('lote', help="Procura várias notas (CSV ou entrada padrão) de uma vez")
+    lote.add_argument('--tipo', required=True, choices=list(TIPOS_CLI))
+    lote.add_argument('--mes', required=True)
+    lote.add_argument('--dia', required=True)
+    lote.add_argument('--notas', help="CSV com os números de nota (padrão: entrada padrão)")
+    lote.add_argument('--coluna', help="Coluna das notas no CSV: nome do cabeçalho ou número "
+                                       "(padrão: a de cabeçalho nota/NF, senão a primeira)")
+    lote.add_argument('--saida', help="Grava a tabela de resultados neste CSV")
+    lote.add_argument('--base', help="Pasta base no lugar da configurada para o tipo")
+    lote.add_argument('--sem-ocr', action='store_true', help="Não usar OCR")
+    lote.set_defaults(funcao=comando_lote)
+    
+    argumentos = parser.parse_args(argv)
+    return argumentos.funcao(argumentos)
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        raise SystemExit(main_cli())
     main()
\ No newline at end of file
@@ -0,0 +1,11 @@
+"""Configuração comum dos testes: módulos da raiz no caminho e dados locais numa pasta temporária"""
+import os
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+# Índice, caches e estatísticas padrão não podem cair na pasta do usuário
+os.environ['LOCALAPPDATA'] = tempfile.mkdtemp(prefix='procura_canhotos_testes_')
@@ -0,0 +1,182 @@
+"""CachePDF: cópia local reaproveitada enquanto o original não muda, descartada quando muda mtime ou tamanho"""
+import os
+import random
+import threading
+import time
+
+import fitz
+import pytest
+
+import search
+from benchmark import PastaLenta, pagina_scan
+from search import CachePDF
+
+
+@pytest.fixture
+def rede(tmp_path):
+    pasta = tmp_path / 'rede'
+    pasta.mkdir()
+    return pasta
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return CachePDF(str(tmp_path / 'cache_pdf'))
+
+
+def escrever(caminho, conteudo, mtime):
+    with open(caminho, 'wb') as arquivo:
+        arquivo.write(conteudo)
+    os.utime(caminho, (mtime, mtime))
+
+
+def copias(cache):
+    return sorted(os.path.basename(os.path.join(raiz, arquivo))
+                  for raiz, _, arquivos in os.walk(cache.pasta) for arquivo in arquivos)
+
+
+def test_segunda_leitura_nao_volta_a_rede(rede, cache):
+    original = str(rede / 'a.pdf')
+    escrever(original, b'%PDF-1.4 primeira', 1_700_000_000)
+
+    with PastaLenta(str(rede), 0.0, banda=2 ** 30) as pasta_lenta:
+        assert cache.ler(original) == b'%PDF-1.4 primeira'
+        lidos = pasta_lenta.bytes_lidos
+        assert cache.ler(original) == b'%PDF-1.4 primeira'
+
+    assert lidos == len(b'%PDF-1.4 primeira')
+    assert pasta_lenta.bytes_lidos == lidos
+    assert cache.estatisticas()['acertos'] == 1
+    assert cache.estatisticas()['falhas'] == 1
+
+
+@pytest.mark.parametrize('conteudo, mtime', [
+    (b'%PDF-1.4 segunda versao', 1_700_000_000),  # Mesmo mtime, tamanho diferente
+    (b'%PDF-1.4 primeiro', 1_700_000_100),  # Mesmo tamanho, mtime diferente
+])
+def test_original_alterado_invalida_a_copia(rede, cache, conteudo, mtime):
+    original = str(rede / 'a.pdf')
+    escrever(original, b'%PDF-1.4 primeira', 1_700_000_000)
+    cache.ler(original)
+    copia_antiga = copias(cache)
+
+    escrever(original, conteudo, mtime)
+    with PastaLenta(str(rede), 0.0, banda=2 ** 30) as pasta_lenta:
+        assert cache.ler(original) == conteudo
+
+    assert pasta_lenta.bytes_lidos == len(conteudo)
+    assert cache.estatisticas()['falhas'] == 2
+    assert cache.estatisticas()['entradas'] == 1  # A versão antiga sai do cache
+    assert copias(cache) != copia_antiga and len(copias(cache)) == 1
+
+
+def test_cache_reaberto_reconhece_as_copias(rede, cache):
+    original = str(rede / 'a.pdf')
+    escrever(original, b'%PDF-1.4 primeira', 1_700_000_000)
+    cache.ler(original)
+
+    reaberto = CachePDF(cache.pasta)
+    assert reaberto.caminho_local(original) != original
+    assert reaberto.estatisticas()['acertos'] == 1
+
+
+def test_leituras_simultaneas_copiam_uma_vez(rede, cache):
+    original = str(rede / 'a.pdf')
+    escrever(original, b'%PDF-1.4 ' + b'x' * 100_000, 1_700_000_000)
+    largada = threading.Barrier(8)
+
+    def ler():
+        largada.wait()
+        cache.ler(original)
+
+    with PastaLenta(str(rede), 0.05, banda=2 ** 20) as pasta_lenta:
+        threads = [threading.Thread(target=ler) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert pasta_lenta.bytes_lidos == os.path.getsize(original)
+    assert cache.estatisticas()['falhas'] == 1 and cache.estatisticas()['acertos'] == 7
+    assert cache._copias == {}
+
+
+def test_lock_do_arquivo_fica_enquanto_alguem_espera(rede, cache, monkeypatch):
+    """O primeiro a terminar não tira o lock de quem ainda está na fila do mesmo arquivo"""
+    original = str(rede / 'a.pdf')
+    escrever(original, b'%PDF-1.4 primeira', 1_700_000_000)
+    chave = CachePDF.chave(original, os.path.getsize(original), os.stat(original).st_mtime)
+    copiar = cache._copiar
+    dentro, liberar, primeira_saiu = threading.Event(), threading.Event(), threading.Event()
+    vistos = []
+
+    def copiar_devagar(*argumentos):
+        if not dentro.is_set():
+            dentro.set()
+            liberar.wait(5)
+        else:
+            primeira_saiu.wait(5)
+            vistos.append(list(cache._copias.get(chave, [])))
+        return copiar(*argumentos)
+
+    def primeira():
+        cache.caminho_local(original)
+        primeira_saiu.set()
+
+    monkeypatch.setattr(cache, '_copiar', copiar_devagar)
+    threads = [threading.Thread(target=primeira), threading.Thread(target=cache.caminho_local, args=(original,))]
+    threads[0].start()
+    assert dentro.wait(5)
+    threads[1].start()
+    while cache._copias[chave][1] < 2:
+        time.sleep(0.001)
+    liberar.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert vistos and vistos[0][1:] == [1]  # Só a segunda thread ainda usa o lock
+    assert cache._copias == {}
+
+
+def salvar_scan(caminho, nota, mtime):
+    """PDF digitalizado de uma página (só imagem)"""
+    documento = fitz.open()
+    pagina_scan(documento, nota, random.Random(int(nota)))
+    documento.save(caminho)
+    documento.close()
+    os.utime(caminho, (mtime, mtime))
+
+
+def test_busca_le_a_versao_nova_do_pdf(tmp_path, rede, monkeypatch):
+    """Com o PDF trocado na rede, cópia local, índice e OCR antigos deixam de valer"""
+    motor = search.MotorOCRSimulado(texto_padrao='NF 123456789')
+    cache_pdf = CachePDF(str(tmp_path / 'cache_pdf'))
+    monkeypatch.setattr(search, '_motor_ocr_padrao', motor)
+    monkeypatch.setattr(search, '_cache_pdf_padrao', cache_pdf)
+    monkeypatch.setattr(search, '_cache_ocr_padrao', search.CacheOCR(str(tmp_path / 'cache_ocr')))
+    monkeypatch.setattr(search, '_manifesto_padrao', search.ManifestoPastas())
+    indice = search.IndiceNumerico(str(tmp_path / 'indice.sqlite3'))
+
+    dia = rede / 'MARÇO' / '05-03'
+    dia.mkdir(parents=True)
+    original = str(dia / 'devolucao.pdf')
+    salvar_scan(original, '123456789', 1_700_000_000)
+
+    def buscar(nota):
+        localizador = search.LocalizadorNotasDevolucoes(str(rede), indice=indice)
+        localizador.log.eco = False
+        return [r['pagina'] for r in localizador.buscar('março', '5', nota)]
+
+    try:
+        assert buscar('123456789') == [1]
+        assert buscar('123456789') == [1]
+        assert cache_pdf.estatisticas()['falhas'] == 1
+
+        salvar_scan(original, '555444333', 1_700_000_100)
+        motor.texto_padrao = 'NF 555444333'
+        assert buscar('123456789') == []
+        assert buscar('555444333') == [1]
+        assert cache_pdf.estatisticas()['falhas'] == 2
+        assert cache_pdf.estatisticas()['entradas'] == 1
+    finally:
+        indice._conexao.close()
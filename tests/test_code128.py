@@ -0,0 +1,56 @@
+"""DecodificadorCode128: chave de acesso lida de um código de barras gerado, em qualquer orientação"""
+import random
+
+import numpy as np
+import pytest
+
+from benchmark import chave_acesso, modulos_code128
+from search import DecodificadorCode128
+
+
+def imagem_codigo(chave, modulo=2, altura=60, margem=40):
+    """Página em branco (tons de cinza) com o Code-128 C da chave no meio"""
+    larguras = modulos_code128(chave)
+    largura = sum(larguras) * modulo + 2 * margem
+    imagem = np.full((altura + 2 * margem, largura), 255, dtype=np.uint8)
+    x = margem
+    for indice, modulos in enumerate(larguras):
+        if indice % 2 == 0:
+            imagem[margem:margem + altura, x:x + modulos * modulo] = 0
+        x += modulos * modulo
+    return imagem
+
+
+@pytest.fixture
+def chave():
+    return chave_acesso('972672', random.Random(3))
+
+
+def test_chave_gerada_e_valida(chave):
+    assert DecodificadorCode128.chave_valida(chave)
+    assert DecodificadorCode128.numero_nota(chave) == '972672'
+    trocada = chave[:10] + str((int(chave[10]) + 1) % 10) + chave[11:]
+    assert not DecodificadorCode128.chave_valida(trocada)
+
+
+@pytest.mark.parametrize('giros', [0, 1, 2, 3])
+def test_le_a_chave_em_qualquer_orientacao(chave, giros):
+    imagem = np.ascontiguousarray(np.rot90(imagem_codigo(chave), giros))
+    assert DecodificadorCode128.ler_chaves(imagem) == [chave]
+
+
+def test_barras_borradas_e_com_ruido(chave):
+    rng = np.random.default_rng(5)
+    imagem = imagem_codigo(chave, modulo=3).astype(np.int16)
+    imagem = (imagem[:, :-1] + imagem[:, 1:]) // 2  # Bordas em meio-tom, como num scan
+    imagem += rng.integers(-25, 25, imagem.shape, dtype=np.int16)
+    assert DecodificadorCode128.ler_chaves(np.clip(imagem, 0, 255).astype(np.uint8)) == [chave]
+
+
+def test_pagina_sem_codigo_de_barras():
+    assert DecodificadorCode128.ler_chaves(np.full((200, 400), 255, dtype=np.uint8)) == []
+
+
+def test_codigo_de_barras_cortado(chave):
+    imagem = imagem_codigo(chave)
+    assert DecodificadorCode128.ler_chaves(imagem[:, :imagem.shape[1] // 2]) == []
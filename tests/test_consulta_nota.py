@@ -0,0 +1,84 @@
+"""ConsultaNota: regras da camada de texto, pontuação do OCR e distância com trocas comuns do Tesseract"""
+import random
+
+import pytest
+
+from search import ConsultaNota
+
+
+@pytest.mark.parametrize('texto, regra', [
+    ("NF-e Nº 123456789 serie 1", 'nota'),
+    ("N.123456789", 'nota'),
+    ("pedido 123456000", 'inicio'),
+    ("ref 000456789", 'final'),
+    ("N. 123.456.789", None),
+    ("0123456000", None),  # Os seis primeiros no meio de outro número
+    ("", None),
+])
+def test_regras_da_camada_de_texto(texto, regra):
+    assert ConsultaNota('123456789').buscar_texto(texto) == regra
+
+
+def test_nota_exata_e_finais():
+    consulta = ConsultaNota('123456789')
+    assert consulta.pontuacao('xx123456789yy') == 1.0
+    assert consulta.pontuacao('0023456789') == pytest.approx(8 / 9)  # Final de 8 dígitos
+    assert consulta.pontuacao('006789') == pytest.approx(4 / 9)
+    assert consulta.pontuacao('') == 0.0
+
+
+def test_troca_comum_custa_menos_que_um_erro_qualquer():
+    consulta = ConsultaNota('123456789')
+    assert consulta.distancia('123456709') == 0.5  # 8 -> 0 é confusão comum
+    assert consulta.distancia('123456719') == 1.0  # 8 -> 1 não é
+    assert consulta.pontuacao('123456709') == pytest.approx(1 - 0.5 / 9)
+    assert consulta.pontuacao('123456719') == pytest.approx(1 - 1.0 / 9)
+
+
+def test_erros_demais_nao_casam():
+    consulta = ConsultaNota('123456789')
+    assert consulta.pontuacao_aproximada('120056719') == 0.0
+    assert consulta.pontuacao('999999999') == 0.0
+
+
+def test_notas_curtas_so_aceitam_troca_comum():
+    consulta = ConsultaNota('12345678')
+    assert consulta.custo_maximo == ConsultaNota.CUSTO_CONFUSAO
+    assert consulta.pontuacao_aproximada('12345078') > 0  # 6 -> 0 é confusão comum
+    assert consulta.pontuacao_aproximada('12345178') == 0.0
+
+
+def test_sem_aproximacao():
+    consulta = ConsultaNota('123456789', custo_maximo=0)
+    assert not consulta.aproximada
+    assert consulta.pontuacao('123456709') == 0.0
+    assert not ConsultaNota('12345').aproximada  # Curta demais
+
+
+def test_filtro_por_pedacos_nao_perde_correspondencias():
+    """A distância com o filtro dos pedaços intactos é a mesma do cálculo na linha toda até o custo máximo"""
+    rng = random.Random(7)
+    consulta = ConsultaNota('583920147')
+    for _ in range(300):
+        nota = list(consulta.numero_nota)
+        for _ in range(rng.randrange(3)):
+            posicao = rng.randrange(len(nota))
+            operacao = rng.choice('tri')
+            if operacao == 't':
+                nota[posicao] = rng.choice('0123456789')
+            elif operacao == 'r':
+                del nota[posicao]
+            else:
+                nota.insert(posicao, rng.choice('0123456789'))
+        ruido = ''.join(rng.choice('0123456789') for _ in range(rng.randrange(30)))
+        texto = ruido[:len(ruido) // 2] + ''.join(nota) + ruido[len(ruido) // 2:]
+
+        completa = consulta._distancia_trecho(texto)
+        if completa <= consulta.custo_maximo:
+            assert consulta.distancia(texto) == completa
+        else:
+            assert consulta.distancia(texto) > consulta.custo_maximo
+
+
+def test_consulta_compilada_e_compartilhada():
+    assert ConsultaNota.compilar('123456789') is ConsultaNota.compilar('123456789')
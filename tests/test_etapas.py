@@ -0,0 +1,50 @@
+"""Agendador em etapas: custo do OCR pelo tamanho das páginas e PDFs ilegíveis contados como falha"""
+import fitz
+import pytest
+
+import search
+
+
+def localizador(classe, base):
+    localizador = classe(str(base), indice=False)
+    localizador.log.eco = False
+    localizador.cache_pdf = None
+    return localizador
+
+
+def salvar_pdf(caminho, tamanhos):
+    """PDF com páginas em branco dos tamanhos (em pontos) informados"""
+    documento = fitz.open()
+    for largura, altura in tamanhos:
+        documento.new_page(width=largura, height=altura)
+    documento.save(caminho)
+    documento.close()
+
+
+def test_custo_do_ocr_acompanha_o_tamanho_da_pagina(tmp_path):
+    a3, cupom = str(tmp_path / 'a3.pdf'), str(tmp_path / 'cupom.pdf')
+    salvar_pdf(a3, [(842, 1191)])
+    salvar_pdf(cupom, [(227, 400)])
+    busca = localizador(search.LocalizadorNotasDevolucoes, tmp_path)
+    escala = busca.escalas_ocr()[0]
+
+    assert busca.custo_ocr(a3, [0]) == int(842 * escala) * int(1191 * escala)
+    assert busca.custo_ocr(a3, [0]) > 10 * busca.custo_ocr(cupom, [0])
+    assert busca._documentos == {}  # A sessão aberta só para medir é fechada
+
+
+@pytest.mark.parametrize('classe', [search.LocalizadorNotasDevolucoes, search.LocalizadorNotasFiscais,
+                                    search.BuscadorCanhotosAvancado])
+def test_pdf_corrompido_nao_passa_por_nota_ausente(tmp_path, classe):
+    dia = tmp_path / 'MARÇO' / '05-03'
+    dia.mkdir(parents=True)
+    (dia / 'quebrado.pdf').write_bytes(b'%PDF-1.4 truncado')
+    salvar_pdf(str(dia / 'vazio.pdf'), [(595, 842)])
+    busca = localizador(classe, tmp_path)
+    busca.usar_ocr = False
+
+    resultados = busca.buscar('março', '5', '123456789')
+
+    assert [(r['nome_arquivo'], r['pagina'], r['tipo']) for r in resultados] == [('quebrado.pdf', None, 'erro')]
+    assert list(busca.arquivos_com_erro) == [str(dia / 'quebrado.pdf')]
+    assert any('quebrado.pdf' in mensagem for mensagem in busca.log.mensagens('erro'))
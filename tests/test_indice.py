@@ -0,0 +1,236 @@
+"""IndiceNumerico: índice invertido de tokens, textos guardados por leitura e respostas iguais às da leitura ao vivo"""
+import os
+import random
+import re
+import sqlite3
+
+import fitz
+import pytest
+
+import search
+from search import IndiceNumerico
+
+
+@pytest.fixture
+def indice(tmp_path):
+    indice = IndiceNumerico(str(tmp_path / 'indice.sqlite3'))
+    yield indice
+    indice._conexao.close()
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    caminho = tmp_path / 'lote.pdf'
+    caminho.write_bytes(b'%PDF-1.4 conteudo qualquer')
+    return str(caminho)
+
+
+def criar_pdf(caminho, textos):
+    """PDF com uma página por texto na camada de texto"""
+    documento = fitz.open()
+    for texto in textos:
+        pagina = documento.new_page()
+        for i, linha in enumerate(texto.splitlines()):
+            pagina.insert_text((50, 60 + 18 * i), linha, fontsize=10)
+    documento.save(caminho)
+    documento.close()
+
+
+def test_tokens_sao_as_sequencias_do_texto_sem_espacos():
+    texto = "N. 000.972.672   SERIE 1\n3354 1297\nNF 12"
+    assert IndiceNumerico.tokens_texto(texto) == {'000', '972', '672', '133541297'}
+    assert IndiceNumerico.tokens_texto(None) == set()
+
+
+def test_candidatos_pelo_indice_invertido(indice, tmp_path):
+    a, b = tmp_path / 'a.pdf', tmp_path / 'b.pdf'
+    a.write_bytes(b'%PDF a')
+    b.write_bytes(b'%PDF b')
+    indice.registrar_pagina(str(a), 1, 'texto', 'NOTA 419 189')
+    indice.registrar_pagina(str(a), 2, 'texto', 'CNPJ 28426706395086')
+    indice.registrar_pagina(str(b), 3, 'ocr', {'0': 'xx000972672', '90': '55'})
+
+    assert indice.candidatos(['419189'], 'texto') == {str(a): {1}}
+    assert indice.candidatos(['972672'], 'ocr') == {str(b): {3}}
+    assert indice.candidatos(['972672'], 'texto') == {}
+    assert indice.candidatos(['972672', '2842'], 'texto', caminhos=[str(a)]) == {str(a): {2}}
+    assert indice.candidatos(['12'], 'texto') is None  # Curto demais para os tokens
+    assert indice.candidatos(['12a456'], 'texto') is None
+
+    b.write_bytes(b'%PDF b alterado')
+    indice._assinaturas_validadas.clear()
+    assert indice.candidatos(['972672'], 'ocr') == {}
+
+
+def test_consulta_traz_so_os_textos_das_paginas_candidatas(indice, pdf):
+    indice.registrar_pagina(pdf, 1, 'texto', 'NF 123456')
+    indice.registrar_pagina(pdf, 2, 'texto', 'NF 654321')
+    indice.registrar_pagina(pdf, 3, 'texto', '', completo=True)
+
+    assert indice.consultar(pdf, 'texto', fragmentos=['3456']) == {1: {'': 'NF 123456'}, 2: {}, 3: {}}
+    assert indice.consultar(pdf, 'texto', fragmentos=['12']) == indice.consultar(pdf, 'texto')
+
+
+def test_tokens_acompanham_as_leituras_substituidas(indice, pdf):
+    indice.registrar_pagina(pdf, 1, 'ocr', {'0': '111222', '90': '333444'})
+    indice.registrar_pagina(pdf, 1, 'ocr', {'0': '555666'})
+
+    assert indice.candidatos(['1112'], 'ocr') == {}
+    assert indice.candidatos(['5556', '3334'], 'ocr') == {pdf: {1}}
+
+
+@pytest.mark.parametrize('metodo', ['texto', 'ocr'])
+def test_fragmentos_cobrem_toda_correspondencia(metodo):
+    """Onde as regras acham a nota, algum token da página contém um dos fragmentos"""
+    rng = random.Random(11)
+    for nota in ('583920147', '00972672', '419189', '12345'):
+        consulta = search.ConsultaNota(nota)
+        fragmentos = consulta.fragmentos(metodo)
+        for _ in range(400):
+            digitos = list(nota)
+            for _ in range(rng.randrange(3)):
+                posicao = rng.randrange(len(digitos))
+                digitos[posicao] = rng.choice('0123456789 .O')
+            texto = ''.join(rng.choice('0123456789 ./N') for _ in range(rng.randrange(12)))
+            texto += ''.join(digitos) + ''.join(rng.choice('0123456789 -') for _ in range(rng.randrange(12)))
+            if metodo == 'texto':
+                casa = consulta.buscar_texto(texto) or any(
+                    termo in re.sub(r'\s+', '', texto) for termo in search.LocalizadorNotasDevolucoes.termos_busca(
+                        None, nota))
+            else:
+                texto = re.sub(r'\s+', '', texto)
+                casa = consulta.pontuacao(texto) > 0
+            if casa:
+                tokens = IndiceNumerico.tokens_texto(texto)
+                assert any(fragmento in token for token in tokens for fragmento in fragmentos), (nota, texto)
+
+
+def test_leituras_da_pagina_ficam_separadas(indice, pdf):
+    indice.registrar_pagina(pdf, 1, 'ocr', {'0': '000555512345', '90': '678000'})
+    indice.registrar_pagina(pdf, 1, 'texto', 'NF 111111')
+
+    assert indice.consultar(pdf, 'ocr') == {1: {'0': '000555512345', '90': '678000'}}
+    assert indice.consultar(pdf, 'texto') == {1: {'': 'NF 111111'}}
+
+
+def test_nova_leitura_substitui_so_a_mesma_parte(indice, pdf):
+    indice.registrar_pagina(pdf, 2, 'ocr', {'0': '111', '180': '222'}, completo=False)
+    indice.registrar_pagina(pdf, 2, 'ocr', {'0': '333'}, completo=True)
+
+    assert indice.consultar(pdf, 'ocr') == {2: {'0': '333', '180': '222'}}
+    assert indice.paginas_completas(pdf, 'ocr') == {2}
+
+
+def test_consulta_de_paginas_completas(indice, pdf):
+    indice.registrar_pagina(pdf, 1, 'ocr', {'0': '123'}, completo=False)
+    indice.registrar_pagina(pdf, 2, 'ocr', {}, completo=True)  # Página sem texto algum (triagem)
+
+    assert indice.consultar(pdf, 'ocr', completas=True) == {2: {}}
+    assert set(indice.consultar(pdf, 'ocr')) == {1, 2}
+
+
+def test_arquivo_alterado_descarta_o_que_foi_lido(indice, pdf):
+    indice.registrar_pagina(pdf, 1, 'texto', 'NF 123456')
+    indice.definir_total_paginas(pdf, 1)
+    with open(pdf, 'ab') as arquivo:
+        arquivo.write(b'mais')
+    indice._assinaturas_validadas.clear()  # Outra execução do programa
+
+    assert indice.consultar(pdf, 'texto') == {}
+    assert indice.total_paginas(pdf) is None
+
+
+def test_indice_da_versao_anterior_e_reiniciado(tmp_path, pdf):
+    caminho_db = str(tmp_path / 'antigo.sqlite3')
+    conexao = sqlite3.connect(caminho_db)
+    conexao.execute("CREATE TABLE paginas (caminho TEXT, pagina INTEGER, metodo TEXT, completo INTEGER, "
+                    "PRIMARY KEY (caminho, pagina, metodo))")
+    conexao.execute("CREATE TABLE tokens (sufixo TEXT, caminho TEXT, pagina INTEGER, metodo TEXT)")
+    conexao.execute("INSERT INTO paginas VALUES (?, 1, 'ocr', 1)", (pdf,))
+    conexao.commit()
+    conexao.close()
+
+    indice = IndiceNumerico(caminho_db)
+    try:
+        colunas = {linha[1] for linha in indice._conexao.execute("PRAGMA table_info(tokens)")}
+        assert 'sufixo' not in colunas
+        assert indice._conexao.execute("SELECT COUNT(*) FROM paginas").fetchone()[0] == 0
+    finally:
+        indice._conexao.close()
+
+
+def test_tokens_criados_a_partir_dos_textos_da_versao_2(tmp_path, pdf):
+    caminho_db = str(tmp_path / 'v2.sqlite3')
+    indice = IndiceNumerico(caminho_db)
+    indice.registrar_pagina(pdf, 1, 'texto', 'NF 123456')
+    with indice._conexao:
+        indice._conexao.execute("DROP TABLE tokens")
+        indice._conexao.execute("PRAGMA user_version = 2")
+    indice._conexao.close()
+
+    indice = IndiceNumerico(caminho_db)
+    try:
+        assert indice.candidatos(['3456'], 'texto') == {pdf: {1}}
+        assert indice.consultar(pdf, 'texto') == {1: {'': 'NF 123456'}}
+    finally:
+        indice._conexao.close()
+
+
+def localizador(classe, base, indice):
+    localizador = classe(str(base), indice=indice)
+    localizador.log.eco = False
+    localizador.usar_ocr = False
+    localizador.cache_pdf = None
+    return localizador
+
+
+def paginas(resultados):
+    return sorted((os.path.basename(r['arquivo']), r['pagina']) for r in resultados)
+
+
+@pytest.mark.parametrize('classe, nota, esperado', [
+    # Canhoto: a regra da camada de texto é a expressão da ConsultaNota sobre o texto cru
+    (search.BuscadorCanhotosAvancado, '972672', [('lote.pdf', 3)]),
+    (search.BuscadorCanhotosAvancado, '419189', []),
+    # Devolução: nota ou finais no texto sem espaços, primeira página encontrada
+    (search.LocalizadorNotasDevolucoes, '419189', [('lote.pdf', 2)]),
+    # Entrada: a nota inteira no texto cru
+    (search.LocalizadorNotasFiscais, '972672', [('lote.pdf', 3)]),
+    (search.LocalizadorNotasFiscais, '419189', []),
+])
+def test_busca_quente_igual_a_fria(tmp_path, indice, classe, nota, esperado):
+    dia = tmp_path / 'MARÇO' / '05-03'
+    dia.mkdir(parents=True)
+    criar_pdf(str(dia / 'lote.pdf'), [
+        "DANFE\nCNPJ 28426706395086",
+        "DANFE\nN. 000.419.189   SERIE 1\nNOTA 419 189",
+        "DANFE\nNF 972672 SERIE 1\n4191 8939 3714",
+    ])
+
+    fria = localizador(classe, tmp_path, indice).buscar('março', '5', nota)
+    busca_quente = localizador(classe, tmp_path, indice)
+    parciais = []
+    busca_quente.set_callback_resultado(parciais.append)
+    quente = busca_quente.buscar('março', '5', nota)
+
+    assert paginas(fria) == paginas(quente) == esperado
+    assert [parcial['tipo'] for parcial in parciais] == ['indice'] * len(esperado)
+
+
+def test_leituras_de_angulos_diferentes_nao_se_juntam(tmp_path, indice, pdf):
+    busca = localizador(search.LocalizadorNotasDevolucoes, tmp_path, indice)
+    textos = {'0': '000555512345', '90': '678000'}
+
+    assert search.ConsultaNota.compilar('555512345678').pontuacao(''.join(textos.values())) == 1.0
+    assert busca.pontuacao_indice(textos, '555512345678') == 0.0
+    assert busca.pontuacao_indice(textos, '5555123') == 1.0
+
+
+def test_chave_de_acesso_decide_como_na_leitura(tmp_path, indice):
+    textos = {'codigo_barras:35190112345678000190550010000123451000000019': '12345', '0': '999999'}
+    canhoto = localizador(search.BuscadorCanhotosAvancado, tmp_path, indice)
+    devolucao = localizador(search.LocalizadorNotasDevolucoes, tmp_path, indice)
+
+    assert canhoto.pontuacao_indice(textos, '000012345') == 1.0
+    assert canhoto.pontuacao_indice(textos, '999999') == 0.0  # Chave de outra nota é conclusiva
+    assert devolucao.pontuacao_indice(textos, '999999') == 1.0  # Na devolução o OCR ainda decide
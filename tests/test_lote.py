@@ -0,0 +1,44 @@
+"""Busca em lote: leitura da coluna de notas do CSV e autômato de Aho-Corasick"""
+import io
+import random
+
+import pytest
+
+from search import AutomatoAhoCorasick, ler_notas
+
+EXPORTACAO = (
+    "Data;Valor;CNPJ;Numero NF\n"
+    "15/03/2024;1.250,90;28.426.706/3950-86;000.972.672\n"
+    "16/03/2024;310,00;28426706395086;419189\n"
+)
+
+
+def test_coluna_de_cabecalho_nota():
+    assert ler_notas(io.StringIO(EXPORTACAO)) == ['000972672', '419189']
+
+
+def test_sem_cabecalho_usa_a_primeira_coluna():
+    assert ler_notas(io.StringIO("972672,15/03/2024\n419189,16/03/2024\n")) == ['972672', '419189']
+    assert ler_notas(io.StringIO("972672\n419189\n972672\n")) == ['972672', '419189']
+
+
+def test_coluna_informada_por_nome_ou_numero():
+    assert ler_notas(io.StringIO(EXPORTACAO), 'valor') == ['125090', '31000']
+    assert ler_notas(io.StringIO(EXPORTACAO), '1') == ['15032024', '16032024']
+    with pytest.raises(ValueError):
+        ler_notas(io.StringIO(EXPORTACAO), 'pedido')
+
+
+def test_celulas_longas_demais_para_um_nnf(capsys):
+    assert ler_notas(io.StringIO(EXPORTACAO), 'cnpj') == []
+    assert '2 célula(s)' in capsys.readouterr().err
+
+
+def test_automato_acha_o_mesmo_que_a_busca_ingenua():
+    rng = random.Random(3)
+    padroes = {''.join(rng.choice('0123') for _ in range(rng.randint(1, 6))): {i} for i in range(200)}
+    automato = AutomatoAhoCorasick(padroes)
+    for _ in range(50):
+        texto = ''.join(rng.choice('01234') for _ in range(80))
+        esperado = set().union(*(valores for padrao, valores in padroes.items() if padrao in texto))
+        assert automato.buscar(texto) == esperado
@@ -0,0 +1,48 @@
+"""Orientação: estatísticas gravadas em lotes e OSD que falha sem engolir interrupções"""
+import json
+
+import pytest
+from PIL import Image
+
+import search
+from search import EstatisticasOrientacao, OCRMultiOrientacao
+
+
+def test_acertos_gravados_em_lotes(tmp_path):
+    caminho = str(tmp_path / 'orientacao.json')
+    estatisticas = EstatisticasOrientacao(caminho)
+    for _ in range(EstatisticasOrientacao.SALVAR_A_CADA - 1):
+        estatisticas.registrar(90)
+    assert not (tmp_path / 'orientacao.json').exists()
+
+    estatisticas.registrar(90)
+    assert json.loads((tmp_path / 'orientacao.json').read_text())['90'] == EstatisticasOrientacao.SALVAR_A_CADA
+
+    estatisticas.registrar(180)
+    estatisticas.salvar()
+    reaberta = EstatisticasOrientacao(caminho)
+    assert reaberta.acertos[180] == 1
+    assert reaberta.ordenar([0, 90, 180, 270])[:2] == [90, 180]
+
+
+class MotorOSD(search.MotorOCRSimulado):
+    def __init__(self, erro):
+        super().__init__()
+        self.erro = erro
+
+    def _ler_osd(self, imagem, config):
+        raise self.erro
+
+
+@pytest.mark.parametrize('erro', [RuntimeError("Too few characters"), OSError("tesseract ausente"),
+                                  ValueError("saída estranha")])
+def test_osd_que_falha_assume_pagina_em_pe(tmp_path, erro):
+    ocr = OCRMultiOrientacao(estatisticas=EstatisticasOrientacao(str(tmp_path / 'o.json')), motor=MotorOSD(erro))
+    assert ocr.detectar_orientacao_texto(Image.new('L', (50, 50), 255)) == (0, 0.0)
+
+
+def test_osd_nao_engole_interrupcao(tmp_path):
+    ocr = OCRMultiOrientacao(estatisticas=EstatisticasOrientacao(str(tmp_path / 'o.json')),
+                             motor=MotorOSD(KeyboardInterrupt()))
+    with pytest.raises(KeyboardInterrupt):
+        ocr.detectar_orientacao_texto(Image.new('L', (50, 50), 255))
@@ -0,0 +1,119 @@
+"""PoolOCR: processos residentes com MotorOCRSimulado, erros do motor e troca de processos mortos ou travados"""
+import os
+import time
+
+import pytest
+from PIL import Image
+
+import search
+from search import PoolOCR
+
+
+class MotorInstavel(search.MotorOCRSimulado):
+    """Motor simulado que falha, morre ou trava conforme a configuração pedida"""
+
+    def _ler_texto(self, imagem, config):
+        if config == 'falhar':
+            raise ValueError("imagem ilegível")
+        if config == 'morrer':
+            os._exit(1)
+        if config == 'travar':
+            time.sleep(60)
+        if config == 'pid':
+            return str(os.getpid())
+        return super()._ler_texto(imagem, config)
+
+    def _ler_osd(self, imagem, config):
+        return self.textos.get(self.impressao(imagem), self.osd)
+
+
+def imagem():
+    """Imagem assimétrica, para que cada giro tenha outra impressão"""
+    figura = Image.new('L', (40, 20), 255)
+    figura.paste(0, (0, 0, 10, 5))
+    return figura
+
+
+@pytest.fixture
+def pool():
+    figura = imagem()
+    textos = {
+        MotorInstavel.impressao(figura): 'NF 123456',
+        MotorInstavel.impressao(search.OCRMultiOrientacao.rotacionar_imagem(figura, 90)): 'girada 90',
+    }
+    pool = PoolOCR(tamanho=1, classe_motor=MotorInstavel, tempo_limite=5,
+                   argumentos_motor={'textos': textos, 'osd': 'Rotate: 0\n'})
+    yield pool
+    pool.fechar()
+
+
+def test_processos_iniciados_e_encerrados():
+    pool = PoolOCR(tamanho=2, classe_motor=MotorInstavel)
+    processos = [processo for processo, _ in pool._trabalhadores]
+    assert len(processos) == 2 and all(processo.is_alive() for processo in processos)
+    assert int(pool.ler_texto(imagem(), 'pid')) in {processo.pid for processo in processos}
+
+    pool.fechar()
+    assert not any(processo.is_alive() for processo in processos)
+    with pytest.raises(RuntimeError):
+        pool.ler_texto(imagem(), '')
+
+
+def test_texto_e_osd_giram_no_trabalhador(pool):
+    figura = imagem()
+    assert pool.ler_texto(figura, '') == 'NF 123456'
+    assert pool.ler_texto(figura, '', angulo=90) == 'girada 90'
+    assert pool.ler_texto(figura, '', angulo=180) == ''
+    assert pool.ler_osd(figura, '--psm 0', angulo=90) == 'girada 90'
+    assert pool.ler_osd(figura, '--psm 0') == 'NF 123456'
+    assert pool.ler_osd(figura, '--psm 0', angulo=270) == 'Rotate: 0\n'
+
+
+def test_erro_do_motor_mantem_o_processo(pool):
+    pid = pool.ler_texto(imagem(), 'pid')
+    with pytest.raises(RuntimeError, match='ValueError: imagem ilegível'):
+        pool.ler_texto(imagem(), 'falhar')
+    assert pool.ler_texto(imagem(), 'pid') == pid
+
+
+def test_processo_morto_e_substituido(pool):
+    pid = pool.ler_texto(imagem(), 'pid')
+    with pytest.raises(RuntimeError, match='encerrado inesperadamente'):
+        pool.ler_texto(imagem(), 'morrer')
+
+    assert pool.ler_texto(imagem(), 'pid') != pid
+    assert pool.ler_texto(imagem(), '') == 'NF 123456'
+    assert len(pool._trabalhadores) == 1
+
+
+def test_processo_travado_e_substituido(pool):
+    pool.tempo_limite = 0.5
+    pid = pool.ler_texto(imagem(), 'pid')
+    travado = pool._trabalhadores[0][0]
+    inicio = time.perf_counter()
+    with pytest.raises(RuntimeError, match='travado'):
+        pool.ler_texto(imagem(), 'travar')
+
+    assert time.perf_counter() - inicio < 30
+    assert not travado.is_alive()
+    assert pool.ler_texto(imagem(), 'pid') != pid
+    assert len(pool._trabalhadores) == 1
+
+
+def test_falha_ao_substituir_nao_devolve_o_processo_morto(pool, monkeypatch):
+    morto = pool._trabalhadores[0]
+    iniciar = pool._iniciar_trabalhador
+
+    def sem_processos():
+        raise OSError("sem recursos")
+
+    monkeypatch.setattr(pool, '_iniciar_trabalhador', sem_processos)
+    with pytest.raises(OSError):
+        pool.ler_texto(imagem(), 'morrer')
+    assert pool._trabalhadores == []
+    with pytest.raises(OSError):  # A vaga continua vazia enquanto não houver processo novo
+        pool.ler_texto(imagem(), '')
+
+    monkeypatch.setattr(pool, '_iniciar_trabalhador', iniciar)
+    assert pool.ler_texto(imagem(), '') == 'NF 123456'
+    assert pool._trabalhadores and pool._trabalhadores[0] is not morto
@@ -0,0 +1,96 @@
+"""Triagem de páginas: rotulagem de componentes conexos e veredito em páginas geradas"""
+import random
+from collections import deque
+
+import fitz
+import numpy as np
+import pytest
+
+import benchmark
+from search import DocumentoPDF, TriagemPagina
+
+
+def areas_referencia(mascara):
+    """Rotulagem ingênua, pixel a pixel, em largura (vizinhança 8)"""
+    altura, largura = mascara.shape
+    visitados = np.zeros_like(mascara, dtype=bool)
+    areas = []
+    for y, x in zip(*np.nonzero(mascara)):
+        if visitados[y, x]:
+            continue
+        visitados[y, x] = True
+        fila, area = deque([(y, x)]), 0
+        while fila:
+            py, px = fila.popleft()
+            area += 1
+            for vy in (py - 1, py, py + 1):
+                for vx in (px - 1, px, px + 1):
+                    if 0 <= vy < altura and 0 <= vx < largura and mascara[vy, vx] and not visitados[vy, vx]:
+                        visitados[vy, vx] = True
+                        fila.append((vy, vx))
+        areas.append(area)
+    return sorted(areas)
+
+
+def mascara(*linhas):
+    return np.array([[c == '#' for c in linha] for linha in linhas])
+
+
+@pytest.mark.parametrize('figura, esperado', [
+    (mascara('##...', '##...', '...##', '....#'), [3, 4]),  # Dois blocos que só se tocam na diagonal
+    (mascara('##..#', '##..#', '.....', '#...#'), [1, 1, 2, 4]),
+    (mascara('#.#.#', '.#.#.', '#.#.#'), [8]),  # Xadrez: tudo ligado pelas diagonais
+    (mascara('#...#', '.....', '#...#'), [1, 1, 1, 1]),
+    (mascara('#####', '....#', '###.#', '#...#', '#####'), [17]),  # Espiral que volta por baixo
+])
+def test_componentes_pequenos(figura, esperado):
+    assert areas_referencia(figura) == esperado
+    assert sorted(TriagemPagina.areas_componentes(figura)) == esperado
+
+
+def test_pagina_cheia_e_vazia():
+    assert list(TriagemPagina.areas_componentes(np.ones((30, 40), dtype=bool))) == [1200]
+    vazia = TriagemPagina.areas_componentes(np.zeros((30, 40), dtype=bool))
+    assert vazia.size == 0 and vazia.dtype == np.int64
+
+
+def test_componentes_iguais_a_referencia_em_mascaras_aleatorias():
+    rng = np.random.default_rng(7)
+    for _ in range(60):
+        altura, largura = rng.integers(1, 40, size=2)
+        figura = rng.random((altura, largura)) < rng.uniform(0.1, 0.6)
+        assert sorted(TriagemPagina.areas_componentes(figura)) == areas_referencia(figura)
+
+
+def veredito(tmp_path, gerar):
+    """Gera uma página com o benchmark e devolve o motivo da triagem na miniatura"""
+    caminho = str(tmp_path / 'pagina.pdf')
+    documento = fitz.open()
+    gerar(documento)
+    documento.save(caminho)
+    documento.close()
+    triagem = TriagemPagina()
+    with DocumentoPDF(caminho) as pdf:
+        escala = TriagemPagina.LADO_MINIATURA / max(pdf.tamanho_pagina(0))
+        return triagem.motivo(triagem.medir(pdf.renderizar_array(0, escala)))
+
+
+def sem_documento(tipo):
+    """Gerador de página sem documento do tipo pedido (o tipo é o primeiro sorteio do gerador)"""
+    semente = next(s for s in range(100) if random.Random(s).choice(['branco', 'separador', 'foto']) == tipo)
+    return lambda documento: benchmark.pagina_sem_documento(documento, random.Random(semente))
+
+
+@pytest.mark.parametrize('tipo, motivo', [('branco', 'em branco'), ('separador', 'sem caracteres'),
+                                          ('foto', 'foto')])
+def test_paginas_sem_documento_sao_descartadas(tmp_path, tipo, motivo):
+    assert veredito(tmp_path, sem_documento(tipo)) == motivo
+
+
+@pytest.mark.parametrize('gerar', [
+    lambda documento: benchmark.pagina_texto(documento, '972672', random.Random(1)),
+    lambda documento: benchmark.pagina_scan(documento, '972672', random.Random(1)),
+    lambda documento: benchmark.pagina_scan(documento, '972672', random.Random(2), angulo=90),
+], ids=['texto', 'scan', 'scan girado'])
+def test_paginas_com_texto_seguem_para_o_ocr(tmp_path, gerar):
+    assert veredito(tmp_path, gerar) == ''